@@ -0,0 +1,216 @@
+# coding: utf-8
+"""
+Deterministic generator of synthetic fiscal documents: coupons (cupom
+fiscal) and Redução Z reports, as printed by an ECF, mixed with noise lines.
+
+The same arguments always give the same bytes, so corpora can be generated
+again instead of being stored.
+
+Usage::
+
+    python -m benchmarks.corpus out.txt --size 100MB --kind coupon \\
+        --items 1-30 --noise 0.1 --encoding latin1
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import io
+import random
+import re
+
+KINDS = ('coupon', 'reducaoz', 'mixed')
+
+PRODUCTS = [
+    ('POLENTA FINA', 'Te', 11.00), ('SUCO DE UVA', 'F1', 5.50),
+    ('AGUA FONTE IJUI S/G', 'F1', 3.20), ('LINGUICA CASEIRA', 'Te', 12.00),
+    ('CARRETEIRO DE FILET', 'Te', 45.00), ('SALADA (POR PESSOA)', 'Te', 12.0),
+    ('COCA COLA ZERO LT.', 'F1', 3.50), ('PICANHA ANGUS', 'Te', 47.00),
+    ('CAFE EXPRESSO', 'Tc', 3.00), ('CHOPP CL. BRAHMA 300', 'F1', 6.00),
+    ('PÃO DE QUEIJO', 'Tc', 4.50), ('AÇÚCAR MASCAVO', 'F1', 8.90),
+]
+
+HEADER = [
+    '            NOME DA EMPRESA',
+    '         ENDEREÇO - CEP:00000-005',
+    '         FONE:(00)0000.0000 - CIDADE - BR',
+    'CNPJ:  00.000.00/0000-00',
+    'IE  :          0000000000',
+    '-' * 56,
+    '                      FITA-DETALHE',
+    'Emissão: 11/03/2013   18:35:08   COOi=000001 COOf=999999',
+]
+
+FOOTER = [
+    '-' * 56,
+    'ECC555    333AAA    BBB25D    CCCCA2    333CCC    444AAA',
+    'EPSON                                        TM-T81 FBII',
+    'ECF-IF VERSÃO:01.10.00 ECF:005                   LJ:0001',
+    '&&&&&&&&&<!*@%%&!>                   31/01/2013 01:58:44',
+    'FAB:EP000000000000000001                              BR',
+]
+
+NOISE = [
+    'RELATÓRIO GERENCIAL {0:06d}',
+    'LEITURA X {0:06d} - OPERADOR {1:02d}',
+    '   ABERTURA DO DIA {2:02d}/01/2013',
+    'SANGRIA {1:02d} R$ {3:>10}',
+    '{4}',
+]
+
+
+def money(value):
+    return ('%.2f' % value).replace('.', ',')
+
+
+def parse_size(size):
+    "Converts sizes like ``512KB``, ``10MB`` or ``1GB`` to bytes."
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*$', str(size),
+                     re.IGNORECASE)
+    if not match:
+        raise ValueError('invalid size: %r' % size)
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' KMG'.index(unit.upper() or ' '))
+
+
+def parse_range(value):
+    "Converts ``1-30`` or ``5`` to a ``(low, high)`` tuple."
+    low, _, high = str(value).partition('-')
+    return int(low), int(high or low)
+
+
+class Corpus(object):
+    """
+    Generates the lines of ``kind`` documents, with ``items`` (a ``(low,
+    high)`` range) items for each coupon, a ``wrap`` fraction of them in two
+    lines, and a ``noise`` fraction of lines out of documents.
+    """
+    def __init__(self, kind='coupon', items=(1, 30), noise=0.1, wrap=0.2,
+                 seed=0):
+        if kind not in KINDS:
+            raise ValueError('kind must be one of %s' % ', '.join(KINDS))
+        self.kind = kind
+        self.items = items
+        self.noise = noise
+        self.wrap = wrap
+        self.random = random.Random(seed)
+        self.coo = 0
+
+    def coupon(self):
+        rng = self.random
+        lines = list(HEADER)
+        lines.append('31/01/2013 01:58:36  CCF:%06d               COO:%06d'
+                     % (self.coo % 1000000, self.coo % 1000000))
+        lines += [
+            '                      CUPOM FISCAL',
+            'ITEM CÓDIGO          DESCRIÇÃO',
+            'QTD.   UN.     VL UNIT R$              ST     VL ITEM R$',
+            '-' * 56,
+        ]
+        total = 0
+        for index in range(1, rng.randint(*self.items) + 1):
+            name, tax, price = rng.choice(PRODUCTS)
+            quantity = rng.randint(1, 25)
+            total += quantity * price
+            description = '%d %s%s %dUN X' % (
+                rng.randint(100, 1500), rng.choice(('', '#')), name, quantity)
+            line = '%3d %-30s %6s %s %8s#' % (
+                index, description, money(price), tax,
+                money(quantity * price))
+            if rng.random() < self.wrap:
+                # long descriptions are printed in two lines
+                split = line.index(' %dUN X' % quantity)
+                lines += [line[:split], line[split + 1:]]
+            else:
+                lines.append(line)
+        lines.append(' ' * 42 + '-' * 14)
+        lines.append('TOTAL R$%48s' % money(total))
+        if rng.random() < 0.05:
+            lines.append('                      CANCELAMENTO')
+        lines.append('REDECARD CRED.%42s' % money(total))
+        return lines + FOOTER
+
+    def reducaoz(self):
+        rng = self.random
+        lines = list(HEADER)
+        lines += [
+            '08/01/2013 09:59:37                           COO:%06d'
+            % (self.coo % 1000000),
+            '                       REDUÇÃO Z',
+            'MOVIMENTO DO DIA: 07/01/2013',
+            '                       CONTADORES',
+            'Contador de Redução Z:%34d' % (self.coo % 10000),
+            'Contador de Cupom Fiscal:%31s' % ('%06d' % rng.randint(0, 99999)),
+            '               TOTALIZADORES NÃO FISCAIS',
+            'Nº   Operação                   CON  Valor Acumulado(R$)',
+        ]
+        operations = ('Sangria', 'Fundo de Troco', 'Assinada', 'Suprimento')
+        for index in range(1, rng.randint(1, len(operations)) + 1):
+            lines.append('%2d   %-25s %04d %20s' % (
+                index, operations[index - 1], rng.randint(0, 9999),
+                money(rng.uniform(0, 5000))))
+        lines += [
+            ' ' * 42 + '-' * 14,
+            'Total Oper Não-Fiscais%34s' % '0,00',
+        ]
+        return lines + FOOTER
+
+    def noise_line(self):
+        rng = self.random
+        return rng.choice(NOISE).format(
+            rng.randint(0, 999999), rng.randint(0, 99), rng.randint(1, 31),
+            money(rng.uniform(0, 1000)),
+            ''.join(rng.choice('ABCDEFGHIJ 0123456789Ç')
+                    for i in range(rng.randint(0, 56))))
+
+    def documents(self):
+        "Yields the lines of each document, or of a noise line."
+        while True:
+            if self.noise and self.random.random() < self.noise:
+                yield [self.noise_line()]
+                continue
+            self.coo += 1
+            kind = self.kind
+            if kind == 'mixed':
+                kind = 'reducaoz' if self.random.random() < 0.05 else 'coupon'
+            yield getattr(self, kind)()
+
+
+def generate(f, size, encoding='utf-8', **kwargs):
+    """
+    Writes about ``size`` bytes of documents to the binary file ``f``, and
+    returns a dict with the counts of ``bytes``, ``lines`` and
+    ``documents`` written. Other arguments are given to :py:class:`Corpus`.
+    """
+    written = lines = documents = 0
+    corpus = Corpus(**kwargs)
+    for document in corpus.documents():
+        if written >= size:
+            break
+        data = ('\n'.join(document) + '\n').encode(encoding)
+        f.write(data)
+        written += len(data)
+        lines += len(document)
+        documents += len(document) > 1
+    return dict(bytes=written, lines=lines, documents=documents)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('output')
+    args.add_argument('--size', default='10MB')
+    args.add_argument('--kind', choices=KINDS, default='coupon')
+    args.add_argument('--items', default='1-30')
+    args.add_argument('--noise', type=float, default=0.1)
+    args.add_argument('--wrap', type=float, default=0.2)
+    args.add_argument('--encoding', default='utf-8')
+    args.add_argument('--seed', type=int, default=0)
+    options = args.parse_args()
+    with io.open(options.output, 'wb') as f:
+        stats = generate(f, parse_size(options.size), options.encoding,
+                         kind=options.kind, items=parse_range(options.items),
+                         noise=options.noise, wrap=options.wrap,
+                         seed=options.seed)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
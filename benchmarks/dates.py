@@ -0,0 +1,79 @@
+# coding: utf-8
+"""
+Conversion of dates by :py:class:`~raspador.fields.DateField` and
+:py:class:`~raspador.fields.DateTimeField`: ``datetime.strptime`` for every
+value (as before the fast path), the fixed width parser without cache, and
+with the cache. Values repeat a few distinct dates, as in fiscal documents.
+Prints one JSON line for each field and conversion, with the hits and
+misses of the cache.
+
+Usage::
+
+    python -m benchmarks.dates [--values 200000] [--distinct 30]
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from raspador.fields import DateField, DateTimeField  # noqa
+
+
+def values(field_class, count, distinct, seed=0):
+    rnd = random.Random(seed)
+    start = datetime(2013, 1, 1, 8)
+    dates = [(start + timedelta(days=rnd.randint(0, 365),
+                                seconds=rnd.randint(0, 36000))).strftime(
+        field_class.default_format_string) for i in range(distinct)]
+    return [rnd.choice(dates) for i in range(count)]
+
+
+def strptime(field):
+    format_string = field.format_string
+    convert = field.convertion_function
+    return lambda value: convert(datetime.strptime(value, format_string))
+
+
+def measure(name, field_class, convert, data):
+    start = time.time()
+    for value in data:
+        convert(value)
+    elapsed = time.time() - start
+    return {
+        'benchmark': 'dates',
+        'field': field_class.__name__,
+        'conversion': name,
+        'values': len(data),
+        'seconds': round(elapsed, 4),
+        'values_per_second': int(len(data) / elapsed),
+    }
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('--values', type=int, default=200000)
+    args.add_argument('--distinct', type=int, default=30)
+    options = args.parse_args()
+
+    for field_class in (DateField, DateTimeField):
+        data = values(field_class, options.values, options.distinct)
+        cached = field_class()
+        for name, convert in [
+                ('strptime', strptime(field_class())),
+                ('fixed_width', field_class(cache_size=0).to_python),
+                ('cached', cached.to_python)]:
+            result = measure(name, field_class, convert, data)
+            if name == 'cached':
+                result.update(cache_hits=cached.cache_hits,
+                              cache_misses=cached.cache_misses)
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# coding: utf-8
+"""
+Parsers of the documents generated by :py:mod:`benchmarks.corpus`, one for
+each way of writing a parser: flat fields, nested parsers, fields
+decorated by :py:class:`~raspador.UnionUntilRegexProxy` and fields run over
+whole sections (``record_mode``).
+"""
+from __future__ import unicode_literals
+
+from raspador import Parser, Dictionary, Record, record_class, BaseField, \
+    IntegerField, BooleanField, BRFloatField, MappingField, \
+    UnionUntilRegexProxy
+
+
+def _float(value):
+    return float(value.replace(',', '.'))
+
+
+ITEM_NAMES = ['Item', 'Codigo', 'Descricao', 'Qtd', 'Unidade',
+              'ValorUnitario', 'Aliquota', 'ValorTotal']
+
+ItemRecord = record_class('ItemRecord', ITEM_NAMES)
+
+
+class ItemField(BaseField):
+    item_class = Dictionary
+
+    def setup(self):
+        self.search = (r"(\d+)\s(\d+)\s+([\w.#\s/()]+)\s+(\d+)(\w+)"
+                       r"\s+X\s+(\d+,\d+)\s+(\w+)\s+(\d+,\d+)")
+
+    def to_python(self, r):
+        return self.item_class(
+            Item=int(r[0]),
+            Codigo=r[1],
+            Descricao=r[2],
+            Qtd=_float(r[3]),
+            Unidade=r[4],
+            ValorUnitario=_float(r[5]),
+            Aliquota=r[6],
+            ValorTotal=_float(r[7]),
+        )
+
+
+class CouponParser(Parser):
+    "Flat parser of coupons, one item for each coupon."
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = BRFloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = ItemField(is_list=True)
+
+
+class RecordItemField(ItemField):
+    item_class = ItemRecord
+
+
+class RecordCouponParser(Parser):
+    "Flat parser of coupons, with records instead of dictionaries."
+    default_item_class = Record
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = BRFloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = RecordItemField(is_list=True)
+
+
+class MappingCouponParser(Parser):
+    "Flat parser of coupons, with items converted in batches."
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = BRFloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = MappingField(ItemField().search.pattern, [
+        ('Item', IntegerField()),
+        ('Codigo', None),
+        ('Descricao', None),
+        ('Qtd', BRFloatField()),
+        ('Unidade', None),
+        ('ValorUnitario', BRFloatField()),
+        ('Aliquota', None),
+        ('ValorTotal', BRFloatField()),
+    ], is_list=True)
+
+
+class WrappedCouponParser(Parser):
+    "Parser of coupons that joins the items printed in two lines."
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = BRFloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = UnionUntilRegexProxy(ItemField(is_list=True), ' '.join, r'.*#$')
+
+
+class SectionCouponParser(Parser):
+    """
+    Parser of coupons in ``record_mode``, that also finds the items printed
+    in two lines.
+    """
+    record_mode = True
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = BRFloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = ItemField(is_list=True)
+
+
+class NonFiscalTotalsParser(Parser):
+    class TotalField(BaseField):
+        def setup(self):
+            self.search = r'(\d+)\s+([\w\s]+)\s+(\d+)\s+(\d+,\d+)'
+
+        def to_python(self, v):
+            return Dictionary(
+                N=int(v[0]),
+                Operacao=v[1].strip(),
+                CON=int(v[2]),
+                ValorAcumulado=_float(v[3]),
+            )
+
+    begin = r'^\s+TOTALIZADORES NÃO FISCAIS\s+$'
+    end = r'^[\s-]*$'
+    Totalizador = TotalField(is_list=True)
+
+    def process_item(self, item):
+        return item.Totalizador
+
+
+class ReducaoZParser(Parser):
+    "Parser of Redução Z reports, with a nested parser of totals."
+    begin = r'^\s+REDUÇÃO Z\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s*(\d+)')
+    CRZ = IntegerField(r'Contador de Redução Z:\s*(\d+)')
+    Totalizadores = NonFiscalTotalsParser()
+
+
+#: Parsers by name, with the kind of corpus they parse.
+PARSERS = {
+    'flat': (CouponParser, 'coupon'),
+    'record': (RecordCouponParser, 'coupon'),
+    'mapping': (MappingCouponParser, 'coupon'),
+    'union': (WrappedCouponParser, 'coupon'),
+    'section': (SectionCouponParser, 'coupon'),
+    'nested': (ReducaoZParser, 'reducaoz'),
+}
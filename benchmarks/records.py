@@ -0,0 +1,67 @@
+# coding: utf-8
+"""
+Memory of the items kept after parsing: coupons parsed into
+:py:class:`~raspador.item.Dictionary` items against
+:py:class:`~raspador.item.Record` items. Prints one JSON line for each item
+class, with the parse time and the memory (and allocated blocks) held by the
+items.
+
+Usage::
+
+    python -m benchmarks.records [--size 10MB]
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.corpus import generate, parse_size  # noqa
+from benchmarks.parsers import CouponParser, RecordCouponParser  # noqa
+
+
+def measure(parser_class, path):
+    start = time.time()
+    items = list(parser_class().parse_file(path))
+    elapsed = time.time() - start
+    del items
+
+    tracemalloc.start()
+    items = list(parser_class().parse_file(path))
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'benchmark': 'records',
+        'item_class': parser_class.default_item_class.__name__,
+        'items': len(items),
+        'seconds': round(elapsed, 4),
+        'memory': current,
+        'peak_memory': peak,
+        'allocated_blocks': sum(stat.count
+                                for stat in snapshot.statistics('filename')),
+    }
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('--size', default='10MB')
+    options = args.parse_args()
+
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            generate(f, parse_size(options.size))
+        for parser_class in (CouponParser, RecordCouponParser):
+            print(json.dumps(measure(parser_class, path)))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
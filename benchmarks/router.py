@@ -0,0 +1,74 @@
+# coding: utf-8
+"""
+Parsing of a mixed corpus of coupons and Redução Z reports by
+:py:class:`~raspador.Router`, in a single pass, and by each parser reading
+the file on its own. Prints one JSON line for each.
+
+Usage::
+
+    python -m benchmarks.router [--size 10MB] [--noise 0.1] [--repeat 3]
+"""
+from __future__ import print_function, division
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from raspador import Router  # noqa
+from benchmarks.corpus import parse_size  # noqa
+from benchmarks.parsers import CouponParser, ReducaoZParser  # noqa
+from benchmarks.run import corpus_path  # noqa
+
+PARSER_CLASSES = [CouponParser, ReducaoZParser]
+
+
+def separate(path, encoding):
+    items = 0
+    for parser_class in PARSER_CLASSES:
+        with io.open(path, encoding=encoding, newline='\n') as f:
+            items += sum(1 for item in parser_class().parse(f))
+    return items
+
+
+def routed(path, encoding):
+    router = Router(PARSER_CLASSES)
+    return sum(1 for pair in router.parse_file(path, encoding))
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('--size', default='10MB')
+    args.add_argument('--encoding', default='utf-8')
+    args.add_argument('--noise', type=float, default=0.1)
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--corpus-dir', default=os.path.join(
+        tempfile.gettempdir(), 'raspador-benchmarks'))
+    options = args.parse_args()
+
+    if not os.path.isdir(options.corpus_dir):
+        os.makedirs(options.corpus_dir)
+    path = corpus_path(options.corpus_dir, 'mixed', parse_size(options.size),
+                       options.encoding, (1, 30), options.noise, 0)
+    for name, parse in [('separate', separate), ('router', routed)]:
+        timings = []
+        for i in range(options.repeat):
+            start = time.time()
+            items = parse(path, options.encoding)
+            timings.append(time.time() - start)
+        print(json.dumps({
+            'benchmark': 'router',
+            'method': name,
+            'noise': options.noise,
+            'bytes': os.path.getsize(path),
+            'items': items,
+            'seconds': round(min(timings), 4),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# coding: utf-8
+"""
+Benchmarks of the parsers in :py:mod:`benchmarks.parsers` on corpora
+generated by :py:mod:`benchmarks.corpus`. Prints a JSON document with the
+lines and items parsed per second and the peak memory of each benchmark, to
+be compared between releases.
+
+Corpora are generated once in ``--corpus-dir`` and reused by later runs.
+
+Usage::
+
+    python -m benchmarks.run [--size 10MB] [--encodings utf-8,latin1] \\
+        [--benchmarks flat,nested,union] [--methods parse,parse_file] \\
+        [--output results.json]
+"""
+from __future__ import print_function, division
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from .corpus import generate, parse_size, parse_range
+from .parsers import PARSERS
+
+METHODS = ('parse', 'parse_file')
+
+
+def corpus_path(directory, kind, size, encoding, items, noise, seed):
+    "Returns the path of a corpus, generating it when it does not exist."
+    name = '%s-%d-%s-%d_%d-%s-%d.txt' % (kind, size, encoding, items[0],
+                                         items[1], noise, seed)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        with io.open(path + '.tmp', 'wb') as f:
+            generate(f, size, encoding, kind=kind, items=items, noise=noise,
+                     seed=seed)
+        os.rename(path + '.tmp', path)
+    return path
+
+
+def count_lines(path):
+    with io.open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(
+            lambda: f.read(1 << 20), b''))
+
+
+def parse(parser_class, method, path, encoding):
+    "Parses the file at ``path``, returning the number of items found."
+    parser = parser_class()
+    if method == 'parse_file':
+        return sum(1 for item in parser.parse_file(path, encoding))
+    with io.open(path, encoding=encoding) as f:
+        return sum(1 for item in parser.parse(f))
+
+
+def peak_memory(parser_class, method, path, encoding):
+    "Returns the peak of memory allocated while parsing, in bytes."
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        parse(parser_class, method, path, encoding)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(name, method, path, encoding, repeat, memory):
+    parser_class = PARSERS[name][0]
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        items = parse(parser_class, method, path, encoding)
+        timings.append(time.time() - start)
+    seconds = min(timings)
+    lines = count_lines(path)
+    return {
+        'benchmark': name,
+        'parser': parser_class.__name__,
+        'method': method,
+        'encoding': encoding,
+        'bytes': os.path.getsize(path),
+        'lines': lines,
+        'items': items,
+        'seconds': round(seconds, 4),
+        'lines_per_second': int(lines / seconds),
+        'items_per_second': int(items / seconds),
+        'peak_memory': memory and peak_memory(parser_class, method, path,
+                                              encoding),
+    }
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('--size', default='10MB')
+    args.add_argument('--encodings', default='utf-8,latin1')
+    args.add_argument('--benchmarks', default=','.join(sorted(PARSERS)))
+    args.add_argument('--methods', default=','.join(METHODS))
+    args.add_argument('--items', default='1-30')
+    args.add_argument('--noise', type=float, default=0.1)
+    args.add_argument('--seed', type=int, default=0)
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--no-memory', dest='memory', action='store_false',
+                      help='skip the (slower) measure of peak memory')
+    args.add_argument('--corpus-dir', default=os.path.join(
+        tempfile.gettempdir(), 'raspador-benchmarks'))
+    args.add_argument('--output', help='file to write the results to')
+    options = args.parse_args()
+
+    if not os.path.isdir(options.corpus_dir):
+        os.makedirs(options.corpus_dir)
+    size = parse_size(options.size)
+    items = parse_range(options.items)
+    results = []
+    for name in options.benchmarks.split(','):
+        kind = PARSERS[name][1]
+        for encoding in options.encodings.split(','):
+            path = corpus_path(options.corpus_dir, kind, size, encoding,
+                               items, options.noise, options.seed)
+            for method in options.methods.split(','):
+                result = benchmark(name, method, path, encoding,
+                                   options.repeat, options.memory)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    report = json.dumps({
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'parameters': {
+            'size': size,
+            'items': items,
+            'noise': options.noise,
+            'seed': options.seed,
+            'repeat': options.repeat,
+        },
+        'results': results,
+    }, indent=2, sort_keys=True)
+    if options.output:
+        with io.open(options.output, 'w') as f:
+            f.write(report if isinstance(report, type(u'')) else
+                    report.decode('utf-8'))
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
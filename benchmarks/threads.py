@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+Thread scaling of parse sessions: one parser, one session for each thread,
+all of them parsing the same coupons. Prints one JSON line for each number
+of threads, with the wall time and the lines parsed per second.
+
+Threads only scale on a free-threaded CPython (3.13t and later); on other
+interpreters this measures the overhead of the sessions under the GIL.
+
+Usage::
+
+    python benchmarks/threads.py [--threads 1,2,4,8] [--coupons 2000]
+"""
+from __future__ import print_function
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.parsers import CouponParser  # noqa
+
+
+COUPON = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files',
+                      'cupom.txt')
+
+
+def run(parser, lines, threads):
+    counts = []
+
+    def parse():
+        counts.append(len(list(parser.session().parse(iter(lines)))))
+
+    workers = [threading.Thread(target=parse) for i in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time() - start, sum(counts)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    args.add_argument('--threads', default='1,2,4,8')
+    args.add_argument('--coupons', type=int, default=2000)
+    options = args.parse_args()
+
+    with io.open(COUPON, encoding='utf-8') as f:
+        lines = f.readlines() * options.coupons
+    parser = CouponParser()
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    for threads in [int(n) for n in options.threads.split(',')]:
+        elapsed, items = run(parser, lines, threads)
+        print(json.dumps({
+            'benchmark': 'threads',
+            'threads': threads,
+            'gil': gil,
+            'seconds': round(elapsed, 4),
+            'items': items,
+            'lines_per_second': int(len(lines) * threads / elapsed),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,14 @@
 # flake8: noqa
 
 from .parser import Parser
-from .item import Dictionary
+from .item import Dictionary, Record, record_class
 from .fields import BaseField, StringField, FloatField, BRFloatField, \
-    IntegerField, DateField, DateTimeField, BooleanField
+    IntegerField, DateField, DateTimeField, BooleanField, MappingField
 
-from .decorators import FieldProxy, UnionUntilRegexProxy
+from .decorators import FieldProxy, UnionUntilRegexProxy, UnionOverflowError
 
-from .cache import Cache
+from .cache import Cache, Memo, InternPool
+from .router import Router
+
+from .parallel import parse_many, ParseError
+from .metrics import Metrics
@@ -0,0 +1,111 @@
+# coding: utf-8
+"""
+Parsing of asyncio line sources. Requires Python 3.5+, and so is only
+imported by :py:meth:`~raspador.parser.ParserMixin.parse_async`.
+"""
+import asyncio
+import collections
+import functools
+
+# Python 3.5 and 3.6 only have get_event_loop, which gives the running loop
+# when called from a coroutine
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class AsyncItems(object):
+    """
+    Asynchronous iterator over the items that ``parser`` finds in the lines
+    of ``source``, an asynchronous iterable or an
+    :py:class:`asyncio.StreamReader`. Lines given as bytes are decoded with
+    ``encoding``.
+
+    With an ``executor``, lines are parsed in it, in batches of up to
+    ``batch_size`` lines. A batch is sent as soon as a line matches ``end``,
+    so that its item is not delayed by lines still to come.
+    """
+    def __init__(self, parser, source, encoding='utf-8', executor=None,
+                 batch_size=1000):
+        self.parser = parser
+        self.encoding = encoding
+        self.executor = executor
+        self.batch_size = batch_size
+        self.items = collections.deque()
+        self.done = False
+        if hasattr(source, '__aiter__'):
+            self._next_line = source.__aiter__().__anext__
+        else:
+            self._next_line = functools.partial(_readline, source)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.items:
+            if self.done:
+                raise StopAsyncIteration
+            if self.executor is None:
+                await self._parse_line()
+            else:
+                await self._parse_batch()
+        return self.items.popleft()
+
+    async def _read(self):
+        try:
+            line = await self._next_line()
+        except StopAsyncIteration:
+            line = None
+        if isinstance(line, bytes):
+            line = line.decode(self.encoding)
+        if line is None:
+            self.done = True
+        return line
+
+    async def _parse_line(self):
+        line = await self._read()
+        self.items.extend(self.parse_lines([line] if line is not None else []))
+
+    async def _parse_batch(self):
+        match_end = self.parser.has_search_end and self.parser._match_end
+        lines = []
+        while len(lines) < self.batch_size:
+            line = await self._read()
+            if line is None:
+                break
+            lines.append(line)
+            if match_end and match_end(line):
+                break
+        loop = _running_loop()
+        self.items.extend(await loop.run_in_executor(
+            self.executor, self.parse_lines, lines))
+
+    def parse_lines(self, lines):
+        "Parses ``lines``, and finalizes the parser at the end of the source."
+        parser = self.parser
+        metrics = parser.metrics
+        items = []
+        for line in lines:
+            res = parser.parse_block(line)
+            if metrics is not None:
+                metrics.block(parser, line, res)
+            if res:
+                items.append(res)
+        if self.done:
+            res = parser.finalize()
+            if metrics is not None:
+                metrics.finish(parser, res)
+            if res:
+                items.append(res)
+        return items
+
+
+async def _readline(reader):
+    line = await reader.readline()
+    if not line:
+        raise StopAsyncIteration
+    return line
+
+
+def parse_async(parser, source, encoding='utf-8', executor=None,
+                batch_size=1000):
+    "Implements :py:meth:`~raspador.parser.ParserMixin.parse_async`."
+    return AsyncItems(parser, source, encoding, executor, batch_size)
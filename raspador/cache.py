@@ -1,20 +1,31 @@
 # coding: utf-8
+import threading
 from collections import deque
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6 alternative
+    from ordereddict import OrderedDict
+
+
+def _pop_and_set(items, key):
+    items[key] = items.pop(key)
+
+
+_move_to_end = getattr(OrderedDict, 'move_to_end', _pop_and_set)
+
 
 class Cache(object):
     def __init__(self, max_length=0):
         self.max_length = max_length
-        self._items = deque()
+        self._items = deque(maxlen=max_length or None)
 
     def __len__(self):
         return len(self._items)
 
     def append(self, item):
         self._items.append(item)
-        if self.max_length:
-            while len(self._items) > self.max_length:
-                self._items.popleft()
 
     @property
     def items(self):
@@ -23,3 +34,102 @@ class Cache(object):
     def consume(self):
         while self._items:
             yield self._items.popleft()
+
+
+class Memo(object):
+    """
+    Bounded memo of the results of a function: :py:meth:`get` returns the
+    result kept for a key, or computes and keeps it. Once ``size`` results
+    are kept, each new one evicts the least recently used
+    (``eviction='lru'``) or the oldest (``eviction='fifo'``, that spares the
+    bookkeeping of hits). ``hits`` and ``misses`` count the lookups.
+    """
+    evictions = ('lru', 'fifo')
+
+    def __init__(self, size, eviction='lru'):
+        if eviction not in self.evictions:
+            raise ValueError('unknown eviction: %r' % (eviction,))
+        self.size = size
+        self.eviction = eviction
+        self.hits = 0
+        self.misses = 0
+        self._lru = eviction == 'lru'
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        "Iterates over the keys, from the next to be evicted."
+        return iter(list(self._items))
+
+    def get(self, key, compute):
+        "Returns the result for ``key``, calling ``compute(key)`` on misses."
+        items = self._items
+        try:
+            value = items[key]
+        except KeyError:
+            self.misses += 1
+            value = compute(key)
+            if self.size:
+                if len(items) >= self.size:
+                    items.popitem(last=False)
+                items[key] = value
+            return value
+        self.hits += 1
+        if self._lru:
+            try:
+                _move_to_end(items, key)
+            except KeyError:
+                pass  # evicted by another thread
+        return value
+
+
+class InternPool(object):
+    """
+    Pool of distinct values, so that equal values found by a parser are kept
+    once in memory: :py:meth:`intern` returns the pooled value equal to the
+    given one. Each pooled value has a code, its index in ``values``, for
+    columnar output. Once the pool holds ``size`` values, new values are
+    returned as they are and have no code.
+    """
+    def __init__(self, size=65536):
+        self.size = size
+        self.values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def intern(self, value):
+        "Returns the pooled value equal to ``value``, pooling it if room."
+        try:
+            return self.values[self._codes[type(value), value]]
+        except KeyError:
+            code = self.code(value)
+            return value if code is None else self.values[code]
+        except TypeError:  # unhashable
+            return value
+
+    def code(self, value):
+        "Returns the code of ``value``, pooling it if room, or ``None``."
+        # values of different types may be equal, as 1, 1.0 and True
+        key = type(value), value
+        code = self._codes.get(key)
+        if code is None and len(self.values) < self.size:
+            with self._lock:
+                code = self._codes.get(key)
+                if code is None and len(self.values) < self.size:
+                    self.values.append(value)
+                    code = self._codes[key] = len(self.values) - 1
+        return code
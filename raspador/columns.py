@@ -0,0 +1,251 @@
+# coding: utf-8
+"""
+Columnar output: items gathered in batches of columns, one for each field,
+instead of one mapping for each item.
+
+Columns of :py:class:`~raspador.fields.IntegerField`,
+:py:class:`~raspador.fields.FloatField` and
+:py:class:`~raspador.fields.BooleanField` values are :py:mod:`array` arrays,
+other columns are lists. Fields with ``is_list=True`` give a
+:py:class:`ListColumn`, with the values of all items in a child column and
+the offsets where the values of each item start, as in Apache Arrow.
+Fields with ``categorical=True`` give a :py:class:`CategoricalColumn`, with
+the codes of the values in the intern pool of the parser.
+
+Columns are a pivot of the items a parser yields: each item is still built
+by the parser, and is only kept until its values are appended to the
+columns, so batches hold no mapping for each item. Items that are not
+mappings, from a ``process_item`` that returns something else, are kept
+whole in the column of key ``None``.
+"""
+from array import array
+
+from .fields import BaseField, IntegerField, FloatField, BooleanField
+from .item import Dictionary
+
+_TYPECODES = [
+    (BooleanField, 'b'),
+    (IntegerField, 'q'),
+    (FloatField, 'd'),
+]
+
+_NUMPY_TYPES = {'b': 'bool', 'q': 'int64', 'd': 'float64'}
+
+
+def _unwrap(field):
+    while not isinstance(field, BaseField) and hasattr(field, 'field'):
+        field = field.field  # proxies
+    return field
+
+
+def typecode(field):
+    """
+    Returns the :py:mod:`array` typecode of the values of ``field``, or
+    ``None`` for values kept in lists.
+    """
+    field = _unwrap(field)
+    for cls, code in _TYPECODES:
+        if isinstance(field, cls):
+            return code
+    return None
+
+
+class Column(object):
+    """
+    The values of a field in a batch: an :py:mod:`array` for ``typecode``,
+    or a list when ``typecode`` is ``None``. Missing values are ``0`` in
+    arrays (``None`` in lists), and ``mask`` tells which values are present,
+    or is ``None`` when all of them are.
+    """
+    def __init__(self, typecode=None):
+        self.typecode = typecode
+        self.values = array(typecode) if typecode else []
+        self.mask = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        try:
+            self.values.append(value)
+        except (TypeError, OverflowError):
+            # a value that does not fit, from a custom to_python
+            self.values = list(self.values)
+            self.typecode = None
+            self.values.append(value)
+        if self.mask is not None:
+            self.mask.append(1)
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def append_missing(self):
+        if self.mask is None:
+            self.mask = array('b', [1]) * len(self.values)
+        self.values.append(0 if self.typecode else None)
+        self.mask.append(0)
+
+    def to_numpy(self):
+        """
+        Returns the values as a NumPy array, masked if any value is missing.
+        """
+        import numpy
+        if self.typecode:
+            values = numpy.array(self.values,
+                                 dtype=_NUMPY_TYPES[self.typecode])
+        else:
+            values = numpy.empty(len(self.values), dtype=object)
+            values[:] = self.values
+        if self.mask is None:
+            return values
+        return numpy.ma.masked_array(
+            values, mask=~numpy.array(self.mask, dtype=bool))
+
+
+class CategoricalColumn(Column):
+    """
+    The values of a categorical field in a batch, as codes of
+    ``categories``: the values of the :py:class:`~raspador.cache.InternPool`
+    of the parser, shared by all batches, so codes do not change from one
+    batch to the next. Missing values are ``-1``. If the pool is full and
+    has no code for a value, the column keeps the values in a list, and
+    ``categories`` is ``None``.
+    """
+    def __init__(self, pool):
+        super(CategoricalColumn, self).__init__('i')
+        self.pool = pool
+        self.categories = pool.values
+
+    def append(self, value):
+        if self.categories is not None:
+            code = self.pool.code(value)
+            if code is not None:
+                return super(CategoricalColumn, self).append(code)
+            self.values = [None if code < 0 else self.categories[code]
+                           for code in self.values]
+            self.typecode = self.categories = None
+        super(CategoricalColumn, self).append(value)
+
+    def append_missing(self):
+        super(CategoricalColumn, self).append_missing()
+        if self.categories is not None:
+            self.values[-1] = -1
+
+    def to_numpy(self):
+        """
+        Returns ``(codes, categories)`` as NumPy arrays, or the values if the
+        column has no categories.
+        """
+        import numpy
+        values = super(CategoricalColumn, self).to_numpy()
+        if self.categories is None:
+            return values
+        categories = numpy.empty(len(self.categories), dtype=object)
+        categories[:] = self.categories
+        return values, categories
+
+
+class ListColumn(Column):
+    """
+    The values of a list field in a batch: ``child`` is a :py:class:`Column`
+    (or ``child``) with the values of all items, and the values of item ``i``
+    are ``child.values[offsets[i]:offsets[i + 1]]``.
+    """
+    def __init__(self, typecode=None, child=None):
+        self.typecode = typecode
+        self.child = Column(typecode) if child is None else child
+        self.offsets = array('q', [0])
+        self.mask = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.child.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def append(self, values):
+        if not isinstance(values, (list, tuple)):
+            values = [values]  # a default that is not a list
+        self.child.extend(values)
+        self.offsets.append(len(self.child))
+        if self.mask is not None:
+            self.mask.append(1)
+
+    def append_missing(self):
+        if self.mask is None:
+            self.mask = array('b', [1]) * len(self)
+        self.offsets.append(len(self.child))
+        self.mask.append(0)
+
+    def to_numpy(self):
+        "Returns ``(offsets, values)`` as NumPy arrays."
+        import numpy
+        return numpy.array(self.offsets, dtype='int64'), \
+            self.child.to_numpy()
+
+
+class Columns(Dictionary):
+    """
+    A batch of ``length`` items, as a :py:class:`Column` for each field.
+    """
+    def __init__(self, fields):
+        super(Columns, self).__init__()
+        self.length = 0
+        for name, field in fields.items():
+            self[name] = _column(field)
+
+    def add(self, item):
+        "Appends the values of ``item``, a mapping of field names to values."
+        if not hasattr(item, 'items'):
+            item = {None: item}
+        for name, value in item.items():
+            column = self.get(name)
+            if column is None:
+                # a key added by process_item
+                column = self[name] = Column()
+                for i in range(self.length):
+                    column.append_missing()
+            if value is None:
+                column.append_missing()
+            else:
+                column.append(value)
+        self.length += 1
+        for column in self.values():
+            if len(column) < self.length:
+                column.append_missing()
+
+    def to_numpy(self):
+        "Returns a dictionary of the columns as NumPy arrays."
+        return Dictionary((name, column.to_numpy())
+                          for name, column in self.items())
+
+
+def _column(field):
+    "Returns an empty column for the values of ``field``."
+    base = _unwrap(field)
+    column = None
+    if getattr(base, 'categorical', False) and base.pool is not None:
+        column = CategoricalColumn(base.pool)
+    if getattr(field, 'is_list', False):
+        return ListColumn(typecode(field), column)
+    if column is None:
+        column = Column(typecode(field))
+    return column
+
+
+def to_columns(parser, items, batch_size=10000, numpy=False):
+    """
+    Yields the ``items`` found by ``parser`` (for example, by its
+    :py:meth:`~raspador.parser.ParserMixin.parse_file`) in :py:class:`Columns`
+    batches of up to ``batch_size`` items, or in dictionaries of NumPy arrays
+    when ``numpy`` is true.
+    """
+    batch = Columns(parser.fields)
+    for item in items:
+        batch.add(item)
+        if batch.length >= batch_size:
+            yield batch.to_numpy() if numpy else batch
+            batch = Columns(parser.fields)
+    if batch.length:
+        yield batch.to_numpy() if numpy else batch
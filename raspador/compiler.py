@@ -0,0 +1,473 @@
+# coding: utf-8
+"""
+Generates ``parse_block`` and ``finalize_item`` specialized for each
+:py:class:`~raspador.parser.Parser` class.
+
+The generic implementations in :py:class:`~raspador.parser.ParserMixin` find
+out on every block which fields are lists, which have a ``finalize`` method,
+if there is a ``begin``, an ``end`` or a cache, etc. As all of that is known
+when the class is created, :py:class:`~raspador.parser.ParserMetaclass` uses
+this module to precompute a field plan and to generate methods where those
+decisions are already taken, in the same way :py:mod:`dataclasses` generates
+``__init__``.
+"""
+import logging
+from collections import namedtuple
+
+from .encoding import NON_ASCII, charmap, encoded_test, line_finder
+from .fields import BaseField
+from .item import Record, RawValues
+from .matcher import _defining_class, combinable_pattern, record_pattern
+from .prefilter import fast_test
+
+
+PlanEntry = namedtuple('PlanEntry', 'name parse test scalar')
+"""
+A field as seen by the generated ``parse_block``: its bound ``parse_block``,
+the :py:class:`~raspador.matcher.FieldMatcher` test (or ``None``), and if it
+is a scalar field, that stops being evaluated once it has a value.
+"""
+
+EncodedPlanEntry = namedtuple(
+    'EncodedPlanEntry', 'name parse test scalar encoded_test encoded_parse')
+"""
+A :py:class:`PlanEntry` with the test and the parser of encoded blocks from
+:py:meth:`~raspador.fields.BaseField.encoded_parser`, or ``None`` if the
+field must receive decoded blocks.
+"""
+
+FinalizeEntry = namedtuple('FinalizeEntry',
+                           'name field finalize has_default convert')
+"""
+A field as seen by the generated ``finalize_item``. ``convert`` converts the
+:py:class:`~raspador.item.RawValues` of fields that convert in batches.
+"""
+
+
+def _memoizes(field):
+    "Tells if the results of ``field`` are memoized (see ``memo_size``)."
+    return isinstance(field, BaseField) and bool(field.memo_size)
+
+
+def field_plan(cls):
+    """
+    Returns the tuple of :py:class:`PlanEntry` of a parser class. Memoized
+    fields run their test inside the memoized ``parse``, and nested parsers
+    are tested by their ``begin`` while out of their sections (see
+    :py:meth:`~raspador.parser.ParserMixin._nested_test`).
+    """
+    from .parser import ParserMixin
+    plan = []
+    for name, field in cls.fields.items():
+        parse = field.parse_block
+        test = cls._field_matcher.tests.get(name)
+        if isinstance(field, ParserMixin):
+            test = field._nested_test()
+        if _memoizes(field):
+            parse, test = field.memoize(parse, test), None
+        plan.append(PlanEntry(name, parse, test, hasattr(field, 'is_list')
+                              and not field.is_list))
+    return tuple(plan)
+
+
+def encoded_field_plan(cls, encoding):
+    """
+    Returns ``(plan, ascii_only)``: the tuple of :py:class:`EncodedPlanEntry`
+    of a parser class for ``encoding``, and if the encoded parsers only accept
+    blocks made of ASCII.
+    """
+    plan, ascii_only = [], False
+    tests = cls._field_matcher.tests
+    for entry in field_plan(cls):
+        field = cls.fields[entry.name]
+        encoded = None
+        if entry.name in tests:
+            encoded = field.encoded_parser(encoding)
+        if encoded is None:
+            plan.append(EncodedPlanEntry(*(entry + (None, None))))
+            continue
+        regex, parse, field_ascii_only = encoded
+        test = fast_test(regex, combinable_pattern(field)[1])
+        if _memoizes(field):
+            parse, test = field.memoize(parse, test, encoding), None
+        ascii_only = ascii_only or field_ascii_only
+        plan.append(EncodedPlanEntry(*(entry + (test, parse))))
+    return tuple(plan), ascii_only
+
+
+def finalize_plan(cls):
+    "Returns the tuple of :py:class:`FinalizeEntry` of a parser class."
+    plan = []
+    for name, field in cls.fields.items():
+        finalize = getattr(field, 'finalize', None)
+        plan.append(FinalizeEntry(
+            name, field, finalize if callable(finalize) else None,
+            hasattr(field, 'default'),
+            field._to_python_many if getattr(field, 'batched', False)
+            else None))
+    return tuple(plan)
+
+
+def item_ends(cls):
+    """
+    Returns the names of the fields of a parser class with an ``end_item``
+    method, called once each item is finished. Items that are single values
+    (``yield_item_to_each_field_value_found``) end no state of fields.
+    """
+    if cls.yield_item_to_each_field_value_found:
+        return ()
+    return tuple(name for name, field in cls.fields.items()
+                 if callable(getattr(field, 'end_item', None)))
+
+
+def is_generated(cls, name):
+    "Tells if method ``name`` of ``cls`` may be replaced by a generated one."
+    from .parser import ParserMixin
+    owner = _defining_class(cls, name)
+    return owner is ParserMixin or \
+        getattr(vars(owner)[name], '_raspador_generated', False)
+
+
+_ASSIGN = """\
+{indent}if _debug(_DEBUG):
+{indent}    _logger.debug('%s.%s = %r', self.__class__.__name__, name, value)
+{indent}if isinstance(value, list) and name in item and \\
+{indent}        hasattr({get}, 'extend'):
+{indent}    {get}.extend(value)
+{indent}else:
+{indent}    item[name] = value
+"""
+
+
+# records keep values in slots, read and written faster as attributes
+_RECORD_ASSIGN = """\
+{indent}if _debug(_DEBUG):
+{indent}    _logger.debug('%s.%s = %r', self.__class__.__name__, name, value)
+{indent}old = getattr(item, name, None) if isinstance(value, list) else None
+{indent}if old is not None and hasattr(old, 'extend'):
+{indent}    old.extend(value)
+{indent}else:
+{indent}    setattr(item, name, value)
+"""
+
+
+def _assign(cls, indent):
+    from .parser import ParserMixin
+    if _defining_class(cls, 'assign_value_into_item') is ParserMixin:
+        item_class = cls.default_item_class
+        if isinstance(item_class, type) and issubclass(item_class, Record):
+            return _RECORD_ASSIGN.format(indent=indent)
+        # lists of lazy values are extended without converting them
+        get = '_raw(item, name)' if cls.lazy_conversion else 'item[name]'
+        return _ASSIGN.format(indent=indent, get=get)
+    return '%sself.assign_value_into_item(name, value)\n' % indent
+
+
+# a subclass overriding a generated method may reach it with ``super()``,
+# with other fields than the ones it was generated for
+_DELEGATE = """\
+    if type(self) is not _cls:
+        return _generic_{name}(self{args})
+"""
+
+
+def _delegate(name, args=''):
+    "Returns the lines that give subclasses the generic method ``name``."
+    return _DELEGATE.format(name=name, args=args).rstrip('\n').split('\n')
+
+
+def _parse_block_source(cls, encoded=False, ascii_only=False):
+    has_begin = cls.has_search_begin
+    has_end = cls.has_search_end
+    has_cache = cls.number_of_blocks_in_cache > 0
+    src = [
+        "def %s(self, block):" % (
+            "parse_encoded_block" if encoded else "parse_block"),
+        "    if _debug(_DEBUG):",
+        "        _logger.debug('%s.block: %r:%s', self.__class__.__name__,",
+        "                      type(block), block)",
+    ]
+    if not encoded:
+        src[1:1] = _delegate('parse_block', ', block')
+    if has_cache:
+        src.append("    self.cache.append(block)")
+    if has_begin:
+        src += [
+            "    if not self.begin_found:",
+            "        if not _match_begin(block):",
+            "            return None",
+            "        self.begin_found = True",
+        ]
+    elif has_end:
+        # without begin, the parser stops at the first end
+        src += [
+            "    if not self.begin_found:",
+            "        return None",
+        ]
+    src += [
+        "    if _debug(_DEBUG):",
+        "        _logger.debug('%s.begin_found: %r', self.__class__.__name__,",
+        "                      self.begin_found)",
+        "    item = self.item",
+        "    if item is None:",
+        "        item = self.item = _item_class()",
+        "        self._active = _plan if self._session_fields is None else \\",
+        "            self._session_plan(_key)",
+    ]
+    if has_end:
+        src += [
+            "    if _match_end(block):",
+            "        self.begin_found = False",
+        ]
+    src.append("    for block in %s:" % (
+        "self.cache.consume()" if has_cache else "(block,)"))
+    if encoded:
+        src.append("        text = None")
+        if ascii_only:
+            src.append("        plain = _non_ascii(block) is None")
+        src += [
+            "        for entry in self._active:",
+            "            name, parse, test, scalar, encoded_test, "
+            "encoded_parse = entry",
+            "            if encoded_parse is not None%s:" % (
+                " and plain" if ascii_only else ""),
+            "                if encoded_test is not None and \\",
+            "                        not encoded_test(block):",
+            "                    continue",
+            "                value = encoded_parse(block)",
+            "            else:",
+            "                if text is None:",
+            "                    text = block.decode(_encoding)",
+            "                if test is not None and not test(text):",
+            "                    continue",
+            "                value = parse(text)",
+        ]
+    else:
+        src += [
+            "        for entry in self._active:",
+            "            name, parse, test, scalar = entry",
+            "            if test is not None and not test(block):",
+            "                continue",
+            "            value = parse(block)",
+        ]
+    src += [
+        "            if value is None:",
+        "                continue",
+    ]
+    src.append(_assign(cls, ' ' * 12).rstrip('\n'))
+    src += [
+        "            if scalar:",
+        "                self._active = tuple(e for e in self._active",
+        "                                     if e is not entry)",
+    ]
+    if cls.yield_item_to_each_field_value_found:
+        src.append("            return self.finalize_item()")
+    if has_end:
+        src += [
+            "    if not self.begin_found:",
+            "        return self.finalize_item()",
+        ]
+    return '\n'.join(src) + '\n'
+
+
+def _record_parse_block_source(cls):
+    """
+    Returns the source of ``parse_block`` for parsers in ``record_mode``,
+    that keep the blocks of a section and evaluate the fields once over all
+    of them at its end (see
+    :py:meth:`~raspador.parser.ParserMixin._parse_record`).
+    """
+    has_begin = cls.has_search_begin
+    has_end = cls.has_search_end
+    has_cache = cls.number_of_blocks_in_cache > 0
+    src = [
+        "def parse_block(self, block):",
+        "    if _debug(_DEBUG):",
+        "        _logger.debug('%s.block: %r:%s', self.__class__.__name__,",
+        "                      type(block), block)",
+    ]
+    src[1:1] = _delegate('parse_block', ', block')
+    if has_cache:
+        src.append("    self.cache.append(block)")
+    if has_begin:
+        src += [
+            "    if not self.begin_found:",
+            "        if not _match_begin(block):",
+            "            return None",
+            "        self.begin_found = True",
+        ]
+    elif has_end:
+        src += [
+            "    if not self.begin_found:",
+            "        return None",
+        ]
+    src += [
+        "    if self.item is None:",
+        "        self.item = _item_class()",
+        "        self._record = []",
+    ]
+    if has_cache:
+        src.append("    self._record.extend(self.cache.consume())")
+    else:
+        src.append("    self._record.append(block)")
+    if has_end:
+        src += [
+            "    if _match_end(block):",
+            "        self.begin_found = False",
+            "        self._parse_record()",
+            "        return self.finalize_item()",
+        ]
+    return '\n'.join(src) + '\n'
+
+
+def _finalize_item_source(cls):
+    src = [
+        "def finalize_item(self):",
+    ] + _delegate('finalize_item') + [
+        "    item = self.item",
+        "    plan = _finalize_plan if self._session_fields is None else \\",
+        "        self._session_finalize_plan()",
+    ]
+    if any(entry.convert is not None for entry in cls._finalize_plan):
+        src += [
+            "    for entry in plan:",
+            "        if entry.convert is not None and \\",
+            "                type(item.get(entry.name)) is _RawValues:",
+            "            value = entry.convert(item[entry.name])",
+            "            if value:",
+            "                item[entry.name] = value",
+            "            else:",
+            "                del item[entry.name]",
+        ]
+    src += [
+        "    for name, field, finalize, has_default, convert in plan:",
+        "        if name in item:",
+        "            continue",
+        "        value = finalize() if finalize is not None else None",
+        "        if value is None and has_default:",
+        "            value = field.default",
+        "        if value is not None:",
+    ]
+    src.append(_assign(cls, ' ' * 12).rstrip('\n'))
+    if item_ends(cls):
+        src += [
+            "    fields = self.fields",
+            "    for name in _item_ends:",
+            "        if name in fields:",
+            "            fields[name].end_item()",
+        ]
+    src += [
+        "    res = self.process_item(item)",
+        "    self.item = None",
+        "    return res",
+    ]
+    return '\n'.join(src) + '\n'
+
+
+def _create_function(cls, name, source, namespace):
+    exec(source, namespace)
+    fn = namespace[name]
+    fn._raspador_generated = True
+    fn._raspador_source = source
+    fn.__module__ = cls.__module__
+    if hasattr(cls, '__qualname__'):
+        fn.__qualname__ = '%s.%s' % (cls.__qualname__, name)
+    return fn
+
+
+def _namespace(cls):
+    from .parser import ParserMixin, logger
+    return {
+        '_logger': logger,
+        '_cls': cls,
+        '_generic_parse_block': ParserMixin.parse_block,
+        '_generic_finalize_item': ParserMixin.finalize_item,
+        '_debug': logger.isEnabledFor,
+        '_DEBUG': logging.DEBUG,
+        '_item_class': cls.default_item_class,
+        '_raw': dict.__getitem__,
+        '_RawValues': RawValues,
+        '_plan': field_plan(cls),
+        '_key': None,
+        '_finalize_plan': finalize_plan(cls),
+        '_item_ends': item_ends(cls),
+        '_match_begin': getattr(cls, '_match_begin', None),
+        '_match_end': getattr(cls, '_match_end', None),
+    }
+
+
+def compile_parser(cls):
+    """
+    Installs generated ``parse_block`` and ``finalize_item`` methods on
+    ``cls``, unless the class inherits custom versions of them.
+    """
+    cls._encoded_parse_blocks = {}
+    cls._begin_finders = {}
+    namespace = _namespace(cls)
+    cls._plans = {None: namespace['_plan']}
+    cls._finalize_plan = namespace['_finalize_plan']
+    cls._item_ends = namespace['_item_ends']
+    cls._record_patterns = {}
+    if cls.record_mode:
+        if cls.yield_item_to_each_field_value_found:
+            raise TypeError('%s: record_mode does not yield an item for '
+                            'each value found' % cls.__name__)
+        cls._record_patterns = dict((name, record_pattern(field))
+                                    for name, field in cls.fields.items())
+    if is_generated(cls, 'parse_block'):
+        source = _record_parse_block_source(cls) if cls.record_mode else \
+            _parse_block_source(cls)
+        cls.parse_block = _create_function(
+            cls, 'parse_block', source, dict(namespace))
+    if is_generated(cls, 'finalize_item'):
+        cls.finalize_item = _create_function(
+            cls, 'finalize_item', _finalize_item_source(cls), dict(namespace))
+
+
+def encoded_parse_block(cls, encoding):
+    """
+    Returns a ``parse_encoded_block(parser, block)`` function generated for
+    ``cls`` and ``encoding``, that does the same as ``parse_block`` over a
+    block of encoded bytes. Returns ``None`` if ``cls`` has a custom
+    ``parse_block``, is in ``record_mode`` or the encoding cannot be handled
+    as bytes.
+    """
+    cache = cls._encoded_parse_blocks
+    if encoding in cache:
+        return cache[encoding]
+    fn = None
+    if charmap(encoding) is not None and is_generated(cls, 'parse_block') \
+            and not cls.record_mode:
+        plan, ascii_only = encoded_field_plan(cls, encoding)
+        cls._plans[encoding] = plan
+        namespace = _namespace(cls)
+        namespace.update(
+            _plan=plan,
+            _key=encoding,
+            _encoding=encoding,
+            _non_ascii=NON_ASCII.search,
+            _match_begin=cls.has_search_begin and
+            encoded_test(cls._begin, encoding, anchored=True),
+            _match_end=cls.has_search_end and
+            encoded_test(cls._end, encoding, anchored=True),
+        )
+        fn = _create_function(
+            cls, 'parse_encoded_block',
+            _parse_block_source(cls, encoded=True, ascii_only=ascii_only),
+            namespace)
+    cache[encoding] = fn
+    return fn
+
+
+def begin_finder(cls, encoding):
+    """
+    Returns a :py:func:`~raspador.encoding.line_finder` for the ``begin``
+    of ``cls`` over buffers in ``encoding``, or ``None`` if the class has no
+    ``begin``, disables ``skip_ahead`` or the search cannot be done in C.
+    """
+    cache = cls._begin_finders
+    if encoding not in cache:
+        cache[encoding] = None
+        if cls.has_search_begin and cls.skip_ahead:
+            cache[encoding] = line_finder(cls._begin, encoding)
+    return cache[encoding]
@@ -1,4 +1,5 @@
 # coding: utf-8
+import copy
 import re
 
 
@@ -7,25 +8,101 @@ class FieldProxy(object):
         self.field = field
 
     def __getattr__(self, attr):
+        if attr == 'field':
+            # not set yet, as while unpickling
+            raise AttributeError(attr)
         return getattr(self.field, attr)
 
+    def session(self):
+        "Returns a copy of the proxy with its own state, for a parse session."
+        proxy = copy.copy(self)
+        if hasattr(self.field, 'session'):
+            proxy.field = self.field.session()
+        proxy.reset()
+        return proxy
+
+    def reset(self):
+        "Restores the initial state of the proxy."
+        if hasattr(self.field, 'reset'):
+            self.field.reset()
+
 
 class UnionUntilRegexProxy(FieldProxy):
     """
     Does cache of blocks until the provided regex returns a match, then uses
     the ``union_method`` to join blocks that are sent to the decorated field.
+
+    The cache can be bounded by ``max_blocks`` blocks or ``max_bytes``
+    characters (bytes, for blocks of bytes). On ``overflow`` the cached
+    blocks are joined and sent to the field as if the regex had matched
+    (``'flush'``), discarded (``'drop'``), or discarded raising
+    :py:class:`UnionOverflowError` (``'raise'``).
+
+    The cache is also discarded at the end of each item, so blocks of an
+    item are never joined to blocks of the next one.
     """
-    def __init__(self, field, union_method, search_regex):
+    overflow_policies = ('flush', 'drop', 'raise')
+
+    def __init__(self, field, union_method, search_regex, max_blocks=None,
+                 max_bytes=None, overflow='flush'):
         super(UnionUntilRegexProxy, self).__init__(field)
+        if overflow not in self.overflow_policies:
+            raise ValueError('UnionUntilRegexProxy: overflow must be one of '
+                             '%s, not %r' % (', '.join(self.overflow_policies),
+                                             overflow))
         self.cache = []
+        self.size = 0
         self.union_method = union_method
         self.search_regex = re.compile(search_regex, re.UNICODE)
+        self.max_blocks = max_blocks
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        # a str.join gives back a single block as is, without joining it
+        self._joins_strings = getattr(union_method, '__name__', None) == \
+            'join' and isinstance(getattr(union_method, '__self__', None),
+                                  (type(u''), bytes))
+
+    def reset(self):
+        super(UnionUntilRegexProxy, self).reset()
+        self.end_item()
+
+    def end_item(self):
+        "Discards the blocks cached for the item being finished."
+        self.cache = []
+        self.size = 0
 
     def parse_block(self, block):
         if hasattr(block, 'rstrip'):
             block = block.rstrip()
-        self.cache.append(block)
+        cache = self.cache
         if self.search_regex.match(block):
-            blocks = self.union_method(self.cache)
+            if not cache and self._joins_strings:
+                return self.field.parse_block(block)
+            cache.append(block)
             self.cache = []
-            return self.field.parse_block(blocks)
+            self.size = 0
+            return self.field.parse_block(self.union_method(cache))
+        cache.append(block)
+        if self.max_bytes is not None:
+            self.size += len(block)
+            if self.size >= self.max_bytes:
+                return self._overflow()
+        if self.max_blocks is not None and len(cache) >= self.max_blocks:
+            return self._overflow()
+
+    def _overflow(self):
+        cache = self.cache
+        self.end_item()
+        if self.overflow == 'flush':
+            return self.field.parse_block(self.union_method(cache))
+        if self.overflow == 'raise':
+            raise UnionOverflowError(
+                'UnionUntilRegexProxy: %d blocks without a match of %r' % (
+                    len(cache), self.search_regex.pattern))
+
+
+class UnionOverflowError(ValueError):
+    """
+    Raised by :py:class:`UnionUntilRegexProxy` with ``overflow='raise'`` when
+    its cache reaches ``max_blocks`` or ``max_bytes``.
+    """
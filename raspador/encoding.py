@@ -0,0 +1,374 @@
+# coding: utf-8
+"""
+Translation of unicode regular expressions into bytes regular expressions
+that give the same results over encoded text.
+
+This lets :py:meth:`~raspador.parser.ParserMixin.parse_file` test and capture
+over the raw bytes of a file, decoding only the captured groups.
+
+The translation is exact: each construct that matches one character is
+replaced by the set of bytes whose decoded character it matches, evaluated
+with the unicode semantics of the original pattern (so ``\\w`` still matches
+``ç`` in latin1). This is possible for single byte encodings, where every
+byte is a character. For UTF-8 the translation covers only ASCII bytes, and
+must only be used on blocks made of ASCII. Patterns that cannot be
+translated (case-insensitive, scoped flags, unknown constructs) give
+``None``, and the caller must decode the block.
+"""
+import codecs
+import re
+
+from .prefilter import sre_parse, sre_constants, unichr, fast_test, \
+    required_literals
+
+
+_OP = sre_constants
+_MAXREPEAT = sre_constants.MAXREPEAT
+_ASCII_FLAG = getattr(re, 'ASCII', 0)
+_UTF8 = (codecs.lookup('utf-8').name, codecs.lookup('utf-8-sig').name)
+
+NON_ASCII = re.compile(b'[\x80-\xff]')
+
+_CATEGORIES = {
+    _OP.CATEGORY_DIGIT: r'\d',
+    _OP.CATEGORY_NOT_DIGIT: r'\D',
+    _OP.CATEGORY_SPACE: r'\s',
+    _OP.CATEGORY_NOT_SPACE: r'\S',
+    _OP.CATEGORY_WORD: r'\w',
+    _OP.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+class Untranslatable(Exception):
+    pass
+
+
+def _decode_byte(value, encoding):
+    try:
+        char = bytes(bytearray([value])).decode(encoding)
+    except UnicodeDecodeError:
+        return None
+    return char if len(char) == 1 else None
+
+
+def charmap(encoding):
+    """
+    Returns ``(chars, ascii_only)``: a list of ``(byte value, character)``
+    over which patterns can be translated for ``encoding``, and if the
+    translation is valid only for blocks made of ASCII. Returns ``None`` for
+    encodings that cannot be handled as bytes (multibyte other than UTF-8,
+    not ASCII compatible, stateful).
+
+    Bytes that are not valid in a single byte encoding are left out, and so
+    never matched.
+    """
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    ascii_chars = [(i, _decode_byte(i, encoding)) for i in range(128)]
+    if any(char != unichr(i) for i, char in ascii_chars):
+        return None
+    if name in _UTF8:
+        return ascii_chars, True
+    all_bytes = bytes(bytearray(range(256)))
+    if len(all_bytes.decode(encoding, 'replace')) != 256:
+        return None
+    chars = [(i, _decode_byte(i, encoding)) for i in range(256)]
+    return [(i, char) for i, char in chars if char is not None], False
+
+
+def _category_regex(category, flags):
+    if category not in _CATEGORIES:
+        raise Untranslatable(category)
+    return re.compile(_CATEGORIES[category],
+                      _ASCII_FLAG if flags & _ASCII_FLAG else re.UNICODE)
+
+
+def _char_predicate(op, av, flags):
+    "Returns a function telling if a character is matched by ``(op, av)``."
+    if op is _OP.LITERAL:
+        literal = unichr(av)
+        return lambda char: char == literal
+    if op is _OP.NOT_LITERAL:
+        literal = unichr(av)
+        return lambda char: char != literal
+    if op is _OP.ANY:
+        if flags & re.DOTALL:
+            return lambda char: True
+        return lambda char: char != u'\n'
+    if op is _OP.IN:
+        negate = False
+        tests = []
+        for item_op, item_av in av:
+            if item_op is _OP.NEGATE:
+                negate = True
+            elif item_op is _OP.RANGE:
+                lo, hi = item_av
+                tests.append(lambda char, lo=lo, hi=hi: lo <= ord(char) <= hi)
+            elif item_op in (_OP.LITERAL, _OP.NOT_LITERAL):
+                tests.append(_char_predicate(item_op, item_av, flags))
+            elif item_op is _OP.CATEGORY:
+                regex = _category_regex(item_av, flags)
+                tests.append(lambda char, m=regex.match: m(char) is not None)
+            else:
+                raise Untranslatable(item_op)
+        return lambda char: any(test(char) for test in tests) != negate
+    return None
+
+
+def _byte_class(predicate, chars):
+    values = [i for i, char in chars if predicate(char)]
+    if not values:
+        return '(?!)'
+    if len(values) == 1:
+        return '\\x%02x' % values[0]
+    ranges = []
+    for value in values:
+        if ranges and ranges[-1][1] == value - 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    parts = []
+    for lo, hi in ranges:
+        parts.append('\\x%02x' % lo if lo == hi else
+                     '\\x%02x-\\x%02x' % (lo, hi))
+    return '[%s]' % ''.join(parts)
+
+
+class _Translator(object):
+    def __init__(self, regex, chars):
+        self.flags = regex.flags
+        self.chars = chars
+        self.names = dict((v, k) for k, v in regex.groupindex.items())
+        self._word = None
+
+    @property
+    def word(self):
+        if self._word is None:
+            regex = _category_regex(_OP.CATEGORY_WORD, self.flags)
+            self._word = _byte_class(lambda char: bool(regex.match(char)),
+                                     self.chars)
+        return self._word
+
+    def sequence(self, items):
+        return ''.join(self.item(op, av) for op, av in items)
+
+    def item(self, op, av):
+        predicate = _char_predicate(op, av, self.flags)
+        if predicate is not None:
+            return _byte_class(predicate, self.chars)
+        if op is _OP.AT:
+            return self.at(av)
+        if op in (_OP.MAX_REPEAT, _OP.MIN_REPEAT) or \
+                op is getattr(_OP, 'POSSESSIVE_REPEAT', None):
+            lo, hi, items = av
+            if hi == _MAXREPEAT:
+                count = '{%d,}' % lo
+            else:
+                count = '{%d,%d}' % (lo, hi)
+            suffix = {_OP.MAX_REPEAT: '', _OP.MIN_REPEAT: '?'}.get(op, '+')
+            return '(?:%s)%s%s' % (self.sequence(items), count, suffix)
+        if op is _OP.SUBPATTERN:
+            group, items = av[0], av[-1]
+            if len(av) > 2 and (av[1] or av[2]):
+                raise Untranslatable('scoped flags')
+            if group is None:
+                return '(?:%s)' % self.sequence(items)
+            if group in self.names:
+                return '(?P<%s>%s)' % (self.names[group], self.sequence(items))
+            return '(%s)' % self.sequence(items)
+        if op is _OP.BRANCH:
+            return '(?:%s)' % '|'.join(self.sequence(b) for b in av[1])
+        if op is _OP.GROUPREF:
+            return '(?:\\%d)' % av
+        if op is _OP.GROUPREF_EXISTS:
+            group, yes, no = av
+            return '(?(%d)%s|%s)' % (group, self.sequence(yes),
+                                     self.sequence(no) if no else '')
+        if op in (_OP.ASSERT, _OP.ASSERT_NOT):
+            direction, items = av
+            kind = {(_OP.ASSERT, 1): '?=', (_OP.ASSERT, -1): '?<=',
+                    (_OP.ASSERT_NOT, 1): '?!', (_OP.ASSERT_NOT, -1): '?<!'}
+            return '(%s%s)' % (kind[op, direction], self.sequence(items))
+        if op is getattr(_OP, 'ATOMIC_GROUP', None):
+            return '(?>%s)' % self.sequence(av)
+        raise Untranslatable(op)
+
+    def at(self, code):
+        if code is _OP.AT_BEGINNING:
+            return '^'
+        if code is _OP.AT_BEGINNING_STRING:
+            return '\\A'
+        if code is _OP.AT_END:
+            return '$'
+        if code is _OP.AT_END_STRING:
+            return '\\Z'
+        if code is _OP.AT_BOUNDARY:
+            return '(?:(?<=%s)(?!%s)|(?<!%s)(?=%s))' % ((self.word,) * 4)
+        if code is _OP.AT_NON_BOUNDARY:
+            return '(?:(?<=%s)(?=%s)|(?<!%s)(?!%s))' % ((self.word,) * 4)
+        raise Untranslatable(code)
+
+
+def translate(regex, encoding):
+    """
+    Returns ``(bytes_regex, ascii_only)`` for a unicode ``regex``, or
+    ``None`` if it cannot be translated for ``encoding``. When
+    ``ascii_only`` is true, the bytes regex is only valid for blocks without
+    bytes above ``0x7f``.
+
+        >>> bytes_regex, ascii_only = translate(re.compile(r'^COO:(\\d+)'),
+        ...                                     'latin1')
+        >>> bytes_regex.findall(b'COO:0123')
+        [b'0123']
+    """
+    if isinstance(regex.pattern, bytes) or regex.flags & re.IGNORECASE:
+        return None
+    chars = charmap(encoding)
+    if chars is None:
+        return None
+    chars, ascii_only = chars
+    try:
+        items = sre_parse.parse(regex.pattern, regex.flags)
+        pattern = _Translator(regex, chars).sequence(items)
+        return re.compile(pattern.encode('ascii'),
+                          regex.flags & re.MULTILINE), ascii_only
+    except (Untranslatable, re.error, AssertionError, OverflowError):
+        return None
+
+
+class _LineFinder(_Translator):
+    """
+    Translates a pattern into one that, searched over a buffer of many
+    lines, matches at the start of every line matched by the original one.
+    Constructs that depend on the line end or on lookarounds are relaxed, so
+    the translated pattern may also match other lines.
+    """
+    def item(self, op, av):
+        if op in (_OP.ASSERT, _OP.ASSERT_NOT):
+            return ''
+        if op in (getattr(_OP, 'POSSESSIVE_REPEAT', None),
+                  getattr(_OP, 'ATOMIC_GROUP', None)):
+            # may take the line end and not give it back
+            raise Untranslatable(op)
+        return super(_LineFinder, self).item(op, av)
+
+    def at(self, code):
+        if code in (_OP.AT_BEGINNING, _OP.AT_BEGINNING_STRING):
+            return '^'
+        if code in (_OP.AT_END, _OP.AT_END_STRING):
+            return '(?:$|(?<=\\n))'
+        if code in (_OP.AT_BOUNDARY, _OP.AT_NON_BOUNDARY):
+            return ''
+        raise Untranslatable(code)
+
+
+def _line_start(buffer, start, position):
+    newline = buffer.rfind(b'\n', start, position)
+    return start if newline == -1 else newline + 1
+
+
+def _line_regex(regex, chars):
+    items = sre_parse.parse(regex.pattern, regex.flags)
+    pattern = '^(?:%s)' % _LineFinder(regex, chars).sequence(items)
+    finder = re.compile(pattern.encode('ascii'), re.MULTILINE)
+    # groups inside dropped lookarounds would renumber the others
+    return finder if finder.groups == regex.groups else None
+
+
+def line_finder(regex, encoding):
+    """
+    Returns a ``find(buffer, start, end)`` function that gives the offset of
+    the first line of ``buffer[start:end]`` that may be matched by
+    ``regex.match``, or ``-1``. ``buffer`` holds text in ``encoding`` and
+    ``start`` must be the offset of a line. Lines before the offset returned
+    are never matched by ``regex``. Returns ``None`` when no such search can
+    be done in C.
+
+    Lines are looked up by the required literal of ``regex`` and checked by
+    a translated multiline regex, when each one is available.
+
+        >>> find = line_finder(re.compile(r'^\\s+CUPOM\\b'), 'latin1')
+        >>> find(b'CUPOM\\n  CUPONS\\n  CUPOM\\n', 0, 22)
+        15
+    """
+    chars = charmap(encoding)
+    if chars is None:
+        return None
+    chars, ascii_only = chars
+    finder = None
+    if not ascii_only and not regex.flags & re.IGNORECASE and \
+            not isinstance(regex.pattern, bytes):
+        try:
+            finder = _line_regex(regex, chars)
+        except (Untranslatable, re.error, AssertionError, OverflowError):
+            pass
+    prefix, literal = required_literals(regex, anchored=True)
+    try:
+        literal = literal.encode(encoding) if literal is not None else None
+    except UnicodeEncodeError:
+        return lambda buffer, start, end: -1
+    if literal is None:
+        if finder is None:
+            return None
+        search = finder.search
+
+        def find(buffer, start, end):
+            match = search(buffer, start, end)
+            return -1 if match is None else match.start()
+        return find
+    match = finder.match if finder is not None else None
+
+    def find(buffer, start, end):
+        while True:
+            position = buffer.find(literal, start, end)
+            if position == -1:
+                return -1
+            line = _line_start(buffer, start, position)
+            if match is None or match(buffer, line, end):
+                return line
+            start = buffer.find(b'\n', position, end) + 1
+            if not start:
+                return -1
+    return find
+
+
+def encoded_test(regex, encoding, anchored=False):
+    """
+    Like :py:func:`~raspador.prefilter.fast_test`, but the returned callable
+    receives blocks of bytes in ``encoding``. Blocks are decoded only when
+    ``regex`` cannot be translated for them, and after checking the encoded
+    required literals.
+    """
+    text_test = fast_test(regex, anchored)
+
+    def decoded_test(block):
+        return text_test(block.decode(encoding))
+
+    translated = translate(regex, encoding)
+    if translated is not None and not translated[1]:
+        return fast_test(translated[0], anchored)
+    if charmap(encoding) is None:
+        return decoded_test
+    prefix, literal = required_literals(regex, anchored)
+    try:
+        prefix = prefix.encode(encoding) if prefix is not None else None
+        literal = literal.encode(encoding) if literal is not None else None
+    except UnicodeEncodeError:
+        # no text in this encoding can match
+        return lambda block: False
+    if translated is not None:
+        bytes_test = fast_test(translated[0], anchored)
+
+        def test(block):
+            if NON_ASCII.search(block) is None:
+                return bytes_test(block)
+            return decoded_test(block)
+    else:
+        test = decoded_test
+    if prefix is not None:
+        return lambda block: block.startswith(prefix) and test(block)
+    if literal is not None:
+        return lambda block: block.find(literal) != -1 and test(block)
+    return test
@@ -12,7 +12,47 @@ for primitive types in Python.
 
 import re
 from datetime import datetime
-import collections
+
+from .cache import Memo
+from .encoding import translate
+from .item import Dictionary, Lazy, RawValues
+from .prefilter import required_literals
+
+
+def _converts_many(cls):
+    "Tells if ``cls`` overrides ``to_python_many`` along with ``to_python``."
+    for klass in cls.__mro__:
+        if 'to_python_many' in vars(klass):
+            return klass is not BaseField
+        if 'to_python' in vars(klass):
+            return False
+
+
+def _finds_by_regex(cls):
+    """
+    Tells if fields of ``cls`` find a value only where their regex matches:
+    they keep the ``_search_method`` and ``_is_valid_result`` of
+    :py:class:`BaseField` or :py:class:`BooleanField`.
+    """
+    for name in ('_search_method', '_is_valid_result'):
+        owner = next(klass for klass in cls.__mro__ if name in vars(klass))
+        if owner not in (BaseField, BooleanField):
+            return False
+    return True
+
+
+def _stock_item_hooks(cls):
+    """
+    Tells if the parser class ``cls`` assigns and finalizes items with the
+    stock methods, the only ones that expect unconverted
+    :py:class:`~raspador.item.RawValues` in items.
+    """
+    from .compiler import is_generated
+    from .matcher import _defining_class
+    from .parser import ParserMixin
+    return isinstance(cls, type) and issubclass(cls, ParserMixin) and \
+        _defining_class(cls, 'assign_value_into_item') is ParserMixin and \
+        is_generated(cls, 'finalize_item')
 
 
 class BaseField(object):
@@ -105,19 +145,67 @@ class BaseField(object):
         :py:class:`~raspador.parser.Parser` accumulates values
          returned by the field.
 
+    memo_size
+
+        When set, parsers keep the results of the field for the last
+        ``memo_size`` distinct blocks, including ``None`` for blocks not
+        matched, so repeated lines (separators, headers, footers) skip the
+        regex and the conversion. By default, the ``memo_size`` of the
+        parser class. Blocks share the same converted values, so memoized
+        fields should not return values that are changed later.
+
+    memo_eviction
+
+        ``'lru'`` (default) or ``'fifo'``, see
+        :py:class:`~raspador.cache.Memo`.
+
+    intern
+
+        When true, values are deduplicated through the
+        :py:class:`~raspador.cache.InternPool` of the parser class
+        (``intern_pool``, of ``intern_pool_size`` values), so that values
+        repeated along a stream, like units and tax codes, are kept once in
+        memory.
+
+    categorical
+
+        Interns values, and gives them as integer codes of the pool values
+        in columnar output (see
+        :py:class:`~raspador.columns.CategoricalColumn`).
+
+    List fields whose class overrides :py:meth:`to_python_many` (along with
+    ``to_python``) keep the values they find in a section unconverted, and
+    convert all of them at once when the item is finalized.
+
+    When the parser has ``lazy_conversion``, ``to_python`` and
+    ``input_processor`` run when the value is first read from the item, and
+    so a value they convert to ``None`` is ``None`` in the item, instead of
+    leaving the field to the next blocks or to its ``default``.
     """
+    lazy = False
+    batched = False
+
     def __init__(self, search=None, default=None, is_list=False,
-                 input_processor=None, groups=[]):
+                 input_processor=None, groups=[], memo_size=None,
+                 memo_eviction='lru', intern=False, categorical=False):
         self.search = search
         self.default = default
         self.is_list = is_list
         self.input_processor = input_processor
         self.groups = groups
-
-        if self.input_processor and \
-                not isinstance(self.input_processor, collections.Callable):
+        self.memo_size = memo_size
+        self.memo_eviction = memo_eviction
+        self.memos = {}
+        self.intern = intern or categorical
+        self.categorical = categorical
+        self.pool = None
+
+        if self.input_processor and not callable(self.input_processor):
             raise TypeError('input_processor is not callable.')
 
+        if memo_eviction not in Memo.evictions:
+            raise ValueError('unknown memo_eviction: %r' % (memo_eviction,))
+
         if not hasattr(self.groups, '__iter__'):
             self.groups = (self.groups,)
 
@@ -138,6 +226,11 @@ class BaseField(object):
         """
         self.parser = parser
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('parser', None)
+        return state
+
     def _is_valid_result(self, value):
         return bool(value)
 
@@ -158,6 +251,13 @@ class BaseField(object):
         """
         return value
 
+    def to_python_many(self, values):
+        """
+        Converts a list of parsed values, returning the list of the values
+        ``to_python`` would return for each of them.
+        """
+        return [self.to_python(value) for value in values]
+
     @property
     def search(self):
         return self._search
@@ -165,22 +265,146 @@ class BaseField(object):
     @search.setter
     def search(self, value):
         self._search = re.compile(value, re.UNICODE) if value else None
+        self._prefix, self._literal = required_literals(self._search) \
+            if self._search and _finds_by_regex(type(self)) else (None, None)
 
     def assign_class(self, cls, name):
         self.cls = cls
+        self.lazy = getattr(cls, 'lazy_conversion', False)
+        self.batched = bool(self.is_list) and not self.lazy and \
+            _converts_many(type(self)) and _stock_item_hooks(cls)
+        if self.memo_size is None:
+            self.memo_size = getattr(cls, 'memo_size', 0)
+        if self.intern:
+            self.pool = cls.intern_pool
 
     def parse_block(self, block):
         if self.search:
-            value = self._search_method(block)
-            if self._is_valid_result(value):
-                value = self._process_value(value)
-                value = self.to_python(value)
-                if self.input_processor:
-                    value = self.input_processor(value)
-                if value is not None and self.is_list \
-                        and not isinstance(value, list):
-                    value = [value]
-                return value
+            if self._literal is not None and (
+                    self._literal not in block or self._prefix is not None and
+                    not block.startswith(self._prefix)):
+                return None
+            return self._convert(self._search_method(block))
+
+    def memoize(self, parse, test=None, key=None):
+        """
+        Returns a function that returns ``parse(block)`` for blocks accepted
+        by ``test``, and ``None`` for others, kept in the
+        :py:class:`~raspador.cache.Memo` ``memos[key]`` of ``memo_size``
+        blocks. Lists are copied, as parsers extend them.
+        """
+        memo = self.memos.get(key)
+        if memo is None:
+            memo = self.memos[key] = Memo(self.memo_size, self.memo_eviction)
+        get = memo.get
+        if test is None:
+            compute = parse
+        else:
+            def tested(block):
+                return parse(block) if test(block) else None
+            compute = tested
+
+        def memoized(block):
+            value = get(block, compute)
+            if isinstance(value, list):
+                value = type(value)(value)
+            return value
+        return memoized
+
+    def _convert(self, value):
+        if self._is_valid_result(value):
+            value = self._process_value(value)
+            if self.lazy:
+                value = Lazy(self._to_python, value)
+            elif self.batched:
+                return RawValues([value])
+            else:
+                value = self._to_python(value)
+            if value is not None and self.is_list \
+                    and not isinstance(value, list):
+                value = [value]
+            return value
+
+    def _to_python(self, value):
+        value = self.to_python(value)
+        if self.input_processor:
+            value = self.input_processor(value)
+        if self.pool is not None:
+            value = self.pool.intern(value)
+        return value
+
+    def _to_python_many(self, values):
+        values = self.to_python_many(values)
+        if self.input_processor:
+            processed = []
+            for value in map(self.input_processor, values):
+                if isinstance(value, list):
+                    processed.extend(value)
+                elif value is not None:
+                    processed.append(value)
+            values = processed
+        if self.pool is not None:
+            values = list(map(self.pool.intern, values))
+        return values
+
+    def encoded_parser(self, encoding):
+        """
+        Returns ``(regex, parse, ascii_only)``, where ``parse`` does the same
+        as :py:meth:`parse_block` over a block of bytes in ``encoding``, by
+        running ``regex``, the translation of ``search`` to bytes, and
+        decoding only the captured groups. When ``ascii_only`` is true,
+        ``parse`` only accepts blocks made of ASCII.
+
+        Returns ``None`` when the regex cannot be translated to bytes (see
+        :py:mod:`raspador.encoding`).
+        """
+        method = self._search_method if self.search else None
+        if getattr(method, '__self__', None) is not self.search:
+            return None
+        translated = translate(self.search, encoding)
+        if translated is None:
+            return None
+        regex, ascii_only = translated
+        search = getattr(regex, method.__name__)
+        convert = self._convert
+
+        def parse(block):
+            return convert(_decode(search(block), encoding))
+        return regex, parse, ascii_only
+
+
+def _decode(value, encoding):
+    "Decodes the results of a bytes regex ``findall``, ``match`` or ``search``"
+    if isinstance(value, list):
+        return [tuple(v.decode(encoding) for v in item)
+                if isinstance(item, tuple) else item.decode(encoding)
+                for item in value]
+    if value is None:
+        return None
+    return DecodedMatch(value, encoding)
+
+
+class DecodedMatch(object):
+    "Wraps a bytes regex match object, decoding the captured groups."
+    def __init__(self, match, encoding):
+        self.match = match
+        self.encoding = encoding
+
+    def _decode(self, value, default=None):
+        return value.decode(self.encoding) if value is not None else default
+
+    def group(self, *args):
+        value = self.match.group(*args)
+        if isinstance(value, tuple):
+            return tuple(self._decode(v) for v in value)
+        return self._decode(value)
+
+    def groups(self, default=None):
+        return tuple(self._decode(v, default) for v in self.match.groups())
+
+    def groupdict(self, default=None):
+        return dict((k, self._decode(v, default))
+                    for k, v in self.match.groupdict().items())
 
 
 class StringField(BaseField):
@@ -188,6 +412,20 @@ class StringField(BaseField):
         return str(value).strip()
 
 
+def _join(values):
+    """
+    Returns the strings in ``values`` joined by new lines, or ``None`` if any
+    of them is not a string or has a new line.
+    """
+    try:
+        text = u'\n'.join(values)
+    except TypeError:
+        return None
+    if text.count(u'\n') != len(values) - 1:
+        return None
+    return text
+
+
 class FloatField(BaseField):
     """
     Sanitizes captured value according to thousand and decimal separators and
@@ -196,19 +434,39 @@ class FloatField(BaseField):
     default_thousand_separator = ','
     default_decimal_separator = '.'
 
-    def __init__(self, search, thousand_separator=None, decimal_separator=None,
-                 **kwargs):
+    def __init__(self, search=None, thousand_separator=None,
+                 decimal_separator=None, **kwargs):
         super(FloatField, self).__init__(search, **kwargs)
         self.thousand_separator = thousand_separator if thousand_separator \
             else self.default_thousand_separator
         self.decimal_separator = decimal_separator if decimal_separator \
             else self.default_decimal_separator
+        self._table = None
+        if len(self.thousand_separator) == len(self.decimal_separator) == 1 \
+                and self.thousand_separator != self.decimal_separator:
+            self._table = {ord(self.thousand_separator): None,
+                           ord(self.decimal_separator): u'.'}
 
     def to_python(self, value):
         value = value.replace(self.thousand_separator, '')
         value = value.replace(self.decimal_separator, '.')
         return float(value)
 
+    def to_python_many(self, values):
+        """
+        Sanitizes all ``values`` in one string, with a translation table of
+        the separators, and converts them to floats.
+        """
+        text = _join(values)
+        if text is None:
+            return super(FloatField, self).to_python_many(values)
+        if self._table is not None:
+            text = text.translate(self._table)
+        else:
+            text = text.replace(self.thousand_separator, '')
+            text = text.replace(self.decimal_separator, '.')
+        return list(map(float, text.split('\n')))
+
 
 class BRFloatField(FloatField):
     """
@@ -226,6 +484,9 @@ class IntegerField(BaseField):
     def to_python(self, value):
         return int(value)
 
+    def to_python_many(self, values):
+        return list(map(int, values))
+
 
 class BooleanField(BaseField):
     """
@@ -250,6 +511,117 @@ class BooleanField(BaseField):
         return bool(value)
 
 
+class MappingField(BaseField):
+    """
+    Converts the groups captured by ``search`` to an item (an
+    ``item_class``, :py:class:`~raspador.item.Dictionary` by default) with a
+    key for each of ``fields``, a list of ``(name, field)`` pairs, where
+    ``field`` converts the group (as ``IntegerField()``, including its
+    ``input_processor`` and ``intern``), or is ``None`` to keep it as
+    captured::
+
+        >>> field = MappingField(r'([0-9]+) (\\w+) ([0-9,]+)', [
+        ...     ('Item', IntegerField()),
+        ...     ('Codigo', None),
+        ...     ('Qtd', FloatField(thousand_separator='.',
+        ...                        decimal_separator=',')),
+        ... ], is_list=True)
+        >>> field.parse_block('001 7891 2,5')
+        [Dictionary([('Item', 1), ('Codigo', '7891'), ('Qtd', 2.5)])]
+
+    With ``is_list=True``, the values of each group in a section are
+    converted at once by ``to_python_many`` of its field.
+    """
+    def __init__(self, search, fields, item_class=Dictionary, **kwargs):
+        self.fields = list(fields)
+        self.item_class = item_class
+        super(MappingField, self).__init__(search, **kwargs)
+
+    def assign_class(self, cls, name):
+        super(MappingField, self).assign_class(cls, name)
+        for key, field in self.fields:
+            if field is not None:
+                field.assign_class(cls, '%s.%s' % (name, key))
+
+    def to_python(self, value):
+        return self.item_class(
+            (name, value if field is None else field._to_python(value))
+            for (name, field), value in zip(self.fields, value))
+
+    def to_python_many(self, values):
+        columns = [column if field is None else
+                   field._to_python_many(list(column))
+                   for (name, field), column in zip(self.fields,
+                                                    zip(*values))]
+        names = [name for name, field in self.fields]
+        item_class = self.item_class
+        return [item_class(zip(names, row)) for row in zip(*columns)]
+
+
+# strptime directives of zero padded numbers, in the order of the datetime
+# arguments they give, with their widths
+_FIXED_WIDTH_DIRECTIVES = [
+    ('Y', 'year', 4),
+    ('m', 'month', 2),
+    ('d', 'day', 2),
+    ('H', 'hour', 2),
+    ('M', 'minute', 2),
+    ('S', 'second', 2),
+]
+
+
+def fixed_width_strptime(format_string):
+    """
+    Returns a function that parses strings in ``format_string`` by slicing,
+    several times faster than :py:meth:`datetime.strptime`, when the format
+    is made only of zero padded numbers (``%Y``, ``%m``, ``%d``, ``%H``,
+    ``%M`` and ``%S``) and separators, or ``None`` for other formats.
+
+    The function returns ``None`` for strings that are not in the exact fixed
+    width form, as ``1/2/2013``, that :py:meth:`datetime.strptime` may still
+    accept::
+
+        >>> parse = fixed_width_strptime('%d/%m/%Y')
+        >>> parse('02/01/2013'), parse('2/1/2013')
+        (datetime.datetime(2013, 1, 2, 0, 0), None)
+    """
+    widths = dict((d, (name, width)) for d, name, width in
+                  _FIXED_WIDTH_DIRECTIVES)
+    args, checks, position = {}, [], 0
+    directives = iter(re.split('(%.)', format_string))
+    for literal in directives:
+        for char in literal:
+            if char.isdigit() or char == '%':
+                return None
+            checks.append('value[%d] != %r' % (position, char))
+            position += 1
+        directive = next(directives, None)
+        if directive is None:
+            break
+        name, width = widths.get(directive[1], (None, 0))
+        if name is None or name in args:
+            return None
+        args[name] = 'value[%d:%d]' % (position, position + width)
+        position += width
+    if not all(name in args for name in ('year', 'month', 'day')):
+        return None
+    checks.insert(0, 'len(value) != %d' % position)
+    names = [name for d, name, width in _FIXED_WIDTH_DIRECTIVES
+             if name in args]
+    source = '\n'.join([
+        'def parse(value):',
+        '    if %s:' % ' or '.join(checks),
+        '        return None',
+        '    if not (%s).isdigit():' % ' + '.join(args[n] for n in names),
+        '        return None',
+        '    return datetime(%s)' % ', '.join(
+            'int(%s)' % args[n] for n in names),
+    ])
+    namespace = {'datetime': datetime}
+    exec(source, namespace)
+    return namespace['parse']
+
+
 class DateField(BaseField):
     """
 
@@ -257,20 +629,47 @@ class DateField(BaseField):
     datetine.date.
 
         http://docs.python.org/library/datetime.html
+
+    Values in fixed width formats (see :py:func:`fixed_width_strptime`) are
+    parsed without :py:meth:`datetime.strptime`, and the last ``cache_size``
+    strings converted are kept with their results, as documents repeat the
+    same dates many times. ``cache_hits`` and ``cache_misses`` count the
+    lookups.
     """
 
     default_format_string = '%d/%m/%Y'
+    default_cache_size = 256
 
     def convertion_function(self, date):
         return datetime.date(date)
 
-    def __init__(self, search=None, format_string=None, **kwargs):
+    def __init__(self, search=None, format_string=None, cache_size=None,
+                 **kwargs):
         self.format_string = format_string \
             if format_string else self.default_format_string
+        self.cache_size = self.default_cache_size \
+            if cache_size is None else cache_size
+        self._cache = Memo(self.cache_size)
+        self._fixed_width = fixed_width_strptime(self.format_string)
         super(DateField, self).__init__(search=search, **kwargs)
 
+    @property
+    def cache_hits(self):
+        return self._cache.hits
+
+    @property
+    def cache_misses(self):
+        return self._cache.misses
+
     def to_python(self, value):
-        date_value = datetime.strptime(value, self.format_string)
+        return self._cache.get(value, self._to_date)
+
+    def _to_date(self, value):
+        date_value = None
+        if self._fixed_width is not None:
+            date_value = self._fixed_width(value)
+        if date_value is None:
+            date_value = datetime.strptime(value, self.format_string)
         return self.convertion_function(date_value)
 
 
@@ -0,0 +1,56 @@
+# coding: utf-8
+"""
+Helpers to read files as memory-mapped buffers of bytes.
+"""
+import mmap
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def mapped_file(path):
+    """
+    Maps the file at ``path`` in memory for reading. Empty files, that cannot
+    be mapped, give an empty bytes string.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def iter_lines(buffer, start=0, end=None):
+    """
+    Returns an iterator over the lines of ``buffer`` (a mapped file) from
+    ``start`` to ``end`` as bytes, keeping the ``\\n`` line endings.
+    """
+    if not buffer:
+        return iter(())
+    buffer.seek(start)
+    if end is None or end >= len(buffer):
+        # C level iteration, the common case
+        return iter(buffer.readline, b'')
+    return _iter_lines_until(buffer, end)
+
+
+def _iter_lines_until(buffer, end):
+    readline, tell = buffer.readline, buffer.tell
+    while tell() < end:
+        yield readline()
+
+
+def lines_before(buffer, start, position, count):
+    """
+    Returns the offset of the line ``count`` lines before the one at
+    ``position``, not going before ``start``. Both must be line offsets.
+    """
+    while count > 0 and position > start:
+        newline = buffer.rfind(b'\n', start, position - 1)
+        position = start if newline == -1 else newline + 1
+        count -= 1
+    return position
@@ -1,10 +1,17 @@
 # coding: utf-8
+import sys
+
 try:
     from collections import OrderedDict
 except ImportError:
     # Python 2.6 alternative
     from ordereddict import OrderedDict
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 
 class Dictionary(OrderedDict):
     """
@@ -15,3 +22,244 @@ class Dictionary(OrderedDict):
             return self[name]
         raise AttributeError("%s without attr '%s'" %
                              (type(self).__name__, name))
+
+
+class Lazy(object):
+    """
+    A captured value not converted yet, held by the items of parsers with
+    ``lazy_conversion``: ``convert(raw)`` returns the value.
+    """
+    __slots__ = ('convert', 'raw')
+
+    def __init__(self, convert, raw):
+        self.convert = convert
+        self.raw = raw
+
+    def __repr__(self):
+        return 'Lazy(%r)' % (self.raw,)
+
+
+class RawValues(list):
+    """
+    Values captured by a list field that converts them in batches, kept
+    unconverted in the item until it is finalized (see
+    :py:meth:`~raspador.fields.BaseField.to_python_many`).
+    """
+    __slots__ = ()
+
+
+def resolve(value):
+    """
+    Returns ``value`` converted if it is :py:class:`Lazy`. Lists are
+    converted in place; a value converted to a list is spliced into it, and
+    one converted to ``None`` is removed, as when converting eagerly.
+    """
+    if type(value) is Lazy:
+        return value.convert(value.raw)
+    if type(value) is list:
+        index = 0
+        while index < len(value):
+            element = value[index]
+            if type(element) is not Lazy:
+                index += 1
+                continue
+            element = element.convert(element.raw)
+            if element is None:
+                element = []
+            elif not isinstance(element, list):
+                element = [element]
+            value[index:index + 1] = element
+            index += len(element)
+    return value
+
+
+class LazyDictionary(Dictionary):
+    """
+    :py:class:`Dictionary` whose :py:class:`Lazy` values are converted on
+    first access, and kept converted. The item class of parsers with
+    ``lazy_conversion``.
+
+    Code that reads the dictionary directly, without ``__getitem__``, as
+    :py:func:`json.dumps`, must call :py:meth:`resolve` first.
+    """
+    def __getitem__(self, name):
+        value = OrderedDict.__getitem__(self, name)
+        if type(value) is Lazy:
+            value = value.convert(value.raw)
+            OrderedDict.__setitem__(self, name, value)
+        elif type(value) is list:
+            resolve(value)
+        return value
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def resolve(self):
+        "Converts all values, returning the dictionary."
+        for name in self:
+            self[name]
+        return self
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def __eq__(self, other):
+        if isinstance(other, LazyDictionary):
+            other.resolve()
+        return OrderedDict.__eq__(self.resolve(), other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return OrderedDict.__repr__(self.resolve())
+
+    def __reduce__(self):
+        return Dictionary, (self.items(),)
+
+
+class Record(MutableMapping):
+    """
+    Compact alternative to :py:class:`Dictionary`, with a ``__slots__``
+    attribute for each of a fixed set of keys, readable as attributes or as a
+    mapping. Keys not set are missing, as in a dictionary. Iteration follows
+    the order of the keys given to :py:func:`record_class`.
+
+    When a parser sets ``default_item_class = Record``, its metaclass
+    generates a record class with the names of its fields::
+
+        >>> from raspador import Parser, IntegerField
+        >>> class MyParser(Parser):
+        ...     default_item_class = Record
+        ...     COO = IntegerField(r'COO:([0-9]+)')
+        >>> list(MyParser().parse(iter(['COO:123'])))
+        [MyParserItem(COO=123)]
+
+    Items of such parsers only accept the names of its fields as keys.
+    """
+    __slots__ = ()
+    _fields = ()
+    _field_set = frozenset()
+    _template = None
+    _parser_class = None
+
+    def __init__(self, *args, **kwargs):
+        if args:
+            self.update(*args)
+        fields = self._field_set
+        for name, value in kwargs.items():
+            if name not in fields:
+                raise KeyError(name)
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        if name in self._field_set:
+            try:
+                return getattr(self, name)
+            except AttributeError:
+                pass
+        raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        if name not in self._field_set:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __delitem__(self, name):
+        if name not in self._field_set or not hasattr(self, name):
+            raise KeyError(name)
+        delattr(self, name)
+
+    def __contains__(self, name):
+        return name in self._field_set and hasattr(self, name)
+
+    def __iter__(self):
+        return (name for name in self._fields if hasattr(self, name))
+
+    def __len__(self):
+        return sum(1 for name in self)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % item for item in self.items()))
+
+    def __reduce__(self):
+        items = list(self.items())
+        if self._parser_class is not None:
+            return _parser_record, (self._parser_class, items)
+        return _record, (type(self), items)
+
+
+def _record(cls, items):
+    record = cls()
+    for name, value in items:
+        record[name] = value
+    return record
+
+
+def _parser_record(parser_class, items):
+    return _record(parser_class.default_item_class, items)
+
+
+def record_class(name, fields, base=Record, module=None):
+    """
+    Returns a subclass of ``base`` (a :py:class:`Record`) named ``name``,
+    with a slot for each name in ``fields``. Useful to return the values of
+    fields with many groups::
+
+        >>> Item = record_class('Item', ['Codigo', 'Qtd'])
+        >>> item = Item(Codigo='872', Qtd=2.0)
+        >>> item.Qtd, item['Codigo'], 'Preco' in item
+        (2.0, '872', False)
+    """
+    fields = tuple(fields)
+    clashes = [field for field in fields if hasattr(base, field)]
+    if clashes:
+        raise ValueError('%s: field names clash with %s attributes: %s' % (
+            name, base.__name__, ', '.join(clashes)))
+    if module is None:
+        try:
+            module = sys._getframe(1).f_globals.get('__name__', '__main__')
+        except (AttributeError, ValueError):
+            module = base.__module__
+    return type(str(name), (base,), {
+        '__slots__': fields,
+        '__module__': module,
+        '_fields': fields,
+        '_field_set': frozenset(fields),
+        '_template': base,
+    })
+
+
+def parser_item_class(cls):
+    """
+    Returns the item class of the parser class ``cls``: its
+    ``default_item_class``, or a record class generated with the names of its
+    fields when ``default_item_class`` is a :py:class:`Record` without
+    fields (or a record generated for a base parser). Parsers with
+    ``lazy_conversion`` get a :py:class:`LazyDictionary`.
+    """
+    item_class = cls.default_item_class
+    if getattr(cls, 'lazy_conversion', False):
+        if item_class is Dictionary:
+            return LazyDictionary
+        if not isinstance(item_class, type) or \
+                not issubclass(item_class, LazyDictionary):
+            raise TypeError('%s: lazy_conversion needs a LazyDictionary '
+                            'item class' % cls.__name__)
+    if not isinstance(item_class, type) or \
+            not issubclass(item_class, Record):
+        return item_class
+    if item_class._parser_class is not None:
+        item_class = item_class._template
+    elif item_class._fields:
+        return item_class
+    record = record_class(cls.__name__ + 'Item', list(cls.fields),
+                          base=item_class, module=cls.__module__)
+    record._parser_class = cls
+    return record
@@ -0,0 +1,248 @@
+# coding: utf-8
+"""
+Matchers let a :py:class:`~raspador.parser.Parser` find out which of its
+fields match a block before running any field code, so that only the matching
+fields pay for capturing and converting values.
+"""
+import re
+
+from .fields import BaseField, BooleanField
+from .prefilter import fast_test, sre_parse, sre_constants
+
+
+def _defining_class(cls, name):
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass
+
+
+def combinable_pattern(field):
+    """
+    Returns ``(regex, anchored)`` when the result of ``field.parse_block``
+    depends only on its regex matching the block, or ``None`` when the field
+    must be evaluated on its own.
+    """
+    if not isinstance(field, BaseField) or field.search is None:
+        return None
+    cls = type(field)
+    if _defining_class(cls, 'parse_block') is not BaseField or \
+            _defining_class(cls, '_is_valid_result') not in (BaseField,
+                                                             BooleanField):
+        return None
+    search_method = _defining_class(cls, '_search_method')
+    if search_method is BaseField:
+        anchored = False
+    elif search_method is BooleanField:
+        anchored = True
+    else:
+        return None
+    return field.search, anchored
+
+
+# matched by the text of many lines, they could see other lines than their own
+_NOT_LOCAL = (sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+_NOT_LOCAL_AT = (sre_constants.AT_BEGINNING_STRING,
+                 sre_constants.AT_END_STRING)
+
+
+def _opcodes(items):
+    "Yields the opcodes of a parsed pattern, those in groups included."
+    for op, av in items:
+        yield op, av
+        for value in av if isinstance(av, (tuple, list)) else (av,):
+            if isinstance(value, sre_parse.SubPattern):
+                for inner in _opcodes(value):
+                    yield inner
+            elif isinstance(value, (tuple, list)):
+                for inner in value:
+                    if isinstance(inner, sre_parse.SubPattern):
+                        for opcode in _opcodes(inner):
+                            yield opcode
+
+
+def line_local(regex):
+    """
+    Tells if what ``regex`` matches in a line does not depend on other
+    lines, once matches that span lines are discarded: it has no lookarounds
+    and no ``\\A`` or ``\\Z``.
+    """
+    try:
+        items = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return False
+    for op, av in _opcodes(items):
+        if op in _NOT_LOCAL or op is sre_constants.AT and av in _NOT_LOCAL_AT:
+            return False
+    return True
+
+
+def _min_width(regex):
+    "Returns the length of the shortest text ``regex`` can match."
+    try:
+        return sre_parse.parse(regex.pattern, regex.flags).getwidth()[0]
+    except Exception:
+        return 0
+
+
+def _end_of_line(pattern):
+    """
+    Returns ``pattern`` with each ``$`` also matching right after a new line,
+    where ``$`` matches when a block ended by a new line is given alone, as
+    in ``\\s+$``.
+    """
+    result = []
+    position, size = 0, len(pattern)
+    in_class = False
+    while position < size:
+        char = pattern[position]
+        position += 1
+        if char == '\\':
+            char += pattern[position:position + 1]
+            position += 1
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # a ] right after [ or [^ is a member of the class
+            for prefix in ('^', ']'):
+                if pattern.startswith(prefix, position):
+                    char += prefix
+                    position += 1
+        elif char == '$':
+            char = r'(?:$|(?<=\n))'
+        result.append(char)
+    return ''.join(result)
+
+
+def record_pattern(field):
+    """
+    Returns ``(regex, anchored)`` to evaluate ``field`` once over the text of
+    many lines, as the sections of parsers in ``record_mode``: its regex in
+    multiline mode, anchored at the start of lines when the field matches
+    blocks from their start, and with ``$`` also matching after the new line
+    of a line, as it does at the end of a block. Returns ``None`` when the
+    field must be given each block: when its regex could match differently
+    in a line of such a text (see :py:func:`line_local`), or match empty
+    texts, that are found once more at the end of each block.
+    """
+    combinable = combinable_pattern(field)
+    if combinable is None:
+        return None
+    regex, anchored = combinable
+    if regex.flags & re.VERBOSE or not line_local(regex) or \
+            not _min_width(regex):
+        return None
+    pattern = _end_of_line(regex.pattern)
+    if anchored:
+        pattern = '^(?:%s)' % pattern
+    return re.compile(pattern, regex.flags | re.MULTILINE), anchored
+
+
+def _line_end(text, position):
+    end = text.find(u'\n', position)
+    return len(text) if end == -1 else end + 1
+
+
+def line_values(field, regex, anchored, text, reparse, spanning=False,
+                added=()):
+    """
+    Yields ``(line, value)`` for the lines of ``text`` where ``field`` finds
+    a value with its :py:func:`record_pattern` ``regex``, ``line`` being the
+    offset of the line. Matches in the same line give a single value, as
+    when the line is given alone. A match that spans lines gives a value of
+    its own with ``spanning``; otherwise the line gives ``reparse(line)``,
+    the value of the line alone, as do lines where a match takes a new line
+    at an offset in ``added``, that the line did not have.
+    """
+    rfind, find = text.rfind, text.find
+    convert = field._convert
+    # a match at the end of a text ended by a new line is in no line
+    size = len(text) if text.endswith(u'\n') else None
+    position = 0
+    line = found = None
+    while position is not None:
+        restart = None
+        for match in regex.finditer(text, position):
+            start, end = match.span()
+            if start == size:
+                break
+            start_line = rfind(u'\n', 0, start) + 1
+            if start_line != line:
+                if found:
+                    value = convert(found[0] if anchored else found)
+                    if value is not None:
+                        yield line, value
+                line, found = start_line, []
+            if find(u'\n', start, end - 1) != -1:
+                if spanning:
+                    value = convert(match if anchored else [_found(match)])
+                    if value is not None:
+                        yield line, value
+                    continue
+            elif end - 1 not in added:
+                found.append(match if anchored else _found(match))
+                continue
+            value = reparse(line)
+            if value is not None:
+                yield line, value
+            found = None
+            restart = _line_end(text, start)
+            break
+        position = restart
+    if found:
+        value = convert(found[0] if anchored else found)
+        if value is not None:
+            yield line, value
+
+
+def _found(match):
+    "Returns what ``findall`` gives for ``match``."
+    groups = match.groups('')
+    if not groups:
+        return match.group(0)
+    return groups[0] if len(groups) == 1 else groups
+
+
+class FieldMatcher(object):
+    """
+    Tests all regex based fields of a parser against a block at once.
+
+    Each combinable field contributes a test of its regex (see
+    :py:func:`~raspador.prefilter.fast_test`) to ``tests``, a mapping of field
+    name to a callable that returns a false value when the field would return
+    ``None`` for the block. This spares ``parse_block``, ``_process_value``
+    and ``to_python`` calls on fields that do not match.
+
+    Fields that cannot be combined (custom ``parse_block``, proxies, nested
+    parsers) are left out and must be evaluated
+    by the caller as usual.
+
+    .. note::
+
+        Joining all patterns into a single alternation was measured to be
+        several times slower than this on CPython, as the regex engine only
+        applies its literal prefix optimizations to individual patterns.
+    """
+    def __init__(self, fields):
+        tests = []
+        for name, field in fields:
+            combinable = combinable_pattern(field)
+            if combinable:
+                regex, anchored = combinable
+                tests.append((name, fast_test(regex, anchored)))
+        self._tests = tuple(tests)
+        self.tests = dict(tests)
+        self.names = frozenset(self.tests)
+
+    def __bool__(self):
+        return bool(self.tests)
+
+    __nonzero__ = __bool__
+
+    def misses(self, block):
+        """
+        Returns the names of combined fields whose pattern does not match
+        ``block``, and hence that do not need to be evaluated for it.
+        """
+        return frozenset([name for name, test in self._tests
+                          if not test(block)])
@@ -0,0 +1,193 @@
+# coding: utf-8
+"""
+Runtime metrics of a parser, cheap enough to leave on in long running
+ingestion: counters updated for each block, and a clock read only when an
+item opens and closes.
+
+Assign a :py:class:`Metrics` to ``parser.metrics`` to have it updated by
+:py:meth:`~raspador.parser.ParserMixin.parse`,
+:py:meth:`~raspador.parser.ParserMixin.parse_file` and
+:py:meth:`~raspador.parser.ParserMixin.parse_async`. A ``callback`` is
+called with the metrics every ``interval`` seconds and at the end of each
+stream, for example to export them to a file read by the Prometheus node
+exporter::
+
+    >>> parser.metrics = Metrics(callback=lambda metrics: metrics.export(
+    ...     'raspador.prom', 'prometheus'))          # doctest: +SKIP
+"""
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+#: Blocks parsed between checks of the callback ``interval``.
+CHECK_EVERY = 1024
+
+_COUNTERS = [
+    ('blocks', 'Blocks given to the parser.'),
+    ('bytes', 'Size of the blocks given to the parser (characters for '
+              'decoded blocks).'),
+    ('items', 'Items emitted.'),
+    ('sections', 'Sections (items) opened.'),
+    ('unclosed_sections', 'Sections open at the end of a stream, '
+                          'without an end.'),
+]
+
+_GAUGES = [
+    ('items_per_second', 'Items emitted per second since the first block.'),
+    ('current_item_blocks', 'Blocks of the item being parsed.'),
+    ('item_latency_seconds_max', 'Longest time from begin to end of an '
+                                 'item.'),
+]
+
+
+class Metrics(object):
+    """
+    Counts blocks, bytes, items and sections (opened, and left open at the
+    end of a stream) of a parser, and the latency of items from the block
+    that opened them to the one that closed them.
+
+    A :py:class:`Metrics` can be shared by the sessions of a parser, that
+    keep the state of their current item themselves.
+    """
+    def __init__(self, callback=None, interval=10.0):
+        self.callback = callback
+        self.interval = interval
+        self.parser_name = None
+        self.blocks = 0
+        self.bytes = 0
+        self.items = 0
+        self.sections = 0
+        self.unclosed_sections = 0
+        self.item_latency_seconds_sum = 0.0
+        self.item_latency_seconds_count = 0
+        self.item_latency_seconds_max = 0.0
+        self.started = None
+        self._parser = None
+        self._countdown = CHECK_EVERY
+        self._next_callback = None
+
+    def block(self, parser, block, res):
+        "Counts a block given to ``parser``, that returned ``res``."
+        self.blocks += 1
+        self.bytes += len(block)
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._check()
+        if parser._item_started is None:
+            if parser.item is None and not res:
+                return
+            self._open(parser)
+        parser._item_blocks += 1
+        if parser.item is None:
+            self._close(parser, res)
+
+    def finish(self, parser, res):
+        """
+        Counts the end of the stream, where ``parser`` was finalized and
+        returned ``res``.
+        """
+        if parser._item_started is not None:
+            if parser.has_search_end:
+                self.unclosed_sections += 1
+            self._close(parser, res)
+        elif res:
+            self.items += 1
+        self.notify()
+
+    def _open(self, parser):
+        if self.started is None:
+            self.started = _timer()
+            self.parser_name = type(parser).__name__
+        parser._item_started = _timer()
+        parser._item_blocks = 0
+        self._parser = parser
+        self.sections += 1
+
+    def _close(self, parser, res):
+        latency = _timer() - parser._item_started
+        parser._item_started = None
+        self.item_latency_seconds_sum += latency
+        self.item_latency_seconds_count += 1
+        if latency > self.item_latency_seconds_max:
+            self.item_latency_seconds_max = latency
+        if res:
+            self.items += 1
+
+    def _check(self):
+        self._countdown = CHECK_EVERY
+        if self.callback is not None and (self._next_callback is None or
+                                          _timer() >= self._next_callback):
+            self.notify()
+
+    def notify(self):
+        "Calls the callback, if any."
+        if self.callback is not None:
+            self._next_callback = _timer() + self.interval
+            self.callback(self)
+
+    @property
+    def items_per_second(self):
+        if self.started is None:
+            return 0.0
+        elapsed = _timer() - self.started
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def current_item_blocks(self):
+        "Blocks of the item being parsed by the last parser to open one."
+        parser = self._parser
+        if parser is None or parser._item_started is None:
+            return 0
+        return parser._item_blocks
+
+    def as_dict(self):
+        data = OrderedDict([('parser', self.parser_name)])
+        for name, help in _COUNTERS + _GAUGES:
+            data[name] = getattr(self, name)
+        data['item_latency_seconds_sum'] = self.item_latency_seconds_sum
+        data['item_latency_seconds_count'] = self.item_latency_seconds_count
+        return data
+
+    def prometheus(self):
+        "Returns the metrics in the Prometheus text format."
+        labels = '{parser="%s"}' % (self.parser_name or '')
+        lines = []
+
+        def add(name, kind, help, *samples):
+            name = 'raspador_' + name
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for suffix, value in samples:
+                lines.append('%s%s%s %r' % (name, suffix, labels, value))
+
+        for name, help in _COUNTERS:
+            add(name + '_total', 'counter', help, ('', getattr(self, name)))
+        for name, help in _GAUGES:
+            add(name, 'gauge', help, ('', float(getattr(self, name))))
+        add('item_latency_seconds', 'summary',
+            'Time from begin to end of items.',
+            ('_sum', self.item_latency_seconds_sum),
+            ('_count', self.item_latency_seconds_count))
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, format='json'):
+        """
+        Writes the metrics to the file at ``path``, as ``json`` or in the
+        ``prometheus`` text format. The file is replaced at once, so readers
+        never see it half written.
+        """
+        if format == 'prometheus':
+            data = self.prometheus()
+        elif format == 'json':
+            data = json.dumps(self.as_dict(), indent=2)
+        else:
+            raise ValueError('unknown format: %r' % format)
+        if not isinstance(data, type(u'')):
+            data = data.decode('utf-8')
+        with io.open(path + '.tmp', 'w') as f:
+            f.write(data)
+        getattr(os, 'replace', os.rename)(path + '.tmp', path)
@@ -0,0 +1,285 @@
+# coding: utf-8
+"""
+Parsing in many processes: of one file, split in shards at section
+boundaries (:py:func:`parse_parallel`), or of many files
+(:py:func:`parse_many`).
+
+A parser with ``begin`` and ``end`` is only affected by the lines of a
+section and by the ``number_of_blocks_in_cache`` lines before it. So the file
+can be split at ``begin`` lines that are out of any section, and each shard
+parsed by a new parser. The state at a line is found looking back from it: a
+section is open at a line if a ``begin`` line comes after the last ``end``
+line before it.
+"""
+import multiprocessing
+import traceback
+
+from .compiler import encoded_parse_block, begin_finder
+from .encoding import encoded_test, line_finder
+from .files import mapped_file, iter_lines, lines_before
+
+
+def _next_line(buffer, offset, end):
+    newline = buffer.find(b'\n', offset, end)
+    return end if newline == -1 else newline + 1
+
+
+def find_line(buffer, start, end, test, find=None):
+    """
+    Returns the offset of the first line of ``buffer[start:end]`` accepted by
+    ``test``, or ``-1``. ``find`` is a
+    :py:func:`~raspador.encoding.line_finder` for the same pattern, used to
+    skip lines in C.
+    """
+    while start < end:
+        if find is None:
+            for line in iter_lines(buffer, start, end):
+                if test(line):
+                    return start
+                start += len(line)
+            return -1
+        start = find(buffer, start, end)
+        if start == -1:
+            return -1
+        next_start = _next_line(buffer, start, end)
+        if test(buffer[start:next_start]):
+            return start
+        start = next_start
+    return -1
+
+
+def last_line(buffer, start, end, test, find=None, size=1 << 16):
+    """
+    Returns the offset of the last line of ``buffer[start:end]`` accepted by
+    ``test``, or ``-1``, searching forward in chunks from ``end`` backwards.
+    """
+    while end > start:
+        newline = buffer.rfind(b'\n', start, max(start, end - size))
+        chunk = start if newline == -1 else newline + 1
+        found, position = -1, chunk
+        while True:
+            position = find_line(buffer, position, end, test, find)
+            if position == -1:
+                break
+            found, position = position, _next_line(buffer, position, end)
+        if found != -1:
+            return found
+        end, size = chunk, size * 2
+    return -1
+
+
+class Sharder(object):
+    """
+    Splits a buffer with text in ``encoding`` into shards that can be parsed
+    independently by ``parser_class``.
+    """
+    def __init__(self, parser_class, buffer, encoding):
+        self.parser_class = parser_class
+        self.buffer = buffer
+        if parser_class.has_search_begin:
+            self.begin = (encoded_test(parser_class._begin, encoding, True),
+                          line_finder(parser_class._begin, encoding))
+        if parser_class.has_search_end:
+            self.end = (encoded_test(parser_class._end, encoding, True),
+                        line_finder(parser_class._end, encoding))
+
+    @property
+    def by_sections(self):
+        cls = self.parser_class
+        return cls.has_search_begin and cls.has_search_end
+
+    @property
+    def by_lines(self):
+        cls = self.parser_class
+        return not cls.has_search_begin and not cls.has_search_end and \
+            cls.yield_item_to_each_field_value_found
+
+    def first(self, pattern, start, end=None):
+        end = len(self.buffer) if end is None else end
+        return find_line(self.buffer, start, end, *pattern)
+
+    def last(self, pattern, start, end):
+        return last_line(self.buffer, start, end, *pattern)
+
+    def is_open(self, offset):
+        "Tells if a section is open before the line at ``offset``."
+        closed = self.last(self.end, 0, offset)
+        closed = 0 if closed == -1 else self.next_line(closed)
+        return self.last(self.begin, closed, offset) != -1
+
+    def next_line(self, offset):
+        return _next_line(self.buffer, offset, len(self.buffer))
+
+    def section_boundary(self, offset):
+        """
+        Returns the offset of the first ``begin`` line from ``offset`` that
+        is out of any section, or ``-1``.
+        """
+        while True:
+            begin = self.first(self.begin, offset)
+            if begin == -1 or not self.is_open(begin):
+                return begin
+            closed = self.first(self.end, begin)
+            if closed == -1:
+                return -1
+            offset = self.next_line(closed)
+
+    def lookbehind(self, begin):
+        """
+        Returns the offset from where the lines before the ``begin`` line
+        would be in the cache of a parser.
+        """
+        count = self.parser_class.number_of_blocks_in_cache
+        start = lines_before(self.buffer, 0, begin, count)
+        end = begin
+        while True:
+            # the cache starts after the line that closed the last section
+            closed = self.last(self.end, start, end)
+            if closed == -1:
+                return start
+            line = self.buffer[closed:self.next_line(closed)]
+            if self.begin[0](line) or self.is_open(closed):
+                return self.next_line(closed)
+            end = closed
+
+    def shards(self, count):
+        """
+        Returns a list of ``(start, end)`` offsets of at most ``count``
+        shards.
+        """
+        size = len(self.buffer)
+        if not size:
+            return []
+        if not self.by_sections and not self.by_lines:
+            return [(0, size)]
+        splits = []
+        for index in range(1, count):
+            offset = self.next_line(max(0, size * index // count - 1))
+            if self.by_sections and offset < size:
+                offset = self.section_boundary(offset)
+            if 0 < offset < size:
+                splits.append(offset)
+        splits = sorted(set(splits))
+        starts = [0] + [self.lookbehind(offset) if self.by_sections
+                        else offset for offset in splits]
+        return list(zip(starts, splits + [size]))
+
+
+def parse_shard(args):
+    "Parses a shard of a file with a new parser, returning a list of items."
+    parser_class, path, encoding, start, end = args
+    parser = parser_class()
+    with mapped_file(path) as buffer:
+        return list(parser._parse_buffer(
+            buffer, encoded_parse_block(parser_class, encoding),
+            begin_finder(parser_class, encoding), start, end))
+
+
+def parse_parallel(parser, path, workers=None, encoding='utf-8',
+                   ordered=True, shards=None):
+    """
+    Implements :py:meth:`~raspador.parser.ParserMixin.parse_parallel`.
+    """
+    parser_class = type(parser)
+    if encoded_parse_block(parser_class, encoding) is None:
+        for item in parser.parse_file(path, encoding):
+            yield item
+        return
+    workers = workers or multiprocessing.cpu_count()
+    with mapped_file(path) as buffer:
+        offsets = Sharder(parser_class, buffer, encoding).shards(
+            shards or workers * 4)
+    tasks = [(parser_class, path, encoding, start, end)
+             for start, end in offsets]
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            for item in parse_shard(task):
+                yield item
+        return
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        results = (pool.imap if ordered else pool.imap_unordered)(
+            parse_shard, tasks)
+        for items in results:
+            for item in items:
+                yield item
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class ParseError(Exception):
+    """
+    Error raised while parsing the file at ``path`` in :py:func:`parse_many`,
+    with the representation and the formatted traceback of the original
+    error, that may not be picklable.
+    """
+    def __init__(self, path, error, traceback=''):
+        super(ParseError, self).__init__(path, error, traceback)
+        self.path = path
+        self.error = error
+        self.traceback = traceback
+
+    def __str__(self):
+        return '%s: %s' % (self.path, self.error)
+
+
+def parse_path(parser, path, encoding):
+    """
+    Parses the file at ``path`` with ``parser``, returning ``(path, items)``.
+    An error ends the items with a :py:class:`ParseError`.
+    """
+    parser.reset()
+    items = []
+    try:
+        for item in parser.parse_file(path, encoding):
+            items.append(item)
+    except Exception as e:
+        items.append(ParseError(path, repr(e), traceback.format_exc()))
+    return path, items
+
+
+_worker = None
+
+
+def _init_worker(parser_class, encoding):
+    global _worker
+    _worker = parser_class(), encoding
+
+
+def _parse_in_worker(path):
+    parser, encoding = _worker
+    return parse_path(parser, path, encoding)
+
+
+def parse_many(parser_class, paths, workers=None, chunksize=1,
+               encoding='utf-8'):
+    """
+    Parses the files in ``paths`` with ``parser_class`` in ``workers``
+    processes (by default, one for each CPU), each one with its own parser,
+    yielding ``(path, item)`` pairs for each file as soon as it is parsed.
+    Files are sent to the processes in groups of ``chunksize``.
+
+    Errors do not stop the batch: the items of a file that failed end with a
+    ``(path, ParseError)`` pair.
+
+        >>> for path, item in parse_many(MyParser, paths):  # doctest: +SKIP
+        ...     if isinstance(item, ParseError):
+        ...         log.error(item.traceback)
+    """
+    if workers == 1:
+        parser = parser_class()
+        results = (parse_path(parser, path, encoding) for path in paths)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _init_worker,
+                                    (parser_class, encoding))
+        results = pool.imap_unordered(_parse_in_worker, paths, chunksize)
+    try:
+        for path, items in results:
+            for item in items:
+                yield path, item
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
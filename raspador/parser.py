@@ -1,18 +1,43 @@
 # coding: utf-8
 # from __future__ import unicode_literals
+import bisect
+import copy
+import io
 import re
 import weakref
-import collections
 import logging
 
-from .cache import Cache
-from .item import Dictionary
+from .cache import Cache, InternPool
+from .columns import to_columns
+from .compiler import compile_parser, encoded_parse_block, begin_finder, \
+    is_generated
+from .files import mapped_file, iter_lines, lines_before
+from .item import Dictionary, RawValues, parser_item_class
+from .matcher import FieldMatcher, line_values
+from .parallel import parse_parallel
+from .prefilter import fast_test
+from .scan import scan_plan, scan_buffer
 
 logger = logging.getLogger(__name__)
 if hasattr(logging, 'NullHandler'):
     logger.addHandler(logging.NullHandler())
 
 
+def _bind_entry(entry, field, key):
+    """
+    Returns the plan ``entry`` for ``key`` bound to ``field``, a field of a
+    session. Fields can bind it themselves with a ``bind_plan_entry(entry,
+    key)`` method.
+    """
+    bind = getattr(field, 'bind_plan_entry', None)
+    if bind is not None:
+        return bind(entry, key)
+    if isinstance(field, ParserMixin):
+        return entry._replace(parse=field.parse_block,
+                              test=field._nested_test())
+    return entry._replace(parse=field.parse_block)
+
+
 class ParserMixin(object):
     """
     A mixin that holds all base parser implementation.
@@ -21,13 +46,139 @@ class ParserMixin(object):
     number_of_blocks_in_cache = 0
     default_item_class = Dictionary
     yield_item_to_each_field_value_found = False
+    combine_field_patterns = True
+    skip_ahead = True
+    flat_scan = True
+    lazy_conversion = False
+    record_mode = False
+    memo_size = 0
+    intern_pool_size = 65536
+    metrics = None
     begin = None
     end = None
 
     def __init__(self):
+        # fields are shared by all instances, and may be in the middle of
+        # a parse of another instance: only reset() restores them
+        self._reset_state()
+        self._assign_parser_to_fields()
+
+    _session_fields = None
+    _item_ends = ()
+
+    def session(self, only=None, exclude=None):
+        """
+        Returns a new parse session: an object that parses like this parser,
+        but holds its own parse state, including the state of fields that
+        keep one (fields with a ``session`` method, like nested parsers and
+        :py:class:`~raspador.decorators.UnionUntilRegexProxy`).
+
+        Sessions share the compiled definition of the parser, so they are
+        cheap to create, and many of them can parse different streams at the
+        same time, as in a thread pool.
+
+        A session can evaluate a projection of the fields: only the names in
+        ``only`` (all fields by default), except those in ``exclude``. Other
+        fields, nested parsers included, never see a block, and their values
+        (or defaults) are missing from the items.
+        """
+        names = self._projection(only, exclude)
+        fields = dict((name, field) for name, field in self.fields.items()
+                      if name in names)
+        session = copy.copy(self)
+        session._session_fields = dict(
+            (name, field.session()) for name, field in fields.items()
+            if hasattr(field, 'session'))
+        session.fields = dict(fields, **session._session_fields)
+        session._bound_plans = {}
+        session._bound_finalize_plan = None
+        session.reset()
+        return session
+
+    def _projection(self, only, exclude):
+        "Returns the names of the fields of a projection, see ``session``."
+        names = set(self.fields if only is None else only)
+        exclude = set(exclude or ())
+        unknown = names.union(exclude).difference(self.fields)
+        if unknown:
+            raise ValueError('%s has no fields %s' % (
+                type(self).__name__, ', '.join(sorted(unknown))))
+        return names - exclude
+
+    def _projected(self, only, exclude):
+        "Returns a session with a projection of the fields, or this parser."
+        if only is None and exclude is None:
+            return self
+        return self.session(only, exclude)
+
+    def _session_plan(self, key):
+        "Returns the field plan for ``key`` with the fields of this session."
+        plan = self._bound_plans.get(key)
+        if plan is None:
+            fields = self._session_fields
+            plan = self._bound_plans[key] = tuple(
+                _bind_entry(entry, fields[entry.name], key)
+                if entry.name in fields else entry
+                for entry in self._plans[key] if entry.name in self.fields)
+        return plan
+
+    def _session_finalize_plan(self):
+        "Returns the finalize plan with the fields of this session."
+        if self._bound_finalize_plan is None:
+            fields = self._session_fields
+            self._bound_finalize_plan = tuple(
+                entry._replace(field=fields[entry.name],
+                               finalize=getattr(fields[entry.name],
+                                                'finalize', None),
+                               convert=entry.convert and
+                               fields[entry.name]._to_python_many)
+                if entry.name in fields else entry
+                for entry in self._finalize_plan if entry.name in self.fields)
+        return self._bound_finalize_plan
+
+    def reset(self):
+        """
+        Restores the initial state of the parser and of its fields, so it can
+        parse a new stream.
+        """
+        self._reset_state()
+        for field in self.fields.values():
+            if hasattr(field, 'reset'):
+                field.reset()
+
+    def _reset_state(self):
+        "Restores the initial state of the parser, but not of its fields."
         self.begin_found = not self.has_search_begin
         self.cache = Cache(self.number_of_blocks_in_cache + 1)
-        self._assign_parser_to_fields()
+        self.item = None
+        self._record = None
+        self._active = ()
+        self._item_started = None
+        self._item_blocks = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # fields still active are kept by name and the plan they came from
+        active = state.pop('_active')
+        state.pop('_bound_plans', None)
+        state.pop('_bound_finalize_plan', None)
+        plans = dict(self._plans)
+        plans.update(self.__dict__.get('_bound_plans', {}))
+        for key, plan in plans.items():
+            if active and active[0] in plan:
+                state['_active'] = key, [entry.name for entry in active]
+        return state
+
+    def __setstate__(self, state):
+        key, names = state.pop('_active', (None, ()))
+        self.__dict__.update(state)
+        if self._session_fields is None:
+            plan = self._plans.get(key, ())
+        else:
+            self._bound_plans = {}
+            self._bound_finalize_plan = None
+            plan = self._session_plan(key) if key in self._plans else ()
+        self._active = tuple(entry for entry in plan if entry.name in names)
 
     def _assign_parser_to_fields(self):
         """
@@ -38,33 +189,204 @@ class ParserMixin(object):
             if hasattr(item, 'assign_parser'):
                 item.assign_parser(ref)
 
-    def parse(self, iterator):
-        for item in self.parse_iterator(iterator):
+    def parse(self, iterator, only=None, exclude=None):
+        """
+        Yields the items found in ``iterator``, an iterator of blocks (lines).
+
+        With ``only`` or ``exclude``, only a projection of the fields is
+        evaluated, by a :py:meth:`session` of the parser::
+
+            >>> parser.parse(f, only=['COO', 'Total'])  # doctest: +SKIP
+        """
+        parser = self._projected(only, exclude)
+        for item in parser.parse_iterator(iterator):
             yield item
 
+    def parse_file(self, path, encoding='utf-8', only=None, exclude=None):
+        """
+        Parses the file at ``path``, yielding the same items as
+        ``parse(io.open(path, encoding=encoding, newline='\\n'), only,
+        exclude)``.
+
+        For ASCII compatible encodings (single byte ones and UTF-8), the file
+        is memory-mapped and ``begin``, ``end`` and the regex based fields are
+        run as bytes regexes over its lines, so that only captured groups and
+        the blocks given to other fields are decoded. Lines outside sections
+        are never decoded, so their encoding errors are not reported.
+
+        While ``begin`` is not found, the file is searched for the next line
+        it may match in C, and the lines in between are not given to
+        ``parse_block``, except the last ``number_of_blocks_in_cache`` ones
+        (see ``skip_ahead``).
+
+        Parsers without ``begin`` and ``end`` that yield an item for each
+        value found, and whose fields are all regex based, scan chunks of
+        the file with the regex of each field instead (see ``flat_scan`` and
+        :py:mod:`raspador.scan`).
+        """
+        parser = self._projected(only, exclude)
+        plan = scan_plan(parser, encoding)
+        if plan is not None:
+            with mapped_file(path) as buffer:
+                for item in scan_buffer(parser, plan, buffer, encoding):
+                    yield item
+            return
+        parse_encoded_block = encoded_parse_block(type(self), encoding)
+        if parse_encoded_block is None:
+            with io.open(path, encoding=encoding, newline='\n') as f:
+                for item in parser.parse(f):
+                    yield item
+            return
+        find_begin = begin_finder(type(self), encoding)
+        with mapped_file(path) as buffer:
+            for item in parser._parse_buffer(buffer, parse_encoded_block,
+                                             find_begin):
+                yield item
+
+    def parse_async(self, source, encoding='utf-8', executor=None,
+                    batch_size=1000, only=None, exclude=None):
+        """
+        Returns an asynchronous iterator over the items found in ``source``,
+        an asynchronous iterable of lines or an
+        :py:class:`asyncio.StreamReader`, for use in ``async for``. Items are
+        yielded as soon as their ``end`` line is read. Lines given as bytes
+        are decoded with ``encoding``.
+
+        Lines are parsed in the event loop, unless an ``executor`` is given:
+        then batches of up to ``batch_size`` lines are parsed in it, so big
+        sections do not block the loop. Batches are sent when full, at an
+        ``end`` line and at the end of the source.
+
+        ``only`` and ``exclude`` select the fields as in :py:meth:`parse`.
+
+        Requires Python 3.5+.
+        """
+        from .aio import parse_async
+        return parse_async(self._projected(only, exclude), source, encoding,
+                           executor, batch_size)
+
+    def parse_columns(self, iterator, batch_size=10000, numpy=False,
+                      only=None, exclude=None):
+        """
+        Parses ``iterator`` like :py:meth:`parse`, yielding the items in
+        :py:class:`~raspador.columns.Columns` batches of up to ``batch_size``
+        items: a column for each field, an :py:mod:`array` for numeric and
+        boolean fields and a list for others, or a NumPy array when
+        ``numpy`` is true. See :py:mod:`raspador.columns`. ``only`` and
+        ``exclude`` select the fields (and columns) as in :py:meth:`parse`.
+        Each item is still built, then pivoted into the columns.
+
+            >>> for batch in parser.parse_columns(f):  # doctest: +SKIP
+            ...     total += sum(batch.Total.values)
+        """
+        parser = self._projected(only, exclude)
+        return to_columns(parser, parser.parse(iterator), batch_size, numpy)
+
+    def parse_parallel(self, path, workers=None, encoding='utf-8',
+                       ordered=True, shards=None):
+        """
+        Parses the file at ``path`` in ``workers`` processes (by default, one
+        for each CPU), yielding the items of :py:meth:`parse_file`.
+
+        The file is split in ``shards`` byte ranges (by default, four for each
+        worker), realigned to the next ``begin`` line out of any section.
+        Each shard is parsed by a new instance of the parser class, so the
+        class must be importable by the worker processes, and the fields must
+        not keep state from one section to the next. Parsers without
+        ``begin`` are split at line boundaries when every value found is an
+        item (``yield_item_to_each_field_value_found``); other parsers have
+        a single section, and are parsed by one process.
+
+        With ``ordered=False`` the items of each shard are yielded as soon as
+        the shard is parsed.
+        """
+        return parse_parallel(self, path, workers, encoding, ordered, shards)
+
+    def _parse_buffer(self, buffer, parse_encoded_block, find_begin,
+                      start=0, end=None):
+        metrics = self.metrics
+        position = start
+        if end is None:
+            end = len(buffer)
+        while position < end:
+            resume = position
+            if find_begin is not None and not self.begin_found:
+                resume = find_begin(buffer, position, end)
+                if resume == -1:
+                    break
+                # replays the lookbehind that would be in the cache
+                position = lines_before(buffer, position, resume,
+                                        self.number_of_blocks_in_cache)
+            for block in iter_lines(buffer, position):
+                position += len(block)
+                res = parse_encoded_block(self, block)
+                if metrics is not None:
+                    metrics.block(self, block, res)
+                if res:
+                    yield res
+                if position >= end or position > resume and \
+                        find_begin is not None and not self.begin_found:
+                    break
+        res = self.finalize()
+        if metrics is not None:
+            metrics.finish(self, res)
+        if res:
+            yield res
+
+    def _nested_test(self):
+        """
+        Returns the test of this parser as a field of another one: it
+        rejects the blocks this parser would only keep in its cache, out of
+        its sections and not matched by ``begin``, and keeps them itself, so
+        the parent parser does not call :py:meth:`parse_block` for them.
+        Returns ``None`` if every block must be given to ``parse_block``.
+        """
+        cls = type(self)
+        if not cls.has_search_begin or not is_generated(cls, 'parse_block'):
+            return None
+        match_begin = cls._match_begin
+        if not cls.number_of_blocks_in_cache:
+            def test(block):
+                return self.begin_found or match_begin(block)
+            return test
+
+        def test(block):
+            if self.begin_found or match_begin(block):
+                return True
+            self.cache.append(block)
+            return False
+        return test
+
     @property
     def has_item(self):
         return hasattr(self, 'item') and self.item is not None
 
     def parse_iterator(self, iterator):
+        metrics = self.metrics
         try:
             while True:
                 block = next(iterator)
                 res = self.parse_block(block)
+                if metrics is not None:
+                    metrics.block(self, block, res)
                 if res:
                     yield res
         except StopIteration:
             res = self.finalize()
+            if metrics is not None:
+                metrics.finish(self, res)
             if res:
                 yield res
 
     def parse_block(self, block):
         logger.debug('%s.block: %r:%s', self.__class__.__name__, type(block),
                      block)
+        if self.record_mode:
+            return self._keep_record_block(block)
         self.cache.append(block)
 
         if self.has_search_begin and not self.begin_found:
-            self.begin_found = bool(self._begin.match(block))
+            self.begin_found = bool(self._match_begin(block))
 
         if self.begin_found:
             logger.debug('%s.begin_found: %r', self.__class__.__name__,
@@ -72,13 +394,16 @@ class ParserMixin(object):
             if not self.has_item:
                 self.item = self.default_item_class()
             if self.has_search_end:
-                self.begin_found = not bool(self._end.match(block))
+                self.begin_found = not bool(self._match_end(block))
 
+            tests = self._field_matcher.tests
             for block in self.cache.consume():
                 for name, field in list(self.fields.items()):
                     if name in self.item and \
                             hasattr(field, 'is_list') and not field.is_list:
                         continue
+                    if name in tests and not tests[name](block):
+                        continue
                     value = field.parse_block(block)
                     if value is not None:
                         self.assign_value_into_item(name, value)
@@ -88,24 +413,103 @@ class ParserMixin(object):
             if not self.begin_found:
                 return self.finalize_item()
 
+    def _keep_record_block(self, block):
+        "Keeps the blocks of sections for :py:meth:`_parse_record`."
+        self.cache.append(block)
+        if not self.begin_found:
+            if not self.has_search_begin or not self._match_begin(block):
+                return None
+            self.begin_found = True
+        if self.item is None:
+            self.item = self.default_item_class()
+            self._record = []
+        self._record.extend(self.cache.consume())
+        if self.has_search_end and self._match_end(block):
+            self.begin_found = False
+            self._parse_record()
+            return self.finalize_item()
+
     def finalize(self):
         if not self.has_item:
             return None
+        if self._record is not None:
+            self._parse_record()
         if self.yield_item_to_each_field_value_found:
             return None
         return self.finalize_item()
 
+    def _parse_record(self):
+        """
+        Evaluates the fields over the blocks of the section kept in
+        ``record_mode``. Regex based fields run once over the text of the
+        whole section in multiline mode (see
+        :py:func:`~raspador.matcher.record_pattern`): the matches in a block
+        give the value the block gives alone, and matches that span blocks
+        give values of their own. List fields take every value, and other
+        fields the first one. Other fields are given each block. Values are
+        assigned in the order of the blocks they start in, as when blocks
+        are parsed one by one.
+        """
+        blocks, self._record = self._record, None
+        lines = [block if block.endswith('\n') else block + '\n'
+                 for block in blocks]
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+        # new lines of blocks without one, that patterns must not match
+        added = frozenset(offsets[index + 1] - 1
+                          for index, block in enumerate(blocks)
+                          if not block.endswith('\n'))
+        text = ''.join(lines)
+        patterns = self._record_patterns
+        sessions = self._session_fields or {}
+        found = []
+        for order, (name, field) in enumerate(list(self.fields.items())):
+            scalar = hasattr(field, 'is_list') and not field.is_list
+            pattern = patterns.get(name) if name not in sessions else None
+            if pattern is None:
+                values = ((index, field.parse_block(block))
+                          for index, block in enumerate(blocks))
+            else:
+                regex, anchored = pattern
+
+                def reparse(line, field=field):
+                    return field.parse_block(
+                        blocks[bisect.bisect(offsets, line) - 1])
+                values = ((bisect.bisect(offsets, line) - 1, value)
+                          for line, value in line_values(
+                              field, regex, anchored, text, reparse, True,
+                              added))
+            for index, value in values:
+                if value is not None:
+                    found.append((index, order, name, value))
+                    if scalar:
+                        break
+        found.sort(key=lambda value: value[:2])
+        for index, order, name, value in found:
+            self.assign_value_into_item(name, value)
+
     def finalize_item(self):
+        for name, field in list(self.fields.items()):
+            value = self.item.get(name)
+            if type(value) is RawValues:
+                value = field._to_python_many(value)
+                if value:
+                    self.item[name] = value
+                else:
+                    del self.item[name]
         for name, field in list(self.fields.items()):
             if name not in self.item:
                 value = None
-                if hasattr(field, 'finalize') and \
-                        isinstance(field.finalize, collections.Callable):
+                if hasattr(field, 'finalize') and callable(field.finalize):
                     value = field.finalize()
                 if value is None and hasattr(field, 'default'):
                     value = field.default
                 if value is not None:
                     self.assign_value_into_item(name, value)
+        for name in self._item_ends:
+            if name in self.fields:
+                self.fields[name].end_item()
 
         res = self.process_item(self.item)
         self.item = None
@@ -142,19 +546,29 @@ class ParserMetaclass(type):
                           if hasattr(v, 'parse_block')
                           and not isinstance(v, type))
 
+        cls.default_item_class = parser_item_class(cls)
+        cls.intern_pool = InternPool(cls.intern_pool_size)
+
         cls.add_regex_attr(cls, attrs, 'begin')
         cls.add_regex_attr(cls, attrs, 'end')
 
+        cls._field_matcher = FieldMatcher(
+            list(cls.fields.items()) if cls.combine_field_patterns else [])
+
         for name, attr in list(cls.fields.items()):
             if hasattr(attr, 'assign_class'):
                 attr.assign_class(cls, name)
 
+        compile_parser(cls)
+
     def add_regex_attr(self, cls, attrs, name):
         has_attr = name in attrs
         setattr(cls, 'has_search_'+name, has_attr)
         if has_attr:
-            regex = attrs[name]
-            setattr(cls, '_' + name, re.compile(regex, re.UNICODE))
+            regex = re.compile(attrs[name], re.UNICODE)
+            setattr(cls, '_' + name, regex)
+            setattr(cls, '_match_' + name,
+                    staticmethod(fast_test(regex, anchored=True)))
 
 
 Parser = ParserMetaclass('Parser', (object,), {})
@@ -0,0 +1,137 @@
+# coding: utf-8
+"""
+Literal prefilters for regular expressions.
+
+Most patterns used by parsers have a required literal part, like ``COO:`` in
+``COO:\\s?(\\d+)`` or the ``FAB:`` prefix of ``^FAB:.*BR$``. Checking it with
+``str.startswith`` or the ``in`` operator is much cheaper than running the
+regex engine, and rejects most of the blocks, that usually match nothing.
+"""
+import re
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+
+LITERAL = sre_constants.LITERAL
+SUBPATTERN = sre_constants.SUBPATTERN
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+AT = sre_constants.AT
+AT_BEGINNING = sre_constants.AT_BEGINNING
+AT_BEGINNING_STRING = sre_constants.AT_BEGINNING_STRING
+
+
+def _flatten(items):
+    "Inlines groups, as their content is matched in sequence anyway."
+    for op, av in items:
+        if op is SUBPATTERN and not (len(av) > 2 and av[1] & re.IGNORECASE):
+            for item in _flatten(av[-1]):
+                yield item
+        else:
+            yield op, av
+
+
+def _runs(items):
+    """
+    Yields lists of character codes that must appear contiguously in any
+    string matched by ``items``.
+    """
+    run = []
+    for op, av in items:
+        if op is LITERAL:
+            run.append(av)
+            continue
+        if run:
+            yield run
+        run = []
+        if op in REPEATS and av[0] >= 1:
+            for inner in _runs(list(_flatten(av[2]))):
+                yield inner
+    if run:
+        yield run
+
+
+def _to_text(codes, pattern):
+    if isinstance(pattern, bytes):
+        return bytes(bytearray(codes))
+    return u''.join(unichr(code) for code in codes)
+
+
+def _analyze(regex, anchored):
+    """
+    Returns ``(prefix, literal, exact)`` for ``regex``, see
+    :py:func:`required_literals`. ``exact`` tells that the pattern is nothing
+    but its literal.
+    """
+    if regex.flags & re.IGNORECASE:
+        return None, None, False
+    try:
+        items = list(_flatten(sre_parse.parse(regex.pattern, regex.flags)))
+    except Exception:
+        return None, None, False
+    if items and items[0][0] is AT and (
+            items[0][1] is AT_BEGINNING_STRING or
+            items[0][1] is AT_BEGINNING and not regex.flags & re.MULTILINE):
+        items = items[1:]
+        anchored = True
+    runs = list(_runs(items))
+    if not runs:
+        return None, None, False
+    literal = runs[0]
+    for run in runs[1:]:
+        if len(run) > len(literal):
+            literal = run
+    prefix = runs[0] if anchored and items[0][0] is LITERAL else None
+    exact = all(op is LITERAL for op, av in items)
+    literal = _to_text(literal, regex.pattern)
+    if prefix is not None:
+        prefix = _to_text(prefix, regex.pattern)
+    return prefix, literal, exact
+
+
+def required_literals(regex, anchored=False):
+    """
+    Returns ``(prefix, literal)``: a string that every block matched by
+    ``regex`` starts with, and the longest string that such block must
+    contain. Each is ``None`` when it cannot be determined.
+
+    ``anchored`` tells that the regex is used with ``match`` instead of
+    ``search``::
+
+        >>> required_literals(re.compile(r'^FAB:.*BR$'))
+        ('FAB:', 'FAB:')
+        >>> required_literals(re.compile(r'COO:\\s?(\\d+)'))
+        (None, 'COO:')
+    """
+    prefix, literal, exact = _analyze(regex, anchored)
+    return prefix, literal
+
+
+def fast_test(regex, anchored=False):
+    """
+    Returns a callable that receives a block and returns a true value when
+    ``regex`` matches it (with ``match`` if ``anchored``, else ``search``).
+    Blocks that lack the required literals are rejected before invoking the
+    regex engine, and patterns made only of a literal do not invoke it at
+    all.
+    """
+    method = regex.match if anchored else regex.search
+    prefix, literal, exact = _analyze(regex, anchored)
+    if prefix is not None:
+        if exact:
+            return lambda block: block.startswith(prefix)
+        return lambda block: block.startswith(prefix) and method(block)
+    if literal is not None and not isinstance(literal, bytes):
+        # ``in`` is slow for bytes, where the regex engine is faster
+        if exact:
+            return lambda block: literal in block
+        return lambda block: literal in block and method(block)
+    return method
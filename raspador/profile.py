@@ -0,0 +1,368 @@
+# coding: utf-8
+"""
+Profiling of parsers: how many blocks each field tests, parses and matches,
+and how its time splits between the regex, ``to_python`` and
+``input_processor``, plus how many lines each parser (nested ones included)
+sees inside its sections.
+
+A :py:class:`Profile` parses with a
+:py:meth:`~raspador.parser.ParserMixin.session` of the parser whose fields
+are wrapped by :py:class:`ProfiledField`, so the parser itself, and any
+parser that is not profiled, runs without overhead::
+
+    >>> profile = Profile(MyParser())                  # doctest: +SKIP
+    >>> items = list(profile.parse_file('data.txt'))   # doctest: +SKIP
+    >>> print(profile.report())                        # doctest: +SKIP
+
+From the command line::
+
+    python -m raspador.profile module:ParserClass file... [--json out.json]
+"""
+from __future__ import print_function, division
+import argparse
+import copy
+import functools
+import importlib
+import io
+import json
+import time
+from collections import OrderedDict
+
+from .compiler import encoded_parse_block, begin_finder, _memoizes
+from .decorators import FieldProxy
+from .fields import BaseField
+from .files import mapped_file
+from .parser import ParserMixin
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class FieldStats(object):
+    "Counters and timings, in seconds, of a field."
+    def __init__(self, name):
+        self.name = name
+        self.rejected = 0  # blocks rejected by the prefilter test
+        self.calls = 0
+        self.matches = 0
+        self.time = 0.0
+        self.to_python_time = 0.0
+        self.input_processor_time = 0.0
+
+    @property
+    def tested(self):
+        return self.calls + self.rejected
+
+    @property
+    def regex_time(self):
+        "Time out of ``to_python`` and ``input_processor``."
+        return max(0.0, self.time - self.to_python_time -
+                   self.input_processor_time)
+
+    def as_dict(self):
+        return OrderedDict([
+            ('field', self.name),
+            ('tested', self.tested),
+            ('calls', self.calls),
+            ('matches', self.matches),
+            ('time', self.time),
+            ('regex_time', self.regex_time),
+            ('to_python_time', self.to_python_time),
+            ('input_processor_time', self.input_processor_time),
+        ])
+
+
+class SectionStats(object):
+    """
+    Counts the blocks given to a parser, the ones inside its sections, and
+    its sections (items).
+    """
+    def __init__(self, name):
+        self.name = name
+        self.blocks = 0
+        self.lines = 0
+        self.sections = 0
+
+    def count(self, parser, parse, block):
+        "Calls ``parse(block)`` for ``parser``, counting the block."
+        was_open = parser.begin_found
+        res = parse(block)
+        self.blocks += 1
+        if was_open or parser.begin_found or res is not None:
+            self.lines += 1
+        return res
+
+    def as_dict(self):
+        return OrderedDict([
+            ('parser', self.name),
+            ('blocks', self.blocks),
+            ('lines', self.lines),
+            ('sections', self.sections),
+        ])
+
+
+def _timed(function, stats, attr):
+    def timed(*args):
+        start = _timer()
+        try:
+            return function(*args)
+        finally:
+            setattr(stats, attr, getattr(stats, attr) + _timer() - start)
+    return timed
+
+
+def _timed_conversions(field, stats):
+    """
+    Returns a copy of ``field`` that adds the time of ``to_python`` (and
+    ``to_python_many``) and of ``input_processor`` to ``stats``. Proxies are
+    copied with a copy of the field they decorate.
+    """
+    if isinstance(field, FieldProxy):
+        field = copy.copy(field)
+        field.field = _timed_conversions(field.field, stats)
+        return field
+    if not isinstance(field, BaseField):
+        return field
+    field = copy.copy(field)
+    # memoized values of the parser would hide the time of conversions
+    field.memos = {}
+    field.to_python = _timed(field.to_python, stats, 'to_python_time')
+    field.to_python_many = _timed(field.to_python_many, stats,
+                                  'to_python_time')
+    if field.input_processor:
+        field.input_processor = _timed(field.input_processor, stats,
+                                       'input_processor_time')
+    return field
+
+
+class ProfiledField(FieldProxy):
+    """
+    Records the :py:class:`FieldStats` of a field of a profiled parser, and
+    the :py:class:`SectionStats` of a nested parser. Fields with a
+    ``memo_size`` keep memoizing their values, as in the parser.
+    """
+    def __init__(self, field, stats, sections=None):
+        super(ProfiledField, self).__init__(field)
+        self.stats = stats
+        self.sections = sections
+        parse = field.parse_block
+        if sections is not None:
+            parse = functools.partial(sections.count, field, parse)
+        if _memoizes(field):
+            parse = field.memoize(parse)
+        self._parse = self._timed_parse(parse)
+
+    def _timed_parse(self, parse):
+        stats = self.stats
+
+        def timed(block):
+            stats.calls += 1
+            start = _timer()
+            value = parse(block)
+            stats.time += _timer() - start
+            if value is not None:
+                stats.matches += 1
+                if self.sections is not None:
+                    self.sections.sections += 1
+            return value
+        return timed
+
+    def _timed_test(self, test):
+        if test is None:
+            return None
+        stats = self.stats
+
+        def timed(block):
+            start = _timer()
+            res = test(block)
+            stats.time += _timer() - start
+            if not res:
+                stats.rejected += 1
+            return res
+        return timed
+
+    def parse_block(self, block):
+        return self._parse(block)
+
+    def finalize(self):
+        finalize = getattr(self.field, 'finalize', None)
+        value = finalize() if callable(finalize) else None
+        if value is not None and self.sections is not None:
+            self.sections.sections += 1
+        return value
+
+    def bind_plan_entry(self, entry, key):
+        "Binds a plan entry of the profiled session to this field."
+        test = entry.test
+        if isinstance(self.field, ParserMixin):
+            test = self.field._nested_test()
+        entry = entry._replace(parse=self.parse_block,
+                               test=self._timed_test(test))
+        if getattr(entry, 'encoded_parse', None) is not None:
+            encoded_parse = self.field.encoded_parser(key)[1]
+            if _memoizes(self.field):
+                encoded_parse = self.field.memoize(encoded_parse, key=key)
+            entry = entry._replace(
+                encoded_test=self._timed_test(entry.encoded_test),
+                encoded_parse=self._timed_parse(encoded_parse))
+        return entry
+
+
+class Profile(object):
+    """
+    Profiles ``parser``: parse with :py:meth:`parse` or :py:meth:`parse_file`
+    and read the statistics in :py:attr:`fields` and :py:attr:`sections`,
+    keyed by the dotted path of each field and parser, or all of them with
+    :py:meth:`report` and :py:meth:`as_dict`.
+    """
+    def __init__(self, parser):
+        self.fields = OrderedDict()
+        self.sections = OrderedDict()
+        self.name = type(parser).__name__
+        self.parser = self.instrument(parser, self.name)
+
+    def instrument(self, parser, path):
+        "Returns a session of ``parser`` with profiled fields."
+        self.sections[path] = SectionStats(path)
+        session = parser.session()
+        fields = {}
+        for name, field in session.fields.items():
+            field_path = '%s.%s' % (path, name)
+            stats = self.fields[field_path] = FieldStats(field_path)
+            sections = None
+            if isinstance(field, ParserMixin):
+                field = self.instrument(field, field_path)
+                sections = self.sections[field_path]
+            else:
+                field = _timed_conversions(field, stats)
+            fields[name] = ProfiledField(field, stats, sections)
+        session._session_fields = fields
+        session.fields = dict(fields)
+        session._bound_plans = {}
+        session._bound_finalize_plan = None
+        return session
+
+    def _items(self, items):
+        sections = self.sections[self.name]
+        for item in items:
+            sections.sections += 1
+            yield item
+
+    def parse(self, iterator):
+        "Same as :py:meth:`~raspador.parser.ParserMixin.parse`."
+        for item in self._items(self._parse(iterator)):
+            yield item
+
+    def _parse(self, iterator):
+        parser = self.parser
+        count = self.sections[self.name].count
+        for block in iterator:
+            res = count(parser, parser.parse_block, block)
+            if res:
+                yield res
+        res = parser.finalize()
+        if res:
+            yield res
+
+    def parse_file(self, path, encoding='utf-8'):
+        "Same as :py:meth:`~raspador.parser.ParserMixin.parse_file`."
+        parser = self.parser
+        parse_encoded_block = encoded_parse_block(type(parser), encoding)
+        if parse_encoded_block is None:
+            with io.open(path, encoding=encoding, newline='\n') as f:
+                for item in self.parse(f):
+                    yield item
+            return
+        count = self.sections[self.name].count
+
+        def parse(parser, block):
+            return count(parser, functools.partial(parse_encoded_block,
+                                                   parser), block)
+
+        with mapped_file(path) as buffer:
+            for item in self._items(parser._parse_buffer(
+                    buffer, parse, begin_finder(type(parser), encoding))):
+                yield item
+
+    def as_dict(self):
+        return OrderedDict([
+            ('fields', [stats.as_dict() for stats in self.ranked()]),
+            ('sections', [stats.as_dict()
+                          for stats in self.sections.values()]),
+        ])
+
+    def ranked(self):
+        "Returns the :py:class:`FieldStats`, slowest first."
+        return sorted(self.fields.values(), key=lambda s: -s.time)
+
+    def report(self):
+        "Returns text tables of the statistics."
+        def ms(seconds):
+            return '%.1f' % (seconds * 1000)
+        fields = [('field', 'tested', 'calls', 'matches', 'ms', 'regex',
+                   'to_python', 'input_proc')]
+        fields += [(s.name, s.tested, s.calls, s.matches, ms(s.time),
+                    ms(s.regex_time), ms(s.to_python_time),
+                    ms(s.input_processor_time)) for s in self.ranked()]
+        sections = [('parser', 'blocks', 'lines', 'sections')]
+        sections += [(s.name, s.blocks, s.lines, s.sections)
+                     for s in self.sections.values()]
+        return '%s\n\n%s' % (_table(fields), _table(sections))
+
+
+def _table(rows):
+    width = max(len(row[0]) for row in rows)
+    return '\n'.join(' '.join([row[0].ljust(width)] +
+                              [str(value).rjust(10) for value in row[1:]])
+                     for row in rows)
+
+
+def load(spec):
+    "Returns the object named by ``module:name``."
+    module, _, name = spec.partition(':')
+    obj = importlib.import_module(module)
+    for attr in name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(
+        prog='python -m raspador.profile',
+        description='Profiles the fields of a parser over files.')
+    args.add_argument('parser', help='parser class, as module:ParserClass')
+    args.add_argument('files', nargs='+')
+    args.add_argument('--encoding', default='utf-8')
+    args.add_argument('--text', action='store_true',
+                      help='parse decoded lines instead of using parse_file')
+    args.add_argument('--json', help='file to dump the statistics to, or -')
+    options = args.parse_args(argv)
+
+    profile = Profile(load(options.parser)())
+    items = 0
+    start = _timer()
+    for path in options.files:
+        profile.parser.reset()
+        if options.text:
+            with io.open(path, encoding=options.encoding) as f:
+                items += sum(1 for item in profile.parse(f))
+        else:
+            items += sum(1 for item in profile.parse_file(
+                path, options.encoding))
+    elapsed = _timer() - start
+
+    print(profile.report())
+    print('\n%d items in %.3fs' % (items, elapsed))
+    if options.json:
+        stats = profile.as_dict()
+        stats.update(items=items, time=elapsed)
+        data = json.dumps(stats, indent=2)
+        if options.json == '-':
+            print(data)
+        else:
+            with io.open(options.json, 'w') as f:
+                f.write(data if isinstance(data, type(u'')) else
+                        data.decode('utf-8'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# coding: utf-8
+"""
+Runs many parsers over one stream in a single pass, so that a file with
+documents of many kinds is read and split into lines only once.
+
+    >>> router = Router([CouponParser, ReducaoZParser])  # doctest: +SKIP
+    >>> for name, item in router.parse_file('journal.txt'):  # doctest: +SKIP
+    ...     print(name, item)
+"""
+import io
+from collections import deque
+
+from .compiler import is_generated
+from .prefilter import fast_test
+
+
+def _routable(parser):
+    """
+    Tells if ``parser`` can be given only the lines of its sections (and the
+    lines its ``begin`` may match): it has a ``begin``, keeps ``skip_ahead``
+    and has a generated ``parse_block``, that does nothing else with lines
+    out of sections than keeping them in its cache.
+    """
+    cls = type(parser)
+    return cls.has_search_begin and cls.skip_ahead and \
+        is_generated(cls, 'parse_block')
+
+
+class BeginMatcher(object):
+    """
+    Tests the ``begin`` of many parsers against a block. Parsers with the
+    same ``begin`` pattern share a single test, built by
+    :py:func:`~raspador.prefilter.fast_test`, so blocks missing its required
+    literal are rejected without running the regex engine.
+
+    .. note::
+
+        Searching a single alternation of the required literals of all
+        patterns was measured to be slower than testing each of them, as in
+        :py:class:`~raspador.matcher.FieldMatcher`.
+    """
+    def __init__(self, parsers):
+        tests = {}
+        self.groups = []
+        for index, parser in parsers:
+            regex = type(parser)._begin
+            key = regex.pattern, regex.flags
+            if key not in tests:
+                tests[key] = (fast_test(regex, anchored=True), [])
+                self.groups.append(tests[key])
+            tests[key][1].append(index)
+
+    def tests(self, idle):
+        """
+        Returns ``(test, indexes)`` pairs for the parsers whose indexes are
+        in ``idle``.
+        """
+        return tuple((test, tuple(index for index in indexes
+                                  if index in idle))
+                     for test, indexes in self.groups
+                     if not idle.isdisjoint(indexes))
+
+
+class Router(object):
+    """
+    Gives the blocks of one stream to many ``parsers`` (parser classes, or
+    instances), yielding ``(name, item)`` pairs in the order the items are
+    found, ``name`` being the name of the parser class.
+
+    A parser with a ``begin`` only receives the blocks of its sections and
+    the ones its ``begin`` matches; the last ``number_of_blocks_in_cache``
+    blocks before them are put in its cache, as if it had seen them. Parsers
+    without ``begin``, with custom ``parse_block`` methods or without
+    ``skip_ahead`` receive all blocks. Items found in the same block are
+    yielded in the order of ``parsers``, as are the items left at the end of
+    the stream.
+    """
+    def __init__(self, parsers):
+        self.parsers = []
+        self.names = []
+        for parser in parsers:
+            if isinstance(parser, type):
+                parser = parser()
+            name = type(parser).__name__
+            if name in self.names:
+                raise ValueError('Router: more than one %s parser' % name)
+            self.parsers.append(parser)
+            self.names.append(name)
+        self._routed = [index for index, parser in enumerate(self.parsers)
+                        if _routable(parser)]
+        self._begin_matcher = BeginMatcher(
+            [(index, self.parsers[index]) for index in self._routed])
+        self.lookbehind = max([self.parsers[index].number_of_blocks_in_cache
+                               for index in self._routed] or [0])
+
+    def reset(self):
+        "Restores the initial state of all parsers."
+        for parser in self.parsers:
+            parser.reset()
+
+    def _receiver(self, index):
+        parser = self.parsers[index]
+        return (index, self.names[index], parser, parser.parse_block,
+                parser.metrics, index in self._routed)
+
+    def parse(self, iterator):
+        "Yields the ``(name, item)`` pairs found in ``iterator``, of blocks."
+        parsers = self.parsers
+        routed = self._routed
+        history = deque(maxlen=self.lookbehind or 1)
+        # the number of the last block given to each routed parser
+        last = [-1] * len(parsers)
+        receivers = tests = None
+        changed = True
+        for number, block in enumerate(iterator):
+            if changed:
+                # parsers out of sections only receive blocks they begin in
+                idle = frozenset(index for index in routed
+                                 if not parsers[index].begin_found)
+                receivers = [self._receiver(index)
+                             for index in range(len(parsers))
+                             if index not in idle]
+                tests = self._begin_matcher.tests(idle)
+                changed = False
+            started = None
+            for test, indexes in tests:
+                if test(block):
+                    started = (started or []) + list(indexes)
+            if started:
+                for index in started:
+                    parser = parsers[index]
+                    count = min(parser.number_of_blocks_in_cache,
+                                number - last[index] - 1, len(history))
+                    for previous in list(history)[len(history) - count:]:
+                        parser.cache.append(previous)
+                blocked = sorted(receivers + [self._receiver(index)
+                                              for index in started])
+                changed = True
+            elif not receivers:
+                history.append(block)
+                continue
+            else:
+                blocked = receivers
+            for index, name, parser, parse_block, metrics, watched in blocked:
+                res = parse_block(block)
+                if metrics is not None:
+                    metrics.block(parser, block, res)
+                if res:
+                    yield name, res
+                if watched and not parser.begin_found:
+                    last[index] = number
+                    changed = True
+            history.append(block)
+        for index, parser in enumerate(parsers):
+            res = parser.finalize()
+            if parser.metrics is not None:
+                parser.metrics.finish(parser, res)
+            if res:
+                yield self.names[index], res
+
+    def parse_file(self, path, encoding='utf-8'):
+        """
+        Parses the file at ``path``, yielding the same pairs as
+        ``parse(io.open(path, encoding=encoding, newline='\\n'))``.
+        """
+        with io.open(path, encoding=encoding, newline='\n') as f:
+            for pair in self.parse(f):
+                yield pair
@@ -0,0 +1,104 @@
+# coding: utf-8
+"""
+Flat scan of files, for parsers without ``begin`` and ``end`` that yield an
+item for each value found (``yield_item_to_each_field_value_found``): the
+regex of each field runs with ``finditer`` over chunks of many lines, in
+multiline mode, instead of being given each line, and the matches of all
+fields are merged by line.
+
+Items are the same as when lines are parsed one by one: matches of a field
+in the same line give a single value, the first field (in the order of the
+parser plan) that matches a line gives its item, and matches that span
+lines are evaluated again over their first line alone.
+"""
+import heapq
+
+from .compiler import is_generated
+from .encoding import charmap
+from .matcher import _defining_class, record_pattern, line_values, \
+    _line_end
+
+#: Size, in bytes, of the chunks of the file decoded and scanned at once.
+CHUNK_SIZE = 1 << 22
+
+
+def scan_plan(parser, encoding):
+    """
+    Returns the ``(name, field, regex, anchored)`` of the fields of
+    ``parser`` for a flat scan of a file in ``encoding``, or ``None`` if the
+    parser must be given each line.
+    """
+    cls = type(parser)
+    if not cls.flat_scan or cls.has_search_begin or cls.has_search_end or \
+            not cls.yield_item_to_each_field_value_found or \
+            not is_generated(cls, 'parse_block') or \
+            parser.metrics is not None or charmap(encoding) is None:
+        return None
+    plan = []
+    sessions = parser._session_fields or {}
+    for name, field in parser.fields.items():
+        pattern = None if name in sessions else record_pattern(field)
+        if pattern is None:
+            return None
+        plan.append((name, field) + pattern)
+    return plan
+
+
+def _field_values(order, name, field, regex, anchored, text):
+    """
+    Yields ``(line, order, name, value)`` for the lines of ``text`` where
+    ``field`` finds a value, ``line`` being the offset of the line.
+    """
+    def reparse(line):
+        return field.parse_block(text[line:_line_end(text, line)])
+
+    for line, value in line_values(field, regex, anchored, text, reparse):
+        yield line, order, name, value
+
+
+def scan_text(parser, plan, text):
+    """
+    Yields the items ``parser`` finds in ``text``, made of whole lines, for
+    the ``plan`` of :py:func:`scan_plan`.
+    """
+    from .parser import ParserMixin
+    values = heapq.merge(*[
+        _field_values(order, name, field, regex, anchored, text)
+        for order, (name, field, regex, anchored) in enumerate(plan)])
+    item_class = parser.default_item_class
+    finalize_item = parser.finalize_item
+    assign = None
+    if _defining_class(type(parser), 'assign_value_into_item') is not \
+            ParserMixin:
+        assign = parser.assign_value_into_item
+    last = None
+    for line, order, name, value in values:
+        if line == last:
+            continue
+        last = line
+        item = parser.item = item_class()
+        if assign is None:
+            item[name] = value  # the first value of the item
+        else:
+            assign(name, value)
+        res = finalize_item()
+        if res:
+            yield res
+
+
+def scan_buffer(parser, plan, buffer, encoding):
+    """
+    Yields the items ``parser`` finds in ``buffer``, a mapped file in
+    ``encoding``, decoded in chunks of about :py:data:`CHUNK_SIZE` bytes
+    cut at line ends.
+    """
+    position, size = 0, len(buffer)
+    while position < size:
+        end = min(position + CHUNK_SIZE, size)
+        if end < size:
+            newline = buffer.find(b'\n', end - 1)
+            end = size if newline == -1 else newline + 1
+        text = buffer[position:end].decode(encoding)
+        position = end
+        for item in scan_text(parser, plan, text):
+            yield item
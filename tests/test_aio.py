@@ -0,0 +1,98 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import sys
+import unittest
+
+from .test_parser import ExtratorDeDados, ParserDeReducaoZ, full_path
+
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    asyncio = None
+
+
+def read_lines(filename):
+    with io.open(full_path(filename), encoding='utf-8') as f:
+        return f.readlines()
+
+
+class Lines(object):
+    "An asynchronous iterable of lines, without the async syntax."
+    def __init__(self, lines, loop):
+        self.lines = iter(lines)
+        self.loop = loop
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = self.loop.create_future()
+        try:
+            future.set_result(next(self.lines))
+        except StopIteration:
+            future.set_exception(StopAsyncIteration())
+        return future
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'requires Python 3.5+')
+class TestParseAsync(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+
+    def collect(self, iterator):
+        items = []
+        while True:
+            try:
+                items.append(self.loop.run_until_complete(
+                    iterator.__anext__()))
+            except StopAsyncIteration:
+                return items
+
+    def stream(self, lines):
+        reader = asyncio.StreamReader()
+        reader.feed_data(''.join(lines).encode('utf-8'))
+        reader.feed_eof()
+        return reader
+
+    def test_should_parse_async_iterables(self):
+        for parser_class, filename in [
+                (ExtratorDeDados, 'files/cupom.txt'),
+                (ParserDeReducaoZ, 'files/reducaoz.txt')]:
+            lines = read_lines(filename)
+            items = self.collect(parser_class().parse_async(
+                Lines(lines, self.loop)))
+            self.assertEqual(items, list(parser_class().parse(iter(lines))))
+
+    def test_should_parse_stream_readers(self):
+        lines = read_lines('files/cupom.txt') * 3
+        items = self.collect(ExtratorDeDados().parse_async(
+            self.stream(lines)))
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items, list(ExtratorDeDados().parse(iter(lines))))
+
+    def test_should_parse_batches_in_executor(self):
+        lines = read_lines('files/cupom.txt') * 3
+        with ThreadPoolExecutor(1) as executor:
+            for batch_size in (1, 7, 1000):
+                items = self.collect(ExtratorDeDados().parse_async(
+                    self.stream(lines), executor=executor,
+                    batch_size=batch_size))
+                self.assertEqual(items,
+                                 list(ExtratorDeDados().parse(iter(lines))))
+
+    def test_should_yield_item_when_end_is_read(self):
+        lines = read_lines('files/cupom.txt')
+        reader = asyncio.StreamReader()
+        reader.feed_data(''.join(lines).encode('utf-8'))
+        items = ExtratorDeDados().parse_async(reader, executor=None)
+        # the stream is still open, but the section ended
+        item = self.loop.run_until_complete(items.__anext__())
+        self.assertEqual(item.COO, 24422)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 # coding: utf-8
 import unittest
-from raspador.cache import Cache
+from raspador.cache import Cache, Memo, InternPool
 
 
 class Test_Cache(unittest.TestCase):
@@ -38,3 +38,71 @@ class Test_Cache(unittest.TestCase):
         self.cache.append(4)
         self.cache.append(5)
         self.assertEqual(len(self.cache), 3)
+
+
+class TestMemo(unittest.TestCase):
+    def fill(self, memo, keys):
+        computed = []
+
+        def compute(key):
+            computed.append(key)
+            return key * 2
+        values = [memo.get(key, compute) for key in keys]
+        self.assertEqual(values, [key * 2 for key in keys])
+        return computed
+
+    def test_should_evict_least_recently_used(self):
+        memo = Memo(2)
+        self.assertEqual(self.fill(memo, [1, 2, 1, 3, 1, 2]), [1, 2, 3, 2])
+        self.assertEqual((memo.hits, memo.misses), (2, 4))
+        self.assertEqual(list(memo), [1, 2])
+
+    def test_should_evict_oldest(self):
+        memo = Memo(2, 'fifo')
+        self.assertEqual(self.fill(memo, [1, 2, 1, 3, 1, 2]),
+                         [1, 2, 3, 1, 2])
+        self.assertEqual(list(memo), [1, 2])
+
+    def test_should_not_keep_without_size(self):
+        memo = Memo(0)
+        self.assertEqual(self.fill(memo, [1, 1]), [1, 1])
+        self.assertEqual(len(memo), 0)
+
+    def test_should_reject_unknown_eviction(self):
+        self.assertRaises(ValueError, Memo, 2, 'random')
+
+
+class TestInternPool(unittest.TestCase):
+    def test_should_keep_each_value_once(self):
+        pool = InternPool()
+        a = pool.intern(''.join(['U', 'N']))
+        b = pool.intern(''.join(['U', 'N']))
+        self.assertTrue(a is b)
+        self.assertEqual(pool.code('UN'), 0)
+        self.assertEqual(pool.code('Te'), 1)
+        self.assertEqual(pool.values, ['UN', 'Te'])
+
+    def test_should_stop_pooling_when_full(self):
+        pool = InternPool(1)
+        pool.intern('UN')
+        value = ''.join(['T', 'e'])
+        self.assertTrue(pool.intern(value) is value)
+        self.assertEqual(pool.code('Te'), None)
+        self.assertEqual(len(pool), 1)
+
+    def test_should_keep_equal_values_of_other_types_apart(self):
+        pool = InternPool()
+        self.assertEqual([type(pool.intern(value)) for value in
+                          (1, 1.0, True, 0.0, 0, False)],
+                         [int, float, bool, float, int, bool])
+        self.assertEqual(len(pool), 6)
+
+    def test_should_return_unhashable_values(self):
+        value = ['UN']
+        self.assertTrue(InternPool().intern(value) is value)
+        self.assertEqual(len(InternPool()), 0)
+
+    def test_should_be_serializable(self):
+        import pickle
+        pool = pickle.loads(pickle.dumps(InternPool()))
+        self.assertEqual(pool.code('UN'), 0)
@@ -0,0 +1,166 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import unittest
+from array import array
+
+from raspador import Parser, IntegerField, BooleanField, FloatField, \
+    StringField, UnionUntilRegexProxy
+from raspador.columns import Column, ListColumn, typecode, to_columns
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class SectionParser(Parser):
+    begin = r'^BEGIN'
+    end = r'^END'
+    Number = IntegerField(r'^N (\d+)')
+    Price = FloatField(r'^P ([\d.]+)')
+    Flag = BooleanField(r'^(FLAG)')
+    Name = StringField(r'^NAME (\w+)')
+    Codes = IntegerField(r'^C (\d+)', is_list=True)
+
+
+LINES = [
+    'BEGIN', 'N 1', 'P 1.5', 'NAME a', 'C 1', 'C 2', 'END',
+    'BEGIN', 'N 2', 'FLAG', 'END',
+    'BEGIN', 'P 3.0', 'NAME c', 'C 3', 'END',
+]
+
+
+class TestTypecode(unittest.TestCase):
+    def test_should_give_arrays_to_numeric_and_boolean_fields(self):
+        self.assertEqual(typecode(IntegerField(r'(\d+)')), 'q')
+        self.assertEqual(typecode(FloatField(r'(\d+)')), 'd')
+        self.assertEqual(typecode(BooleanField(r'(\d+)')), 'b')
+        self.assertEqual(typecode(StringField(r'(\d+)')), None)
+        self.assertEqual(typecode(UnionUntilRegexProxy(
+            IntegerField(r'(\d+)'), ' '.join, 'x')), 'q')
+
+
+class TestColumns(unittest.TestCase):
+    def batches(self, **kwargs):
+        return list(SectionParser().parse_columns(iter(LINES), **kwargs))
+
+    def test_should_build_columns(self):
+        batch, = self.batches()
+        self.assertEqual(batch.length, 3)
+        self.assertEqual(list(batch), ['Number', 'Price', 'Flag', 'Name',
+                                       'Codes'])
+        self.assertEqual(batch.Number.values, array('q', [1, 2, 0]))
+        self.assertEqual(batch.Number.mask, array('b', [1, 1, 0]))
+        self.assertEqual(batch.Price.values, array('d', [1.5, 0, 3.0]))
+        self.assertEqual(batch.Flag.values, array('b', [0, 1, 0]))
+        self.assertEqual(batch.Flag.mask, None)  # BooleanField default
+        self.assertEqual(batch.Name.values, ['a', None, 'c'])
+
+    def test_should_build_offsets_of_list_fields(self):
+        batch, = self.batches()
+        codes = batch.Codes
+        self.assertTrue(isinstance(codes, ListColumn))
+        self.assertEqual(codes.offsets, array('q', [0, 2, 2, 3]))
+        self.assertEqual(codes.child.values, array('q', [1, 2, 3]))
+        self.assertEqual(codes.mask, array('b', [1, 0, 1]))
+        self.assertEqual([list(codes[i]) for i in range(3)],
+                         [[1, 2], [], [3]])
+
+    def test_should_split_batches(self):
+        batches = self.batches(batch_size=2)
+        self.assertEqual([b.length for b in batches], [2, 1])
+        self.assertEqual(batches[1].Name.values, ['c'])
+        self.assertEqual(batches[1].Codes.offsets, array('q', [0, 1]))
+
+    def test_should_keep_keys_added_by_process_item(self):
+        class ExtraParser(Parser):
+            begin = r'^BEGIN'
+            end = r'^END'
+            Number = IntegerField(r'^N (\d+)')
+
+            def process_item(self, item):
+                if item.get('Number') == 2:
+                    item['Extra'] = 'x'
+                return item
+
+        parser = ExtraParser()
+        batch, = to_columns(parser, parser.parse(iter(LINES)))
+        # the last section has no Number, and so no item
+        self.assertEqual(batch.length, 2)
+        self.assertEqual(batch.Extra.values, [None, 'x'])
+        self.assertEqual(batch.Extra.mask, array('b', [0, 1]))
+
+    def test_should_keep_items_that_are_not_mappings(self):
+        class ListParser(Parser):
+            begin = r'^BEGIN'
+            end = r'^END'
+            Codes = IntegerField(r'^C (\d+)', is_list=True)
+
+            def process_item(self, item):
+                return item.get('Codes')
+
+        batch, = ListParser().parse_columns(iter(LINES))
+        self.assertEqual(list(batch), ['Codes', None])
+        self.assertEqual(batch[None].values, [[1, 2], [3]])
+
+    def test_should_wrap_defaults_of_list_fields(self):
+        class DefaultParser(Parser):
+            begin = r'^BEGIN'
+            end = r'^END'
+            Codes = IntegerField(r'^C (\d+)', is_list=True, default=0)
+
+        batch, = DefaultParser().parse_columns(iter(LINES))
+        self.assertEqual([list(batch.Codes[i]) for i in range(3)],
+                         [[1, 2], [0], [3]])
+
+    def test_should_turn_to_list_on_values_out_of_array(self):
+        column = Column('q')
+        column.append(1)
+        column.append(2 ** 70)
+        self.assertEqual(column.values, [1, 2 ** 70])
+        self.assertEqual(column.typecode, None)
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_should_build_numpy_arrays(self):
+        batch, = self.batches(numpy=True)
+        self.assertEqual(batch.Number.dtype, numpy.int64)
+        self.assertEqual(list(batch.Number.mask), [False, False, True])
+        self.assertEqual(list(batch.Flag), [False, True, False])
+        offsets, values = batch.Codes
+        self.assertEqual(list(offsets), [0, 2, 2, 3])
+
+
+class CategoricalParser(Parser):
+    begin = r'^BEGIN'
+    end = r'^END'
+    intern_pool_size = 3
+    Name = StringField(r'^NAME (\w+)', categorical=True)
+    Tags = StringField(r'^TAG (\w+)', is_list=True, categorical=True)
+
+
+class TestCategoricalColumn(unittest.TestCase):
+    lines = [
+        'BEGIN', 'NAME a', 'TAG x', 'TAG y', 'END',
+        'BEGIN', 'TAG x', 'END',
+        'BEGIN', 'NAME a', 'END',
+    ]
+
+    def test_should_give_codes_of_the_pool(self):
+        parser = CategoricalParser()
+        batch, = list(parser.parse_columns(iter(self.lines)))
+        self.assertEqual(batch.Name.values, array('i', [0, -1, 0]))
+        self.assertEqual(batch.Name.mask, array('b', [1, 0, 1]))
+        self.assertEqual(batch.Name.categories, ['a', 'x', 'y'])
+        self.assertEqual(list(batch.Tags.child.values), [1, 2, 1])
+        self.assertEqual(batch.Tags.child.categories, ['a', 'x', 'y'])
+
+    def test_should_keep_values_when_the_pool_is_full(self):
+        parser = CategoricalParser()
+        lines = self.lines + ['BEGIN', 'NAME b', 'END']
+        batch, = list(parser.parse_columns(iter(lines)))
+        self.assertEqual(batch.Name.values, ['a', None, 'a', 'b'])
+        self.assertEqual(batch.Name.categories, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
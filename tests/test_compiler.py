@@ -0,0 +1,167 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import codecs
+import copy
+import unittest
+
+from raspador import Parser, Dictionary, BaseField, IntegerField, \
+    BooleanField
+from raspador.parser import ParserMixin
+from raspador.compiler import field_plan, finalize_plan, is_generated
+
+from .test_parser import ExtratorDeDados, ParserDeReducaoZ, \
+    TotalizadoresNaoFiscais, full_path
+
+
+def generic(parser_class):
+    "Returns a subclass that uses the generic ParserMixin methods."
+    attrs = dict(parser_class.__dict__)
+    attrs.pop('fields', None)
+    # copies, so that assign_class does not change the original fields
+    attrs.update((name, copy.copy(field))
+                 for name, field in parser_class.fields.items())
+    attrs.update(parse_block=ParserMixin.parse_block,
+                 finalize_item=ParserMixin.finalize_item)
+    return type(parser_class)(parser_class.__name__, (Parser,), attrs)
+
+
+class TestFieldPlan(unittest.TestCase):
+    def test_should_partition_scalar_and_list_fields(self):
+        plan = dict((e.name, e) for e in field_plan(ExtratorDeDados))
+        self.assertTrue(plan['COO'].scalar)
+        self.assertFalse(plan['Itens'].scalar)
+        self.assertTrue(plan['COO'].test is not None)
+
+    def test_should_test_nested_parsers_by_their_begin(self):
+        plan = dict((e.name, e) for e in field_plan(ParserDeReducaoZ))
+        entry = plan['Totalizadores']
+        self.assertFalse(entry.scalar)
+        self.assertFalse(entry.test('COO:1\n'))
+        self.assertTrue(entry.test('   TOTALIZADORES NÃO FISCAIS  \n'))
+
+    def test_should_keep_the_cache_of_nested_parsers(self):
+        class Aninhado(Parser):
+            begin = r'^INICIO$'
+            end = r'^FIM$'
+            number_of_blocks_in_cache = 1
+            Linha = IntegerField(r'^(\d+)$', is_list=True)
+
+        class Pai(Parser):
+            Filho = Aninhado()
+
+        linhas = ['1', '2', 'INICIO', '3', 'FIM', '4', '5', 'INICIO', 'FIM']
+        itens = list(Pai().parse(iter(linhas)))
+        self.assertEqual(itens, [Dictionary(Filho=Dictionary(Linha=[5]))])
+        self.assertEqual(itens, list(generic(Pai)().parse(iter(linhas))))
+
+    def test_should_give_every_block_to_nested_parsers_without_begin(self):
+        class SemInicio(Parser):
+            Linha = IntegerField(r'^(\d+)$')
+
+        class Pai(Parser):
+            Filho = SemInicio()
+
+        plan = dict((e.name, e) for e in field_plan(Pai))
+        self.assertEqual(plan['Filho'].test, None)
+
+    def test_should_collect_finalize_hooks_and_defaults(self):
+        plan = dict((e.name, e) for e in finalize_plan(ParserDeReducaoZ))
+        self.assertTrue(plan['Totalizadores'].finalize is not None)
+        self.assertTrue(plan['COO'].has_default)
+        self.assertFalse(plan['Totalizadores'].has_default)
+
+
+class TestGeneratedMethods(unittest.TestCase):
+    def test_should_generate_methods(self):
+        self.assertTrue(ExtratorDeDados.parse_block._raspador_generated)
+        self.assertTrue(ExtratorDeDados.finalize_item._raspador_generated)
+
+    def test_should_keep_custom_methods(self):
+        class CustomParser(Parser):
+            COO = IntegerField(r'COO:(\d+)')
+
+            def parse_block(self, block):
+                return block
+
+        class ChildParser(CustomParser):
+            pass
+
+        self.assertFalse(is_generated(CustomParser, 'parse_block'))
+        self.assertFalse(is_generated(ChildParser, 'parse_block'))
+        self.assertTrue(is_generated(ChildParser, 'finalize_item'))
+        self.assertEqual(ChildParser().parse_block('x'), 'x')
+
+    def test_should_give_the_generic_methods_to_super_calls(self):
+        class ParseBlock(Parser):
+            begin = r'^INICIO$'
+            end = r'^FIM$'
+            a = IntegerField(r'^a=(\d+)$')
+
+            def parse_block(self, block):
+                return super(ParseBlock, self).parse_block(block)
+
+        class FinalizeItem(Parser):
+            a = IntegerField(r'^a=(\d+)$')
+            b = BooleanField(r'^(b)$')
+            c = BaseField(r'^c=(\w+)$', default='nada')
+
+            def finalize_item(self):
+                return super(FinalizeItem, self).finalize_item()
+
+        linhas = ['INICIO', 'a=1', 'FIM']
+        self.assertEqual(list(ParseBlock().parse(iter(linhas))),
+                         [{'a': 1}])
+        self.assertEqual(list(FinalizeItem().parse(iter(linhas))),
+                         [{'a': 1, 'b': False, 'c': 'nada'}])
+
+    def test_should_call_custom_assign_value_into_item(self):
+        class CustomParser(Parser):
+            COO = IntegerField(r'COO:(\d+)')
+
+            def assign_value_into_item(self, name, value):
+                self.item[name.lower()] = value
+
+        items = list(CustomParser().parse(iter(['COO:1'])))
+        self.assertEqual(items, [{'coo': 1}])
+
+    def test_should_stop_without_begin_after_first_end(self):
+        class EndOnlyParser(Parser):
+            end = r'^--'
+            Number = IntegerField(r'(\d+)', is_list=True)
+
+        lines = ['1', '2', '--', '3']
+        self.assertEqual(list(EndOnlyParser().parse(iter(lines))),
+                         list(generic(EndOnlyParser)().parse(iter(lines))))
+
+    def test_should_yield_item_to_each_value_found(self):
+        class EachValueParser(Parser):
+            yield_item_to_each_field_value_found = True
+            begin = r'^begin'
+            number_of_blocks_in_cache = 2
+            Number = IntegerField(r'(\d+)')
+            Canceled = BooleanField(r'(X)')
+            Other = BaseField(r'other (\w+)')
+
+        lines = ['1', 'X 2', 'begin 3', 'other z', '4']
+        self.assertEqual(
+            list(EachValueParser().parse(iter(lines))),
+            list(generic(EachValueParser)().parse(iter(lines))))
+
+
+class TestGeneratedMethodsWithFiles(unittest.TestCase):
+    def open_file(self, filename):
+        return codecs.open(full_path(filename), encoding='utf-8')
+
+    def test_should_return_same_items_as_generic_methods(self):
+        for parser_class, filename in [
+                (ExtratorDeDados, 'files/cupom.txt'),
+                (ParserDeReducaoZ, 'files/reducaoz.txt'),
+                (TotalizadoresNaoFiscais, 'files/reducaoz.txt')]:
+            expected = list(generic(parser_class)().parse(
+                self.open_file(filename)))
+            items = list(parser_class().parse(self.open_file(filename)))
+            self.assertEqual(items, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 # coding: utf-8
 import unittest
 
-from raspador import FieldProxy, UnionUntilRegexProxy
+from raspador import FieldProxy, UnionUntilRegexProxy, UnionOverflowError, \
+    Parser, StringField
 
 
 class CampoFake(object):
@@ -91,5 +92,81 @@ class TesteDeDecoradorConcatenaAteRE(unittest.TestCase):
         )
 
 
+class TesteDeSessaoDoDecorador(unittest.TestCase):
+    def teste_sessao_deve_ter_cache_proprio(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), ' '.join, 'l3')
+        p.parse_block('l1')
+        s = p.session()
+        s.parse_block('s1')
+        self.assertEqual(p.parse_block('l3'), 'l1 l3')
+        self.assertEqual(s.parse_block('l3'), 's1 l3')
+
+    def teste_reset_deve_limpar_cache(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), ' '.join, 'l3')
+        p.parse_block('l1')
+        p.reset()
+        self.assertEqual(p.parse_block('l3'), 'l3')
+
+
+class TesteDeLimitesDoDecorador(unittest.TestCase):
+    def enviar(self, p, *linhas):
+        return [p.parse_block(linha) for linha in linhas]
+
+    def teste_deve_unir_ao_atingir_max_blocks(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), ' '.join, 'fim',
+                                 max_blocks=2)
+        self.assertEqual(self.enviar(p, 'l1', 'l2', 'l3', 'fim'),
+                         [None, 'l1 l2', None, 'l3 fim'])
+
+    def teste_deve_descartar_ao_atingir_max_bytes(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), ' '.join, 'fim',
+                                 max_bytes=4, overflow='drop')
+        self.assertEqual(self.enviar(p, 'l1', 'l2', 'l3', 'fim'),
+                         [None, None, None, 'l3 fim'])
+
+    def teste_deve_levantar_erro_ao_atingir_limite(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), ' '.join, 'fim',
+                                 max_blocks=2, overflow='raise')
+        p.parse_block('l1')
+        self.assertRaises(UnionOverflowError, p.parse_block, 'l2')
+        self.assertEqual(p.parse_block('fim'), 'fim')
+
+    def teste_deve_rejeitar_politica_desconhecida(self):
+        self.assertRaises(ValueError, UnionUntilRegexProxy, CampoFake(),
+                          ' '.join, 'fim', overflow='ignore')
+
+    def teste_deve_usar_metodo_de_uniao_em_bloco_unico(self):
+        p = UnionUntilRegexProxy(CampoFake(retornar=True), tuple, 'fim')
+        self.assertEqual(p.parse_block('fim'), ('fim',))
+
+
+class ParserDeDescricoes(Parser):
+    begin = r'^ITEM'
+    end = r'^FIM'
+    Descricao = UnionUntilRegexProxy(StringField(r'desc: (.*)#$'), ' '.join,
+                                     r'.*#$')
+
+
+class TesteDeDecoradorEntreItens(unittest.TestCase):
+    def teste_cache_nao_deve_passar_ao_proximo_item(self):
+        linhas = ['ITEM', 'desc: cortada', 'FIM',
+                  'ITEM', 'desc: inteira#', 'FIM']
+        for parser in (ParserDeDescricoes(), ParserDeDescricoes().session()):
+            self.assertEqual(
+                [item.get('Descricao') for item in parser.parse(iter(linhas))],
+                ['inteira'])
+
+    def teste_cache_deve_sobreviver_a_outro_parser(self):
+        def criando_parsers():
+            for linha in ['ITEM', 'desc: cortada', 'em duas#', 'FIM']:
+                ParserDeDescricoes()
+                yield linha
+
+        self.assertEqual(
+            [item.get('Descricao')
+             for item in ParserDeDescricoes().parse(criando_parsers())],
+            ['cortada em duas'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,173 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import re
+import unittest
+
+from raspador.encoding import charmap, translate, encoded_test, line_finder
+
+
+class TestCharmap(unittest.TestCase):
+    def test_should_map_all_bytes_of_single_byte_encodings(self):
+        chars, ascii_only = charmap('latin1')
+        self.assertEqual(len(chars), 256)
+        self.assertFalse(ascii_only)
+
+    def test_should_map_only_ascii_for_utf8(self):
+        chars, ascii_only = charmap('utf-8')
+        self.assertEqual(len(chars), 128)
+        self.assertTrue(ascii_only)
+
+    def test_should_refuse_other_encodings(self):
+        self.assertEqual(charmap('utf-16'), None)
+        self.assertEqual(charmap('shift_jis'), None)
+        self.assertEqual(charmap('not an encoding'), None)
+
+
+class TestTranslate(unittest.TestCase):
+    patterns = [
+        r'COO:\s?(\d+)',
+        r'^\s+(CANCELAMENTO)\s+$',
+        r'^TOTAL R\$\s+(\d+,\d+)',
+        r'(\d+)\s(\d+)\s+([\w.#\s/()]+)\s+(\d+)(\w+)\s+X',
+        r'^\s+REDUÇÃO Z\s+$',
+        r'^FAB:.*BR$',
+        r'Contador de Reduç(ão|ões) Z:\s*(\d+)',
+        r'\bAB\B',
+        r'(?P<x>a)(?P=x)|b{2,3}?',
+        r'(?<=x)y(?!z)',
+        r'[^a-c\d]+',
+    ]
+    blocks = [
+        '31/01/2013 01:58:36  CCF:019827               COO:024422\n',
+        '                      CANCELAMENTO\n',
+        'TOTAL R$                                      422,20\n',
+        '  1 872 #POLENTA FINA 2UN X           11,00 Te       22,00\n',
+        '                      REDUÇÃO Z\n',
+        'FAB:BE091010100011220480                 BR\n',
+        'Contador de Reduções Z:                     1246\n',
+        'ABC AB ABçd xyz xy aab bbb ÇÃ\xa0é\n',
+    ]
+
+    def assertSameResults(self, encoding):
+        for pattern in self.patterns:
+            regex = re.compile(pattern, re.UNICODE)
+            translated = translate(regex, encoding)
+            self.assertTrue(translated is not None, pattern)
+            bytes_regex, ascii_only = translated
+            for block in self.blocks:
+                encoded = block.encode(encoding)
+                if ascii_only and re.search(b'[\x80-\xff]', encoded):
+                    continue
+                found = [tuple(g.decode(encoding) for g in v)
+                         if isinstance(v, tuple) else v.decode(encoding)
+                         for v in bytes_regex.findall(encoded)]
+                self.assertEqual(found, regex.findall(block), pattern)
+                self.assertEqual(bool(bytes_regex.match(encoded)),
+                                 bool(regex.match(block)), pattern)
+
+    def test_should_give_same_results_for_latin1(self):
+        self.assertSameResults('latin1')
+
+    def test_should_give_same_results_for_ascii_utf8(self):
+        self.assertSameResults('utf-8')
+
+    def test_should_keep_unicode_semantics_of_categories(self):
+        bytes_regex, ascii_only = translate(re.compile(r'(\w+)', re.UNICODE),
+                                            'latin1')
+        self.assertEqual(bytes_regex.findall('AÇÚCAR'.encode('latin1')),
+                         ['AÇÚCAR'.encode('latin1')])
+
+    def test_should_not_translate_case_insensitive_patterns(self):
+        self.assertEqual(translate(re.compile(r'coo', re.I), 'latin1'), None)
+        self.assertEqual(translate(re.compile(r'(?i:coo)'), 'latin1'), None)
+
+
+class TestEncodedTest(unittest.TestCase):
+    def test_should_decode_non_ascii_utf8_blocks(self):
+        test = encoded_test(re.compile(r'^\s+(REDUÇÃO Z)\s+$'), 'utf-8',
+                            anchored=True)
+        self.assertTrue(test('   REDUÇÃO Z\n'.encode('utf-8')))
+        self.assertFalse(test('   REDUCAO Z\n'.encode('utf-8')))
+
+    def test_should_handle_non_ascii_spaces_in_utf8(self):
+        test = encoded_test(re.compile(r'^COO:\s(\d+)'), 'utf-8',
+                            anchored=True)
+        self.assertTrue(test('COO:\xa01\n'.encode('utf-8')))
+        self.assertTrue(test(b'COO: 1\n'))
+        self.assertFalse(test(b'COO:1\n'))
+
+    def test_should_decode_untranslatable_patterns(self):
+        test = encoded_test(re.compile(r'(?i)coo:'), 'latin1')
+        self.assertTrue(test(b'x COO:1'))
+        self.assertFalse(test(b'x CO:1'))
+
+
+class TestLineFinder(unittest.TestCase):
+    lines = [
+        'COO:024422\n',
+        '    CUPOM FISCAL  \n',
+        '  CUPOM FISCAL X\n',
+        'CUPOM FISCAL\n',
+        '\n',
+        '  \n',
+        '    REDUÇÃO Z\n',
+        '  CUPOM FISCAL',
+    ]
+    patterns = [
+        r'^\s+CUPOM FISCAL\s+$',
+        r'\s+CUPOM FISCAL\Z',
+        r'^[\s-]*$',
+        r'^\s+REDUÇÃO Z\s+$',
+        r'(?<=\s)CUPOM\b(?! X)',
+        r'\d+',
+    ]
+
+    def first_line(self, regex, lines):
+        for index, line in enumerate(lines):
+            if regex.match(line):
+                return index
+        return len(lines)
+
+    def assertFindsFirstLine(self, encoding):
+        for pattern in self.patterns:
+            regex = re.compile(pattern, re.UNICODE)
+            find = line_finder(regex, encoding)
+            if find is None:
+                continue
+            for start in range(len(self.lines)):
+                lines = self.lines[start:]
+                buffer = ''.join(lines).encode(encoding)
+                offset = find(buffer, 0, len(buffer))
+                if offset == -1:
+                    offset = len(buffer)
+                expected = self.first_line(regex, lines)
+                found = len(buffer[:offset].decode(encoding).splitlines())
+                self.assertTrue(found <= expected, pattern)
+                if expected < len(lines):
+                    self.assertTrue(buffer[offset:].decode(encoding)
+                                    .startswith(lines[found]), pattern)
+
+    def test_should_not_skip_matching_lines_in_latin1(self):
+        self.assertFindsFirstLine('latin1')
+
+    def test_should_not_skip_matching_lines_in_utf8(self):
+        self.assertFindsFirstLine('utf-8')
+
+    def test_should_need_a_literal_in_utf8(self):
+        self.assertEqual(line_finder(re.compile(r'^[\s-]*$'), 'utf-8'), None)
+        self.assertTrue(line_finder(re.compile(r'^[\s-]*$'), 'latin1'))
+
+    def test_should_search_in_range(self):
+        find = line_finder(re.compile(r'^COO'), 'latin1')
+        buffer = b'COO\nx\nCOO\nCOO\n'
+        self.assertEqual(find(buffer, 0, 4), 0)
+        self.assertEqual(find(buffer, 4, 15), 6)
+        self.assertEqual(find(buffer, 4, 7), -1)
+
+    def test_should_not_find_literals_out_of_the_encoding(self):
+        find = line_finder(re.compile(r'^€'), 'latin1')
+        self.assertEqual(find(b'\x80\n', 0, 2), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,9 @@ import unittest
 from datetime import date, datetime
 
 from raspador.fields import BaseField, StringField, FloatField, BRFloatField, \
-    IntegerField, DateField, DateTimeField, BooleanField
+    IntegerField, DateField, DateTimeField, BooleanField, MappingField, \
+    fixed_width_strptime
+from raspador.item import Dictionary
 
 
 class TestBaseField(unittest.TestCase):
@@ -44,6 +46,22 @@ class TestBaseField(unittest.TestCase):
         value = field.parse_block(s)
         self.assertEqual(value, 1246)
 
+    def test_should_give_custom_searches_every_block(self):
+        class Upper(BaseField):
+            @property
+            def _search_method(self):
+                return lambda block: self.search.findall(block.upper())
+
+        class Always(BaseField):
+            def _is_valid_result(self, value):
+                return True
+
+            def to_python(self, value):
+                return value or 'absent'
+
+        self.assertEqual(Upper(r'COO:(\d+)').parse_block('coo:123'), '123')
+        self.assertEqual(Always(r'COO:(\d+)').parse_block('CCF:1'), 'absent')
+
 
 class TestIntegerField(unittest.TestCase):
     def test_should_return_value(self):
@@ -119,6 +137,47 @@ class TestBooleanField(unittest.TestCase):
         self.assertEqual(value, False)
 
 
+class TestToPythonMany(unittest.TestCase):
+    def test_should_convert_floats_as_to_python(self):
+        values = ['1.234,56', '7,5', '-0,01', '1.000.000,00']
+        field = BRFloatField()
+        self.assertEqual(field.to_python_many(values),
+                         [field.to_python(value) for value in values])
+        field = FloatField(thousand_separator='th', decimal_separator='d')
+        self.assertEqual(field.to_python_many(['1th234d5', '2']),
+                         [1234.5, 2.0])
+
+    def test_should_convert_values_with_new_lines_one_by_one(self):
+        self.assertEqual(FloatField().to_python_many(['1.5\n', '2']),
+                         [1.5, 2.0])
+        self.assertEqual(FloatField().to_python_many([]), [])
+        self.assertRaises(ValueError, FloatField().to_python_many,
+                          ['1.5', 'x'])
+
+    def test_should_convert_integers(self):
+        self.assertEqual(IntegerField().to_python_many(['1', '-20']),
+                         [1, -20])
+
+
+class TestMappingField(unittest.TestCase):
+    def setUp(self):
+        self.field = MappingField(r'^(\d+)\s(\w+)\s+(\d+,\d+)', [
+            ('Item', IntegerField()),
+            ('Codigo', None),
+            ('Total', BRFloatField()),
+        ])
+
+    def test_should_return_mapping(self):
+        value = self.field.parse_block('001 7891 12,50')
+        self.assertEqual(value, Dictionary([
+            ('Item', 1), ('Codigo', '7891'), ('Total', 12.5)]))
+
+    def test_should_convert_many_by_columns(self):
+        values = [('001', '7891', '12,50'), ('002', '7892', '1,00')]
+        self.assertEqual(self.field.to_python_many(values),
+                         [self.field.to_python(value) for value in values])
+
+
 class TestDateField(unittest.TestCase):
     def test_should_return_value(self):
         s = "02/01/2013 10:21:51           COO:022734"
@@ -134,6 +193,40 @@ class TestDateField(unittest.TestCase):
         data_esperada = date(2013, 1, 2)
         self.assertEqual(value, data_esperada)
 
+    def test_should_parse_fixed_width_as_strptime(self):
+        parse = fixed_width_strptime('%d/%m/%Y %H:%M:%S')
+        for value in ['02/01/2013 10:21:51', '29/02/2012 00:00:00',
+                      '31/12/1999 23:59:59']:
+            self.assertEqual(parse(value),
+                             datetime.strptime(value, '%d/%m/%Y %H:%M:%S'))
+        for value in ['2/1/2013 10:21:51', '02-01-2013 10:21:51',
+                      '02/01/2013 10:21:5x', ' 2/01/2013 10:21:51']:
+            self.assertEqual(parse(value), None)
+        self.assertRaises(ValueError, parse, '30/02/2013 10:21:51')
+        self.assertEqual(fixed_width_strptime('%d/%m/%y'), None)
+        self.assertEqual(fixed_width_strptime('%d/%m'), None)
+
+    def test_should_fall_back_to_strptime(self):
+        field = DateField(r'^(\d+/\d+/\d+)')
+        self.assertEqual(field.parse_block('2/1/2013'), date(2013, 1, 2))
+        self.assertRaises(ValueError, field.parse_block, '30/02/2013')
+
+    def test_should_cache_values(self):
+        field = DateField(r'^(\d+/\d+/\d+)', cache_size=2)
+        for value in ['02/01/2013', '02/01/2013', '03/01/2013',
+                      '04/01/2013', '02/01/2013', '04/01/2013']:
+            self.assertEqual(field.parse_block(value),
+                             datetime.strptime(value, '%d/%m/%Y').date())
+        self.assertEqual((field.cache_hits, field.cache_misses), (2, 4))
+        self.assertEqual(list(field._cache), ['02/01/2013', '04/01/2013'])
+
+    def test_should_not_cache_without_size(self):
+        field = DateField(r'^(\d+/\d+/\d+)', cache_size=0)
+        field.parse_block('02/01/2013')
+        field.parse_block('02/01/2013')
+        self.assertEqual((field.cache_hits, field.cache_misses), (0, 2))
+        self.assertEqual(len(field._cache), 0)
+
 
 class TestDateTimeField(unittest.TestCase):
     def test_should_return_value(self):
@@ -0,0 +1,46 @@
+# coding: utf-8
+import os
+import tempfile
+import unittest
+
+from raspador.files import mapped_file, iter_lines, lines_before
+
+
+class TestMappedFile(unittest.TestCase):
+    def write(self, data):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_should_iterate_lines(self):
+        with mapped_file(self.write(b'a\nbc\n\nd')) as buffer:
+            self.assertEqual(list(iter_lines(buffer)),
+                             [b'a\n', b'bc\n', b'\n', b'd'])
+            self.assertEqual(list(iter_lines(buffer, 2)),
+                             [b'bc\n', b'\n', b'd'])
+            self.assertEqual(list(iter_lines(buffer, 2, 6)),
+                             [b'bc\n', b'\n'])
+
+    def test_should_accept_empty_files(self):
+        with mapped_file(self.write(b'')) as buffer:
+            self.assertEqual(list(iter_lines(buffer)), [])
+
+
+class TestLinesBefore(unittest.TestCase):
+    buffer = b'a\nbc\n\nd\n'
+
+    def test_should_go_back_lines(self):
+        self.assertEqual(lines_before(self.buffer, 0, 6, 0), 6)
+        self.assertEqual(lines_before(self.buffer, 0, 6, 1), 5)
+        self.assertEqual(lines_before(self.buffer, 0, 6, 2), 2)
+        self.assertEqual(lines_before(self.buffer, 0, 6, 3), 0)
+
+    def test_should_not_go_before_start(self):
+        self.assertEqual(lines_before(self.buffer, 2, 6, 3), 2)
+        self.assertEqual(lines_before(self.buffer, 6, 6, 1), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import pickle
+import unittest
+
+from raspador import Parser, Dictionary, Record, record_class, \
+    IntegerField, BooleanField, BaseField
+from raspador.fields import BRFloatField as FloatField
+from raspador.item import Lazy, LazyDictionary, resolve
+
+from .test_parser import ExtratorDeDados, full_path
+
+
+ItemDeCupom = record_class('ItemDeCupom', ['Item', 'Codigo', 'Descricao'])
+
+
+class CampoItem(BaseField):
+    def setup(self):
+        self.search = r'(\d+)\s(\d+)\s+([\w.#\s/()]+?)\s+\d+UN'
+
+    def to_python(self, r):
+        return ItemDeCupom(Item=int(r[0]), Codigo=r[1], Descricao=r[2])
+
+
+class ExtratorDeRegistros(Parser):
+    default_item_class = Record
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = CampoItem(is_list=True)
+
+
+class ExtratorDerivado(ExtratorDeRegistros):
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    COO = IntegerField(r'COO:\s?(\d+)')
+
+
+class TesteRecord(unittest.TestCase):
+    def test_deve_ter_acesso_por_atributo_e_por_chave(self):
+        item = ItemDeCupom(Item=1, Codigo='872')
+        self.assertEqual(item.Item, 1)
+        self.assertEqual(item['Codigo'], '872')
+        self.assertTrue('Codigo' in item)
+        self.assertFalse('Descricao' in item)
+        self.assertEqual(item.get('Descricao'), None)
+        self.assertRaises(KeyError, lambda: item['Descricao'])
+        self.assertRaises(AttributeError, lambda: item.Descricao)
+        self.assertEqual(list(item.keys()), ['Item', 'Codigo'])
+        self.assertEqual(len(item), 2)
+        self.assertEqual(repr(item), "ItemDeCupom(Item=1, Codigo='872')")
+
+    def test_deve_aceitar_apenas_chaves_conhecidas(self):
+        item = ItemDeCupom()
+        self.assertFalse(item)
+        self.assertRaises(KeyError, item.__setitem__, 'Preco', 1)
+        item['Descricao'] = 'x'
+        del item['Descricao']
+        self.assertFalse(item)
+        self.assertFalse(hasattr(item, '__dict__'))
+
+    def test_deve_ser_igual_a_dicionario(self):
+        self.assertEqual(ItemDeCupom(Item=1, Codigo='2'),
+                         Dictionary(Codigo='2', Item=1))
+        self.assertEqual(Dictionary(Codigo='2', Item=1),
+                         ItemDeCupom(Item=1, Codigo='2'))
+        self.assertNotEqual(ItemDeCupom(Item=1), Dictionary(Item=2))
+
+    def test_nao_deve_aceitar_nomes_de_metodos(self):
+        self.assertRaises(ValueError, record_class, 'X', ['items'])
+
+
+class TesteParserComRecord(unittest.TestCase):
+    def parse(self, parser_class):
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8') as f:
+            return list(parser_class().parse(f))
+
+    def test_deve_gerar_classe_com_os_campos(self):
+        item_class = ExtratorDeRegistros.default_item_class
+        self.assertTrue(issubclass(item_class, Record))
+        self.assertEqual(item_class.__name__, 'ExtratorDeRegistrosItem')
+        self.assertEqual(set(item_class._fields),
+                         set(['COO', 'Cancelado', 'Total', 'Itens']))
+        self.assertEqual(ExtratorDerivado.default_item_class._fields, ('COO',))
+
+    def test_deve_extrair_os_mesmos_dados(self):
+        esperado = self.parse(ExtratorDeDados)[0]
+        item = self.parse(ExtratorDeRegistros)[0]
+        self.assertTrue(isinstance(item, ExtratorDeRegistros
+                                   .default_item_class))
+        for campo in ('COO', 'Cancelado', 'Total'):
+            self.assertEqual(item[campo], esperado[campo])
+        self.assertEqual([i.Descricao for i in item.Itens],
+                         [i.Descricao for i in esperado.Itens])
+        self.assertEqual(list(ExtratorDeRegistros().parse_file(
+            full_path('files/cupom.txt'))), [item])
+
+    def test_deve_ser_serializavel(self):
+        item = self.parse(ExtratorDeRegistros)[0]
+        copia = pickle.loads(pickle.dumps(item))
+        self.assertEqual(copia, item)
+        self.assertEqual(type(copia), type(item))
+        self.assertEqual(type(copia.Itens[0]), ItemDeCupom)
+
+
+class TesteLazyDictionary(unittest.TestCase):
+    def test_deve_converter_listas_no_lugar(self):
+        dividir = lambda v: v.split() or None
+        valores = [Lazy(int, '1'), 2, Lazy(dividir, 'a b'), Lazy(dividir, '')]
+        self.assertIs(resolve(valores), valores)
+        self.assertEqual(valores, [1, 2, 'a', 'b'])
+
+    def test_deve_converter_uma_vez(self):
+        conversoes = []
+
+        def converter(valor):
+            conversoes.append(valor)
+            return int(valor)
+
+        item = LazyDictionary(COO=Lazy(converter, '10'))
+        self.assertEqual((item.COO, item['COO'], item.get('COO')),
+                         (10, 10, 10))
+        self.assertEqual(conversoes, ['10'])
+        self.assertEqual(item, Dictionary(COO=10))
+        self.assertEqual(type(pickle.loads(pickle.dumps(item))), Dictionary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+import unittest
+
+from raspador import Parser, BaseField, IntegerField, BooleanField, \
+    DateField, UnionUntilRegexProxy
+from raspador.matcher import FieldMatcher, combinable_pattern
+
+
+class TestCombinablePattern(unittest.TestCase):
+    def test_should_combine_regex_fields(self):
+        field = IntegerField(r'COO:(\d+)')
+        self.assertEqual(combinable_pattern(field), (field.search, False))
+
+    def test_should_anchor_fields_that_use_match(self):
+        field = BooleanField(r'\s+(CANC)')
+        self.assertEqual(combinable_pattern(field), (field.search, True))
+
+    def test_should_not_combine_field_without_search(self):
+        self.assertEqual(combinable_pattern(BaseField()), None)
+
+    def test_should_not_combine_proxies(self):
+        field = UnionUntilRegexProxy(BaseField(r'(\d+)'), ' '.join, 'x')
+        self.assertEqual(combinable_pattern(field), None)
+
+    def test_should_not_combine_custom_parse_block(self):
+        class CustomField(BaseField):
+            def parse_block(self, block):
+                return block
+
+        self.assertEqual(combinable_pattern(CustomField(r'(\d+)')), None)
+
+    def test_should_not_combine_fields_valid_without_match(self):
+        class Always(BaseField):
+            def _is_valid_result(self, value):
+                return True
+
+            def to_python(self, value):
+                return value or 'absent'
+
+        class Pai(Parser):
+            a = IntegerField(r'^a=(\d+)$')
+            b = Always(r'^b=(\w+)$')
+
+        self.assertEqual(combinable_pattern(Pai.b), None)
+        self.assertEqual(list(Pai().parse(iter(['a=1']))),
+                         [{'a': 1, 'b': 'absent'}])
+
+
+class TestFieldMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = FieldMatcher([
+            ('Date', DateField(r'^(\d+/\d+/\d+)')),
+            ('Number', IntegerField(r'(\d+)')),
+            ('COO', IntegerField(r'COO:(\d+)')),
+            ('Canceled', BooleanField(r'\s+(CANCELAMENTO)')),
+        ])
+
+    def test_should_miss_all_fields_if_nothing_matches(self):
+        self.assertEqual(self.matcher.misses('nothing here'),
+                         set(['Date', 'Number', 'COO', 'Canceled']))
+
+    def test_should_report_every_matching_field(self):
+        misses = self.matcher.misses('02/01/2013 10:21:51   COO:022734')
+        self.assertEqual(misses, set(['Canceled']))
+
+    def test_should_honor_match_semantics(self):
+        self.assertEqual(self.matcher.misses('x  CANCELAMENTO'),
+                         set(['Date', 'Number', 'COO', 'Canceled']))
+        self.assertEqual(self.matcher.misses('   CANCELAMENTO'),
+                         set(['Date', 'Number', 'COO']))
+
+    def test_should_be_empty_without_combinable_fields(self):
+        matcher = FieldMatcher([('Any', BaseField())])
+        self.assertFalse(matcher)
+        self.assertEqual(matcher.misses('10'), set())
+
+
+class TestParserWithCombinedFields(unittest.TestCase):
+    lines = [
+        'COO:12',
+        'nothing',
+        'value 34 COO:56',
+        '   CANCELAMENTO',
+    ]
+
+    def parse(self, combine):
+        class SomeParser(Parser):
+            combine_field_patterns = combine
+            COO = IntegerField(r'COO:(\d+)', is_list=True)
+            Number = IntegerField(r'value (\d+)', is_list=True)
+            Canceled = BooleanField(r'\s+(CANCELAMENTO)')
+            Custom = UnionUntilRegexProxy(IntegerField(r'(\d+)$'), ' '.join,
+                                          'value')
+
+        return list(SomeParser().parse(iter(self.lines)))
+
+    def test_should_return_same_items_as_without_combining(self):
+        self.assertEqual(self.parse(True), self.parse(False))
+        self.assertEqual(self.parse(True), [{
+            'COO': [12, 56],
+            'Number': [34],
+            'Canceled': True,
+            'Custom': 56,
+        }])
+
+
+if __name__ == '__main__':
+    unittest.main()
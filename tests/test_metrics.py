@@ -0,0 +1,115 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from raspador import Parser, IntegerField, Metrics
+
+from .test_parser import ExtratorDeDados, full_path
+
+
+class LineParser(Parser):
+    yield_item_to_each_field_value_found = True
+    Number = IntegerField(r'^N (\d+)')
+
+
+class SectionParser(Parser):
+    begin = r'^BEGIN'
+    end = r'^END'
+    Number = IntegerField(r'^N (\d+)', is_list=True)
+
+
+class TestMetrics(unittest.TestCase):
+    def parse(self, parser, lines):
+        parser.metrics = Metrics()
+        items = list(parser.parse(iter(lines)))
+        return parser.metrics, items
+
+    def test_should_count_blocks_items_and_sections(self):
+        lines = ['x\n', 'BEGIN\n', 'N 1\n', 'END\n', 'y\n', 'BEGIN\n',
+                 'N 2\n']
+        metrics, items = self.parse(SectionParser(), lines)
+        self.assertEqual(len(items), 2)
+        self.assertEqual(metrics.blocks, 7)
+        self.assertEqual(metrics.bytes, len(''.join(lines)))
+        self.assertEqual(metrics.items, 2)
+        self.assertEqual(metrics.sections, 2)
+        self.assertEqual(metrics.unclosed_sections, 1)
+        self.assertEqual(metrics.item_latency_seconds_count, 2)
+        self.assertEqual(metrics.current_item_blocks, 0)
+        self.assertEqual(metrics.parser_name, 'SectionParser')
+        self.assertTrue(metrics.items_per_second > 0)
+
+    def test_should_tell_size_of_current_item(self):
+        parser = SectionParser()
+        parser.metrics = Metrics()
+        sizes = []
+
+        def lines():
+            for line in ['x\n', 'BEGIN\n', 'N 1\n', 'N 2\n', 'END\n']:
+                sizes.append(parser.metrics.current_item_blocks)
+                yield line
+            sizes.append(parser.metrics.current_item_blocks)
+
+        list(parser.parse(lines()))
+        self.assertEqual(sizes, [0, 0, 1, 2, 3, 0])
+
+    def test_should_count_items_of_each_value(self):
+        metrics, items = self.parse(LineParser(), ['N 1\n', 'x\n', 'N 2\n'])
+        self.assertEqual(len(items), 2)
+        self.assertEqual(metrics.items, 2)
+        self.assertEqual(metrics.sections, 2)
+        self.assertEqual(metrics.unclosed_sections, 0)
+
+    def test_should_count_parse_file(self):
+        parser = ExtratorDeDados()
+        parser.metrics = Metrics()
+        items = list(parser.parse_file(full_path('files/cupom.txt')))
+        self.assertEqual(len(items), 1)
+        self.assertEqual(parser.metrics.items, 1)
+        self.assertEqual(parser.metrics.sections, 1)
+        # parse_file splits at '\n' only, so '^FAB:.*BR$' does not match
+        # the '\r\n' line of the end
+        self.assertEqual(parser.metrics.unclosed_sections, 1)
+        self.assertTrue(parser.metrics.bytes > parser.metrics.blocks > 0)
+
+    def test_should_call_callback(self):
+        calls = []
+        parser = SectionParser()
+        parser.metrics = Metrics(callback=calls.append, interval=0)
+        list(parser.parse(iter(['BEGIN\n', 'N 1\n', 'END\n'] * 1000)))
+        self.assertTrue(len(calls) >= 2)
+        self.assertEqual(calls[-1].items, 1000)
+
+    def test_should_export_json_and_prometheus(self):
+        metrics, items = self.parse(SectionParser(),
+                                    ['BEGIN\n', 'N 1\n', 'END\n'])
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        metrics.export(path)
+        with io.open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data['items'], 1)
+        self.assertEqual(data['parser'], 'SectionParser')
+
+        metrics.export(path, 'prometheus')
+        with io.open(path) as f:
+            text = f.read()
+        self.assertTrue('# TYPE raspador_items_total counter\n' in text)
+        self.assertTrue('raspador_items_total{parser="SectionParser"} 1\n'
+                        in text)
+        self.assertTrue('raspador_item_latency_seconds_count'
+                        '{parser="SectionParser"} 1\n' in text)
+        self.assertRaises(ValueError, metrics.export, path, 'xml')
+
+    def test_should_not_be_set_by_default(self):
+        self.assertTrue(SectionParser().metrics is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
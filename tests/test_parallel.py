@@ -0,0 +1,169 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import os
+import tempfile
+import unittest
+
+from raspador import Parser, IntegerField, BooleanField, parse_many, \
+    ParseError
+from raspador.files import mapped_file
+from raspador.parallel import Sharder, find_line, last_line
+
+
+class SectionParser(Parser):
+    begin = r'^BEGIN'
+    end = r'^END'
+    number_of_blocks_in_cache = 2
+    Number = IntegerField(r'^N (\d+)', is_list=True)
+    Flag = BooleanField(r'^(FLAG)')
+
+
+class LineParser(Parser):
+    yield_item_to_each_field_value_found = True
+    Number = IntegerField(r'^N (\d+)')
+
+
+class WholeFileParser(Parser):
+    Number = IntegerField(r'^N (\d+)', is_list=True)
+
+
+class FailingParser(Parser):
+    begin = r'^BEGIN'
+    end = r'^END'
+    number_of_blocks_in_cache = 2
+    Number = IntegerField(r'^N (\d+)', is_list=True)
+    Flag = BooleanField(r'^(FLAG)')
+
+    def process_item(self, item):
+        if 13 in item.Number:
+            raise ValueError('unlucky')
+        return item
+
+
+def sections(count):
+    lines = []
+    for index in range(count):
+        lines += ['N %d' % index] * (index % 3)
+        if index % 4 == 0:
+            lines.append('END after')
+        lines += ['BEGIN %d' % index, 'N %d' % index]
+        if index % 5 == 0:
+            # begin inside a section is just another line
+            lines.append('BEGIN again')
+        if index % 2:
+            lines.append('FLAG')
+        lines += ['N %d' % (index + 1), 'END', 'não faz parte']
+    return '\n'.join(lines) + '\n'
+
+
+class BaseParallelTest(unittest.TestCase):
+    def write(self, text, encoding='utf-8'):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(text.encode(encoding))
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class TestFindLine(BaseParallelTest):
+    def test_should_find_first_and_last_lines(self):
+        test = lambda line: line.startswith(b'X')
+        with mapped_file(self.write('a\nX1\nb\nX2\nc\n')) as buffer:
+            self.assertEqual(find_line(buffer, 0, len(buffer), test), 2)
+            self.assertEqual(find_line(buffer, 5, len(buffer), test), 7)
+            self.assertEqual(find_line(buffer, 10, len(buffer), test), -1)
+            self.assertEqual(last_line(buffer, 0, len(buffer), test, size=2),
+                             7)
+            self.assertEqual(last_line(buffer, 0, 7, test, size=2), 2)
+            self.assertEqual(last_line(buffer, 0, 2, test), -1)
+
+
+class TestSharder(BaseParallelTest):
+    def shards(self, parser_class, text, count):
+        with mapped_file(self.write(text)) as buffer:
+            return Sharder(parser_class, buffer, 'utf-8').shards(count)
+
+    def test_should_split_at_begin_out_of_sections(self):
+        text = 'BEGIN\nBEGIN\nx\nEND\nN 1\nBEGIN\nEND\n'
+        self.assertEqual(self.shards(SectionParser, text, 3),
+                         [(0, 22), (18, 32)])
+
+    def test_should_start_cache_after_the_end_of_last_section(self):
+        text = 'N 1\nEND\nBEGIN\nEND\nBEGIN\nEND\n'
+        self.assertEqual(self.shards(SectionParser, text, 2),
+                         [(0, 18), (18, 28)])
+        self.assertEqual(self.shards(SectionParser, text, 4),
+                         [(0, 8), (0, 18), (18, 28)])
+
+    def test_should_split_at_lines_when_each_value_is_an_item(self):
+        self.assertEqual(self.shards(LineParser, 'N 1\nN 2\n', 2),
+                         [(0, 4), (4, 8)])
+
+    def test_should_not_split_a_single_section(self):
+        self.assertEqual(self.shards(WholeFileParser, 'N 1\nN 2\n', 2),
+                         [(0, 8)])
+        self.assertEqual(self.shards(WholeFileParser, '', 2), [])
+
+
+class TestParseParallel(BaseParallelTest):
+    def assertSameItems(self, parser_class, text, encoding='utf-8', **kw):
+        path = self.write(text, encoding)
+        expected = list(parser_class().parse_file(path, encoding))
+        for shards in (2, 7, 40):
+            items = list(parser_class().parse_parallel(
+                path, encoding=encoding, shards=shards, **kw))
+            self.assertEqual(items, expected)
+        return expected
+
+    def test_should_return_items_of_parse_file(self):
+        items = self.assertSameItems(SectionParser, sections(60), workers=1)
+        self.assertEqual(len(items), 60)
+        self.assertSameItems(SectionParser, sections(60), 'latin1',
+                             workers=1)
+        self.assertSameItems(LineParser, sections(20), workers=1)
+        self.assertSameItems(WholeFileParser, sections(20), workers=1)
+
+    def test_should_parse_in_processes(self):
+        self.assertSameItems(SectionParser, sections(30), workers=2)
+        path = self.write(sections(30))
+        items = list(SectionParser().parse_parallel(
+            path, workers=2, ordered=False, shards=5))
+        self.assertEqual(sorted(items, key=repr),
+                         sorted(SectionParser().parse_file(path), key=repr))
+
+    def test_should_parse_other_encodings_in_one_process(self):
+        self.assertSameItems(SectionParser, sections(10), 'utf-16')
+
+
+class TestParseMany(BaseParallelTest):
+    def assertParsesFiles(self, workers):
+        paths = [self.write(sections(count)) for count in range(1, 16, 3)]
+        missing = paths[0] + '.missing'
+        results = list(parse_many(FailingParser, paths + [missing],
+                                  workers=workers, chunksize=2))
+
+        errors = [(path, item) for path, item in results
+                  if isinstance(item, ParseError)]
+        self.assertEqual(sorted(path for path, error in errors),
+                         sorted([paths[-1], missing]))
+        for path, error in errors:
+            self.assertEqual(error.path, path)
+            self.assertTrue('Traceback' in error.traceback)
+
+        for path in paths[:-1]:
+            self.assertEqual([item for p, item in results if p == path],
+                             list(SectionParser().parse_file(path)))
+        # items before the error are kept
+        self.assertEqual(
+            [item for p, item in results if p == paths[-1]][:-1],
+            list(SectionParser().parse_file(paths[-1]))[:12])
+
+    def test_should_parse_files_in_one_process(self):
+        self.assertParsesFiles(workers=1)
+
+    def test_should_parse_files_in_processes(self):
+        self.assertParsesFiles(workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,12 +4,14 @@ import os
 import sys
 import unittest
 import codecs
+import io
 import re
 
 sys.path.append('../')
 
 from raspador.parser import Parser, Dictionary
-from raspador.fields import BaseField, IntegerField, BooleanField
+from raspador.fields import BaseField, IntegerField, BooleanField, \
+    MappingField, StringField
 from raspador.fields import BRFloatField as FloatField
 
 
@@ -344,6 +346,599 @@ class TesteExtrairDadosComParseresAlinhados(BaseParaTestesComApiDeArquivo):
         ]
         self.assertDictionary(reducao[0], self.itens[0])
 
+
+class TesteParseFile(unittest.TestCase):
+    def parse_text(self, parser_class, filename, encoding):
+        with io.open(full_path(filename), encoding=encoding,
+                     newline='\n') as f:
+            return list(parser_class().parse(f))
+
+    def parse_file(self, parser_class, filename, encoding):
+        return list(parser_class().parse_file(full_path(filename), encoding))
+
+    def test_deve_retornar_mesmos_itens_que_parse(self):
+        for parser_class, filename in [
+                (ExtratorDeDados, 'files/cupom.txt'),
+                (ExtratorDeDados, 'files/cupom_cancelado.txt'),
+                (ParserDeReducaoZ, 'files/reducaoz.txt'),
+                (TotalizadoresNaoFiscais, 'files/reducaoz.txt')]:
+            for encoding in ('utf-8', 'latin1'):
+                expected = self.parse_text(parser_class, filename, encoding)
+                self.assertEqual(
+                    self.parse_file(parser_class, filename, encoding),
+                    expected)
+
+    def test_deve_decodificar_arquivo_com_outras_codificacoes(self):
+        import tempfile
+        text = codecs.open(full_path('files/cupom.txt'),
+                           encoding='utf-8').read()
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(text.encode('utf-16'))
+            items = list(ExtratorDeDados().parse_file(path, 'utf-16'))
+        finally:
+            os.remove(path)
+        self.assertEqual(
+            items, self.parse_text(ExtratorDeDados, 'files/cupom.txt',
+                                   'utf-8'))
+
+    def test_deve_aceitar_arquivo_vazio(self):
+        import tempfile
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.assertEqual(list(ExtratorDeDados().parse_file(path)), [])
+        finally:
+            os.remove(path)
+
+    def test_deve_saltar_linhas_ate_o_inicio_mantendo_o_cache(self):
+        import tempfile
+
+        def criar(saltar):
+            class ParserComCache(Parser):
+                skip_ahead = saltar
+                begin = r'^\s+CUPOM FISCAL\s+$'
+                end = r'^FAB:.*BR$'
+                number_of_blocks_in_cache = 3
+                COO = IntegerField(r'COO:\s?(\d+)')
+                Linha = IntegerField(r'^linha (\d+)', is_list=True)
+            return ParserComCache
+
+        cupom = '   CUPOM FISCAL \nCOO:%d\nFAB:BE09 BR\nlinha 99\n'
+        partes = ['linha %d ção\n' % i for i in range(10)]
+        texto = ''.join(partes) + cupom % 1 + partes[0] + cupom % 2 + \
+            ''.join(partes[:2]) + cupom % 3
+        for encoding in ('utf-8', 'latin1'):
+            fd, path = tempfile.mkstemp()
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(texto.encode(encoding))
+                with io.open(path, encoding=encoding, newline='\n') as f:
+                    esperado = list(criar(True)().parse(f))
+                sem_salto = list(criar(False)().parse_file(path, encoding))
+                itens = list(criar(True)().parse_file(path, encoding))
+            finally:
+                os.remove(path)
+            self.assertEqual(len(itens), 3)
+            self.assertEqual([(i.COO, i.Linha) for i in itens],
+                             [(1, [7, 8, 9]), (2, [99, 0]), (3, [99, 0, 1])])
+            self.assertEqual(itens, esperado)
+            self.assertEqual(itens, sem_salto)
+
+
+class TestePickle(unittest.TestCase):
+    def test_deve_continuar_analise_de_parser_restaurado(self):
+        import pickle
+        linhas = ['   REDUÇÃO Z  ', 'COO: 1', 'Contador de Redução Z: 2',
+                  'FAB:1 BR', '   REDUÇÃO Z  ', 'COO: 3']
+        esperado = list(ParserDeReducaoZ().parse(iter(linhas)))
+        parser = ParserDeReducaoZ()
+        itens = [parser.parse_block(linha) for linha in linhas[:2]]
+        parser = pickle.loads(pickle.dumps(parser))
+        itens += [parser.parse_block(linha) for linha in linhas[2:]]
+        itens.append(parser.finalize())
+        self.assertEqual([item for item in itens if item], esperado)
+
+    def test_deve_serializar_campos(self):
+        import pickle
+        import weakref
+        campo = IntegerField(r'COO:\s?(\d+)')
+        campo.assign_parser(weakref.ref(ExtratorDeDados()))
+        campo = pickle.loads(pickle.dumps(campo))
+        self.assertEqual(campo.parse_block('COO: 42'), 42)
+
+
+class TesteSessao(unittest.TestCase):
+    def linhas(self, filename):
+        with io.open(full_path(filename), encoding='utf-8') as f:
+            return f.readlines()
+
+    def test_deve_intercalar_sessoes_de_um_parser(self):
+        parser = ParserDeReducaoZ()
+        linhas = self.linhas('files/reducaoz.txt')
+        esperado = list(ParserDeReducaoZ().parse(iter(linhas)))
+        sessoes = [parser.session(), parser.session()]
+        itens = [[], []]
+        for linha in linhas:
+            for sessao, encontrados in zip(sessoes, itens):
+                res = sessao.parse_block(linha)
+                if res:
+                    encontrados.append(res)
+        for sessao, encontrados in zip(sessoes, itens):
+            res = sessao.finalize()
+            if res:
+                encontrados.append(res)
+            self.assertEqual(encontrados, esperado)
+
+    def test_deve_manter_estado_ao_criar_outro_parser(self):
+        linhas = self.linhas('files/reducaoz.txt')
+        esperado = list(ParserDeReducaoZ().parse(iter(linhas)))
+
+        def criando_parsers():
+            for linha in linhas:
+                ParserDeReducaoZ()
+                yield linha
+
+        itens = list(ParserDeReducaoZ().parse(criando_parsers()))
+        self.assertEqual(itens, esperado)
+        self.assertTrue(itens[0].Totalizadores)
+
+    def test_deve_ter_campos_com_estado_proprio(self):
+        parser = ParserDeReducaoZ()
+        sessao = parser.session()
+        self.assertFalse(sessao.fields['Totalizadores'] is
+                         parser.fields['Totalizadores'])
+        self.assertTrue(sessao.fields['COO'] is parser.fields['COO'])
+
+    def test_deve_analisar_em_threads(self):
+        import threading
+        parser = ParserDeReducaoZ()
+        esperado = list(ParserDeReducaoZ().parse_file(
+            full_path('files/reducaoz.txt')))
+        resultados = []
+
+        def analisar():
+            for i in range(20):
+                sessao = parser.session()
+                resultados.append(list(sessao.parse_file(
+                    full_path('files/reducaoz.txt'))))
+
+        threads = [threading.Thread(target=analisar) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(resultados), 80)
+        for itens in resultados:
+            self.assertEqual(itens, esperado)
+
+    def test_deve_serializar_sessao(self):
+        import pickle
+        linhas = self.linhas('files/reducaoz.txt')
+        esperado = list(ParserDeReducaoZ().parse(iter(linhas)))
+        sessao = ParserDeReducaoZ().session()
+        metade = len(linhas) // 2
+        itens = [sessao.parse_block(linha) for linha in linhas[:metade]]
+        sessao = pickle.loads(pickle.dumps(sessao))
+        itens += [sessao.parse_block(linha) for linha in linhas[metade:]]
+        itens.append(sessao.finalize())
+        self.assertEqual([item for item in itens if item], esperado)
+
+
+class TesteProjecao(unittest.TestCase):
+    def parse(self, **projecao):
+        with io.open(full_path('files/reducaoz.txt'), encoding='utf-8') as f:
+            return list(ParserDeReducaoZ().parse(f, **projecao))
+
+    def test_deve_extrair_somente_campos_pedidos(self):
+        esperado = self.parse()
+        itens = self.parse(only=['COO', 'CRZ'])
+        self.assertEqual(itens, [Dictionary(COO=item.COO, CRZ=item.CRZ)
+                                 for item in esperado])
+        self.assertEqual(itens, self.parse(exclude=['Totalizadores']))
+        self.assertEqual(list(ParserDeReducaoZ().parse_file(
+            full_path('files/reducaoz.txt'), exclude=['Totalizadores'])),
+            itens)
+
+    def test_nao_deve_avaliar_parser_aninhado_excluido(self):
+        parser = ParserDeReducaoZ()
+        sessao = parser.session(only=['COO'])
+        self.assertEqual(list(sessao.fields), ['COO'])
+        self.assertEqual(sessao._session_fields, {})
+        self.assertEqual([e.name for e in sessao._session_plan(None)],
+                         ['COO'])
+        self.assertEqual([e.name for e in sessao._session_finalize_plan()],
+                         ['COO'])
+
+    def test_nao_deve_alterar_o_parser(self):
+        parser = ParserDeReducaoZ()
+        with io.open(full_path('files/reducaoz.txt'), encoding='utf-8') as f:
+            list(parser.parse(f, only=['COO']))
+        self.assertEqual(sorted(parser.fields),
+                         ['COO', 'CRZ', 'Totalizadores'])
+        self.assertEqual(self.parse()[0].Totalizadores[0].N, 1)
+
+    def test_deve_rejeitar_campos_desconhecidos(self):
+        parser = ParserDeReducaoZ()
+        self.assertRaises(ValueError, parser.session, only=['COO', 'Total'])
+        self.assertRaises(ValueError, parser.session, exclude=['Total'])
+
+
+class ExtratorEmLote(Parser):
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = MappingField(CampoItem().search.pattern, [
+        ('Item', IntegerField()),
+        ('Codigo', None),
+        ('Descricao', None),
+        ('Qtd', FloatField()),
+        ('Unidade', None),
+        ('ValorUnitario', FloatField()),
+        ('Aliquota', None),
+        ('ValorTotal', FloatField()),
+    ], is_list=True)
+    Valores = FloatField(r'X\s+(\d+,\d+)', is_list=True,
+                         input_processor=lambda v: [v] if v > 1 else None)
+
+
+class TesteConversaoEmLote(unittest.TestCase):
+    def parse(self, parser_class):
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8') as f:
+            return list(parser_class().parse(f))
+
+    def test_deve_converter_listas_em_lote(self):
+        self.assertTrue(ExtratorEmLote.Itens.batched)
+        self.assertTrue(ExtratorEmLote.Valores.batched)
+        self.assertFalse(ExtratorEmLote.Total.batched)
+        self.assertFalse(ExtratorDeDados.Itens.batched)
+
+    def test_deve_extrair_os_mesmos_valores(self):
+        item, = self.parse(ExtratorEmLote)
+        esperado, = self.parse(ExtratorDeDados)
+        valores = item.pop('Valores')
+        self.assertEqual(item, esperado)
+        self.assertEqual(type(item.Itens), list)
+        self.assertEqual(valores, [i.ValorUnitario for i in esperado.Itens
+                                   if i.ValorUnitario > 1])
+        self.assertEqual(list(ExtratorEmLote().parse_file(
+            full_path('files/cupom.txt'))), self.parse(ExtratorEmLote))
+
+    def test_deve_usar_default_sem_valores(self):
+        class ExtratorSemValores(ExtratorEmLote):
+            begin = r'^\s+CUPOM FISCAL\s+$'
+            end = r'^FAB:.*BR$'
+            Valores = IntegerField(r'X\s+(\d+),\d+', is_list=True,
+                                   default=[], input_processor=lambda v: None)
+
+        item, = self.parse(ExtratorSemValores)
+        self.assertEqual(item.Valores, [])
+
+    def test_deve_entregar_valores_convertidos_a_metodos_proprios(self):
+        class AtribuicaoPropria(Parser):
+            Numeros = IntegerField(r'^n=(\d+)$', is_list=True)
+
+            def assign_value_into_item(self, name, value):
+                self.atribuidos.append(list(value))
+                super(AtribuicaoPropria, self).assign_value_into_item(
+                    name, value)
+
+        class FinalizacaoPropria(Parser):
+            Numeros = IntegerField(r'^n=(\d+)$', is_list=True)
+
+            def finalize_item(self):
+                return super(FinalizacaoPropria, self).finalize_item()
+
+        linhas = ['n=1', 'n=2']
+        parser = AtribuicaoPropria()
+        parser.atribuidos = []
+        self.assertEqual(list(parser.parse(iter(linhas))),
+                         [{'Numeros': [1, 2]}])
+        self.assertEqual(parser.atribuidos, [[1], [2]])
+        self.assertFalse(FinalizacaoPropria.Numeros.batched)
+        self.assertEqual(list(FinalizacaoPropria().parse(iter(linhas))),
+                         [{'Numeros': [1, 2]}])
+
+
+class TesteMemorizacao(unittest.TestCase):
+    def criar_parser(self, **opcoes):
+        class ExtratorMemorizado(Parser):
+            memo_size = 64
+            begin = r'^\s+CUPOM FISCAL\s+$'
+            end = r'^FAB:.*BR$'
+            number_of_blocks_in_cache = 1
+            COO = IntegerField(r'COO:\s?(\d+)', **opcoes)
+            Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+            Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)', memo_size=0)
+            Itens = CampoItem(is_list=True)
+            Linhas = BaseField(r'^(-+)\s*$', is_list=True)
+        return ExtratorMemorizado
+
+    def linhas(self, newline=None):
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8',
+                     newline=newline) as f:
+            return f.readlines()
+
+    def test_deve_extrair_os_mesmos_itens(self):
+        linhas = self.linhas()
+        esperado = list(ExtratorDeDados().parse(iter(linhas * 3)))
+        Extrator = self.criar_parser()
+        list(Extrator().parse(iter(linhas)))
+        memo = Extrator.Itens.memos[None]
+        falhas, buscas = memo.misses, memo.hits + memo.misses
+
+        itens = list(Extrator().parse(iter(linhas * 2)))
+        for item in itens:
+            self.assertTrue(item.pop('Linhas'))
+        self.assertEqual(itens, esperado[1:])
+        self.assertEqual(memo.misses, falhas)
+        self.assertEqual(memo.hits + memo.misses, 3 * buscas)
+        self.assertEqual(Extrator.Total.memos, {})
+
+    def test_deve_copiar_listas(self):
+        Extrator = self.criar_parser()
+        itens = list(Extrator().parse(iter(self.linhas() * 2)))
+        self.assertEqual(itens[0].Linhas, itens[1].Linhas)
+        self.assertFalse(itens[0].Linhas is itens[1].Linhas)
+        itens[0].Linhas.append('-')
+        itens = list(Extrator().parse(iter(self.linhas())))
+        self.assertFalse('-' in itens[0].Linhas)
+
+    def test_deve_memorizar_blocos_codificados(self):
+        Extrator = self.criar_parser(memo_eviction='fifo')
+        caminho = full_path('files/cupom.txt')
+        self.assertEqual(list(Extrator().parse_file(caminho)),
+                         list(Extrator().parse(iter(self.linhas('\n')))))
+        self.assertTrue(Extrator.COO.memos['utf-8'].misses)
+        self.assertEqual(Extrator.COO.memos['utf-8'].eviction, 'fifo')
+
+
+class TesteInternacao(unittest.TestCase):
+    def test_deve_manter_valores_repetidos_uma_vez(self):
+        class ExtratorInternado(Parser):
+            begin = r'^\s+CUPOM FISCAL\s+$'
+            end = r'^FAB:.*BR$'
+            Itens = MappingField(CampoItem().search.pattern, [
+                ('Item', IntegerField()),
+                ('Unidade', StringField(groups=[4], intern=True)),
+                ('Aliquota', StringField(intern=True)),
+            ], groups=[0, 4, 6], is_list=True)
+            Aliquotas = StringField(r'\s(T[a-z]|F1)\s', is_list=True,
+                                    intern=True)
+
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8') as f:
+            linhas = f.readlines()
+        item, = list(ExtratorInternado().parse(iter(linhas * 2)))[:1]
+        unidades = [i.Unidade for i in item.Itens]
+        self.assertEqual(set(unidades), set(['UN']))
+        self.assertTrue(all(u is unidades[0] for u in unidades))
+        self.assertTrue(item.Itens[0].Aliquota is item.Aliquotas[0])
+        pool = ExtratorInternado.intern_pool
+        self.assertEqual(sorted(pool.values), ['F1', 'Tc', 'Te', 'UN'])
+
+    def test_deve_manter_tipos_de_valores_iguais(self):
+        class Numeros(Parser):
+            yield_item_to_each_field_value_found = True
+            Inteiro = IntegerField(r'^i=(\d+)$', intern=True)
+            Real = FloatField(r'^r=(\d+,\d+)$', intern=True)
+            Booleano = BooleanField(r'^(b)$', intern=True)
+
+        linhas = ['i=1', 'r=1,0', 'b', 'r=0,0', 'i=0']
+        valores = [list(item.values())[0] for item in
+                   Numeros().parse(iter(linhas))]
+        self.assertEqual(valores, [1, 1.0, True, 0.0, 0])
+        self.assertEqual([type(valor) for valor in valores],
+                         [int, float, bool, float, int])
+
+
+class ExtratorDeRegistro(Parser):
+    record_mode = True
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+    Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+    Itens = CampoItem(is_list=True)
+
+
+class TesteModoRegistro(unittest.TestCase):
+    def linhas(self, nome):
+        with io.open(full_path(nome), encoding='utf-8') as f:
+            return f.readlines()
+
+    def test_deve_retornar_mesmos_itens_que_linha_a_linha(self):
+        for nome in ('files/cupom.txt', 'files/cupom_cancelado.txt'):
+            linhas = self.linhas(nome)
+            self.assertEqual(list(ExtratorDeRegistro().parse(iter(linhas))),
+                             list(ExtratorDeDados().parse(iter(linhas))))
+
+    def test_deve_encontrar_valores_em_varias_linhas(self):
+        class Extrator(Parser):
+            record_mode = True
+            begin = r'^INICIO$'
+            end = r'^FIM$'
+            Nome = StringField(r'^Nome:\s+(\w+)$', is_list=True)
+            Total = FloatField(r'^Total\s+([0-9,]+)$')
+
+        linhas = ['ruido', 'INICIO', 'Nome:', '  Ana', 'Nome: Bia',
+                  'Total', '  1,5', 'Total 2', 'FIM', 'Nome: Cid']
+        itens = list(Extrator().parse(iter(linhas)))
+        self.assertEqual(itens, [Dictionary(Nome=['Ana', 'Bia'], Total=1.5)])
+
+    def test_deve_encontrar_fim_de_linha_como_linha_a_linha(self):
+        linhas = [linha.rstrip() + '\n'
+                  for linha in self.linhas('files/cupom.txt')]
+        linhas.insert(-3, '         CANCELAMENTO\n')
+        item, = ExtratorDeDados().parse(iter(linhas))
+        self.assertTrue(item.Cancelado)
+        self.assertEqual(list(ExtratorDeRegistro().parse(iter(linhas))),
+                         [item])
+
+    def test_deve_converter_valores_de_uma_linha_juntos(self):
+        def criar(modo):
+            class Extrator(Parser):
+                record_mode = modo
+                begin = r'^INICIO$'
+                end = r'^FIM$'
+                Codigos = BaseField(r'c=(\d+)')
+                Primeiros = IntegerField(r'\A(\d+)', is_list=True)
+                Depois = IntegerField(r'(?<=n=)(\d+)', is_list=True)
+                Espacos = StringField(r'^(\w+)\s+$', is_list=True)
+            return Extrator
+
+        linhas = ['INICIO', 'c=1 c=2', '3', 'n=4 5', 'a ', 'b', 'FIM']
+        itens = list(criar(True)().parse(iter(linhas)))
+        self.assertEqual(itens, list(criar(False)().parse(iter(linhas))))
+        self.assertEqual(itens, [Dictionary(
+            Codigos=['1', '2'], Primeiros=[3], Depois=[4], Espacos=['a'])])
+
+    def test_deve_manter_modo_registro_ao_chamar_super(self):
+        class Extrator(Parser):
+            record_mode = True
+            begin = r'^INICIO$'
+            end = r'^FIM$'
+            Nome = StringField(r'^Nome:\s+(\w+)$', is_list=True)
+
+            def parse_block(self, block):
+                return super(Extrator, self).parse_block(block)
+
+        linhas = ['INICIO', 'Nome:', '  Ana', 'FIM']
+        self.assertEqual(list(Extrator().parse(iter(linhas))),
+                         [Dictionary(Nome=['Ana'])])
+
+    def test_deve_dar_cada_linha_a_parsers_aninhados(self):
+        linhas = self.linhas('files/reducaoz.txt')
+
+        class ReducaoZ(Parser):
+            record_mode = True
+            begin = r'^\s+REDUÇÃO Z\s+$'
+            end = r'^FAB:.*BR$'
+            number_of_blocks_in_cache = 1
+            COO = IntegerField(r'COO:\s*(\d+)')
+            CRZ = IntegerField(r'Contador de Redução Z:\s*(\d+)')
+            Totalizadores = TotalizadoresNaoFiscais()
+
+        self.assertEqual(list(ReducaoZ().parse(iter(linhas))),
+                         list(ParserDeReducaoZ().parse(iter(linhas))))
+        self.assertEqual(
+            list(ReducaoZ().session(only=['COO']).parse(iter(linhas))),
+            [Dictionary(COO=24152)])
+
+    def test_deve_avaliar_secao_sem_fim_ao_finalizar(self):
+        class Extrator(Parser):
+            record_mode = True
+            Linha = IntegerField(r'^(\d+)$', is_list=True)
+
+        self.assertEqual(list(Extrator().parse(iter(['1', 'a', '2']))),
+                         [Dictionary(Linha=[1, 2])])
+
+    def test_parse_file_deve_ler_o_texto(self):
+        nome = full_path('files/cupom.txt')
+        with io.open(nome, encoding='utf-8', newline='\n') as f:
+            esperado = list(ExtratorDeRegistro().parse(f))
+        self.assertEqual(list(ExtratorDeRegistro().parse_file(nome)),
+                         esperado)
+
+    def test_nao_deve_aceitar_um_item_por_valor(self):
+        def criar():
+            class Extrator(Parser):
+                record_mode = True
+                yield_item_to_each_field_value_found = True
+                Linha = IntegerField(r'^(\d+)$')
+        self.assertRaises(TypeError, criar)
+
+
+class TesteConversaoPreguicosa(unittest.TestCase):
+    def setUp(self):
+        self.conversoes = conversoes = []
+
+        class CampoContado(IntegerField):
+            def to_python(self, value):
+                conversoes.append(value)
+                return super(CampoContado, self).to_python(value)
+
+        class ExtratorPreguicoso(Parser):
+            lazy_conversion = True
+            begin = r'^\s+CUPOM FISCAL\s+$'
+            end = r'^FAB:.*BR$'
+            number_of_blocks_in_cache = 1
+            COO = CampoContado(r'COO:\s?(\d+)')
+            Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+            Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+            Itens = CampoItem(is_list=True)
+            Numeros = CampoContado(r'^\s*(\d+)\s\d+', is_list=True,
+                                   input_processor=lambda v: v * 10)
+
+        self.parser_class = ExtratorPreguicoso
+
+    def parse(self):
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8') as f:
+            return list(self.parser_class().parse(f))
+
+    def test_deve_converter_somente_campos_lidos(self):
+        item, = self.parse()
+        self.assertEqual(self.conversoes, [])
+        self.assertEqual(item.COO, 24422)
+        self.assertEqual(item['COO'], 24422)
+        self.assertEqual(self.conversoes, ['024422'])
+
+    def test_deve_acumular_listas_sem_converter(self):
+        item, = self.parse()
+        self.assertEqual(self.conversoes, [])
+        self.assertEqual(item.Numeros, [10 * n for n in range(1, 11)])
+        self.assertEqual(len(self.conversoes), 10)
+        item.Numeros
+        self.assertEqual(len(self.conversoes), 10)
+
+    def test_deve_ser_igual_ao_item_convertido(self):
+        item, = self.parse()
+        esperado, = list(ExtratorDeDados().parse(io.open(
+            full_path('files/cupom.txt'), encoding='utf-8')))
+        self.assertEqual(item.Itens, esperado.Itens)
+        self.assertEqual(item.Cancelado, False)  # default
+        self.assertEqual(list(self.parser_class().parse_file(
+            full_path('files/cupom.txt'))), [item])
+        del item['Numeros']
+        self.assertEqual(item, esperado)
+
+    def test_deve_converter_em_process_item(self):
+        class ExtratorComTotal(self.parser_class):
+            lazy_conversion = True
+            begin = r'^\s+CUPOM FISCAL\s+$'
+            end = r'^FAB:.*BR$'
+            Total = FloatField(r'^TOTAL R\$\s+(\d+,\d+)')
+
+            def process_item(self, item):
+                item['Total'] = item['Total'] * 2
+                return item
+
+        with io.open(full_path('files/cupom.txt'), encoding='utf-8') as f:
+            item, = list(ExtratorComTotal().parse(f))
+        self.assertEqual(item.Total, 844.4)
+
+    def test_deve_serializar_convertido(self):
+        import pickle
+        item, = self.parse()
+        copia = pickle.loads(pickle.dumps(item))
+        self.assertEqual(type(copia), Dictionary)
+        self.assertEqual(copia.COO, 24422)
+
+    def test_nao_deve_aceitar_record(self):
+        from raspador import Record
+
+        def criar():
+            class ExtratorRecord(Parser):
+                lazy_conversion = True
+                default_item_class = Record
+                COO = IntegerField(r'COO:\s?(\d+)')
+        self.assertRaises(TypeError, criar)
+
+
 if __name__ == '__main__':
     import logging
     logging.basicConfig(
@@ -0,0 +1,75 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import re
+import unittest
+
+from raspador.prefilter import required_literals, fast_test
+
+
+class TestRequiredLiterals(unittest.TestCase):
+    def literals(self, pattern, flags=re.UNICODE, anchored=False):
+        return required_literals(re.compile(pattern, flags), anchored)
+
+    def test_should_find_prefix_of_anchored_pattern(self):
+        self.assertEqual(self.literals(r'^TOTAL R\$\s+(\d+,\d+)'),
+                         ('TOTAL R$', 'TOTAL R$'))
+
+    def test_should_find_longest_literal(self):
+        self.assertEqual(self.literals(r'COO:\s?(\d+)'), (None, 'COO:'))
+        self.assertEqual(self.literals(r'^\s+CUPOM FISCAL\s+$'),
+                         (None, 'CUPOM FISCAL'))
+
+    def test_should_look_into_groups(self):
+        self.assertEqual(self.literals(r'^(FAB):(\d+)'), ('FAB:', 'FAB:'))
+
+    def test_should_look_into_required_repetitions(self):
+        self.assertEqual(self.literals(r'\d+(?:ITEM)+'), (None, 'ITEM'))
+        self.assertEqual(self.literals(r'\d+(?:ITEM)*'), (None, None))
+
+    def test_should_use_prefix_when_anchored(self):
+        self.assertEqual(self.literals(r'ABC\d', anchored=True),
+                         ('ABC', 'ABC'))
+
+    def test_should_not_use_prefix_with_multiline(self):
+        self.assertEqual(self.literals(r'^ABC', re.MULTILINE),
+                         (None, 'ABC'))
+
+    def test_should_ignore_case_insensitive_patterns(self):
+        self.assertEqual(self.literals(r'ABC', re.IGNORECASE), (None, None))
+        self.assertEqual(self.literals(r'(?i)ABC'), (None, None))
+        self.assertEqual(self.literals(r'(?i:ABC)D'), (None, 'D'))
+
+    def test_should_skip_alternations(self):
+        self.assertEqual(self.literals(r'Reduç(ão|ões) Z'), (None, 'Reduç'))
+
+    def test_should_work_with_bytes(self):
+        self.assertEqual(required_literals(re.compile(br'^FAB:.*BR$')),
+                         (b'FAB:', b'FAB:'))
+
+
+class TestFastTest(unittest.TestCase):
+    def test_should_behave_like_search(self):
+        test = fast_test(re.compile(r'COO:\s?(\d+)'))
+        self.assertTrue(test('31/01/2013 01:58:36  COO:024422'))
+        self.assertFalse(test('31/01/2013 01:58:36  COO:'))
+        self.assertFalse(test('nothing'))
+
+    def test_should_behave_like_match(self):
+        test = fast_test(re.compile(r'\s+(CANCELAMENTO)'), anchored=True)
+        self.assertTrue(test('   CANCELAMENTO'))
+        self.assertFalse(test('x  CANCELAMENTO'))
+
+    def test_should_not_need_regex_for_literals(self):
+        regex = re.compile(r'^FAB:')
+        test = fast_test(regex)
+        self.assertEqual(test('FAB:123 BR'), True)
+        self.assertEqual(test('x FAB:'), False)
+
+    def test_should_return_regex_method_without_literals(self):
+        regex = re.compile(r'\d+')
+        self.assertEqual(fast_test(regex), regex.search)
+        self.assertEqual(fast_test(regex, anchored=True), regex.match)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from raspador import Parser, IntegerField
+from raspador.profile import Profile, main
+
+from .test_parser import ExtratorDeDados, ParserDeReducaoZ, full_path
+
+
+class ParserComProcessador(Parser):
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 1
+    COO = IntegerField(r'COO:\s?(\d+)', input_processor=lambda v: v * 2)
+
+
+class TesteProfile(unittest.TestCase):
+    def parse(self, parser_class, filename, text=False):
+        profile = Profile(parser_class())
+        if text:
+            with io.open(full_path(filename), encoding='utf-8') as f:
+                items = list(profile.parse(f))
+        else:
+            items = list(profile.parse_file(full_path(filename)))
+        return profile, items
+
+    def test_deve_retornar_os_mesmos_itens_do_parser(self):
+        for parser_class, filename in [
+                (ExtratorDeDados, 'files/cupom.txt'),
+                (ParserDeReducaoZ, 'files/reducaoz.txt')]:
+            profile, items = self.parse(parser_class, filename)
+            self.assertEqual(
+                items, list(parser_class().parse_file(full_path(filename))))
+            profile, items = self.parse(parser_class, filename, text=True)
+            with io.open(full_path(filename), encoding='utf-8') as f:
+                self.assertEqual(items, list(parser_class().parse(f)))
+
+    def test_deve_contar_chamadas_e_valores_dos_campos(self):
+        for text in (False, True):
+            profile, items = self.parse(ExtratorDeDados, 'files/cupom.txt',
+                                        text)
+            itens = profile.fields['ExtratorDeDados.Itens']
+            self.assertEqual(itens.matches, 10)
+            self.assertTrue(itens.tested >= itens.calls >= itens.matches)
+            self.assertTrue(itens.to_python_time > 0)
+            self.assertEqual(profile.fields['ExtratorDeDados.COO'].matches, 1)
+            self.assertEqual(
+                profile.fields['ExtratorDeDados.Cancelado'].matches, 0)
+            secoes = profile.sections['ExtratorDeDados']
+            self.assertEqual(secoes.sections, 1)
+            self.assertEqual(secoes.lines, 30)
+
+    def test_deve_medir_input_processor(self):
+        profile, items = self.parse(ParserComProcessador, 'files/cupom.txt')
+        self.assertEqual(items[0].COO, 48844)
+        self.assertTrue(profile.fields['ParserComProcessador.COO']
+                        .input_processor_time > 0)
+
+    def test_deve_perfilar_parsers_aninhados(self):
+        profile, items = self.parse(ParserDeReducaoZ, 'files/reducaoz.txt')
+        totalizador = profile.fields[
+            'ParserDeReducaoZ.Totalizadores.Totalizador']
+        self.assertEqual(totalizador.matches, 3)
+        secoes = profile.sections['ParserDeReducaoZ.Totalizadores']
+        self.assertEqual(secoes.sections, 1)
+        self.assertEqual(secoes.lines, 6)
+
+    def test_deve_memorizar_valores(self):
+        chamadas = []
+
+        def processar(valor):
+            chamadas.append(valor)
+            return valor
+
+        class ParserComMemoria(Parser):
+            yield_item_to_each_field_value_found = True
+            memo_size = 8
+            Codigo = IntegerField(r'^c=(\d+)', input_processor=processar)
+
+        linhas = ['c=1\n', 'x\n', 'c=1\n', 'c=2\n', 'c=1\n']
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write(''.join(linhas))
+        self.addCleanup(os.remove, path)
+        list(ParserComMemoria().parse(iter(linhas)))
+        for parse in (lambda p: p.parse(iter(linhas)),
+                      lambda p: p.parse_file(path)):
+            del chamadas[:]
+            profile = Profile(ParserComMemoria())
+            self.assertEqual(len(list(parse(profile))), 4)
+            self.assertEqual(len(chamadas), 2)
+            codigo = profile.fields['ParserComMemoria.Codigo']
+            self.assertEqual(codigo.matches, 4)
+
+    def test_nao_deve_alterar_o_parser(self):
+        parser = ExtratorDeDados()
+        fields = dict(parser.fields)
+        Profile(parser)
+        self.assertEqual(parser.fields, fields)
+        self.assertFalse('to_python' in vars(fields['Itens']))
+
+    def test_deve_imprimir_relatorio_e_json(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        stdout = sys.stdout
+        sys.stdout = io.StringIO() if sys.version_info[0] > 2 else \
+            io.BytesIO()
+        try:
+            main(['tests.test_parser:ExtratorDeDados',
+                  full_path('files/cupom.txt'), '--json', path])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertTrue(output.startswith('field'))
+        self.assertTrue('ExtratorDeDados.Itens' in output)
+        with io.open(path) as f:
+            stats = json.load(f)
+        self.assertEqual(stats['items'], 1)
+        self.assertEqual(stats['fields'][0]['field'], 'ExtratorDeDados.Itens')
+
+
+if __name__ == '__main__':
+    unittest.main()
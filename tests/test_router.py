@@ -0,0 +1,91 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import os
+import tempfile
+import unittest
+
+from raspador import Parser, Router, IntegerField
+
+from .test_parser import ExtratorDeDados, ParserDeReducaoZ, \
+    TotalizadoresNaoFiscais, full_path
+
+
+def linhas(*nomes):
+    resultado = []
+    for nome in nomes:
+        with io.open(full_path(nome), encoding='utf-8') as f:
+            resultado.extend(f.readlines())
+    return resultado
+
+
+class ParserComCache(Parser):
+    begin = r'^\s+CUPOM FISCAL\s+$'
+    end = r'^FAB:.*BR$'
+    number_of_blocks_in_cache = 3
+    COO = IntegerField(r'COO:\s?(\d+)')
+    Linha = IntegerField(r'^linha (\d+)', is_list=True)
+
+
+class Linhas(Parser):
+    Linha = IntegerField(r'^linha (\d+)', is_list=True)
+
+
+class TestRouter(unittest.TestCase):
+    parsers = [ExtratorDeDados, ParserDeReducaoZ, TotalizadoresNaoFiscais]
+
+    def test_should_yield_the_items_of_each_parser(self):
+        stream = linhas('files/cupom.txt', 'files/reducaoz.txt',
+                        'files/cupom_cancelado.txt')
+        pairs = list(Router(self.parsers).parse(iter(stream)))
+        self.assertEqual(len(pairs), 4)
+        for parser_class in self.parsers:
+            self.assertEqual(
+                [item for name, item in pairs
+                 if name == parser_class.__name__],
+                list(parser_class().parse(iter(stream))))
+
+    def test_should_yield_items_in_stream_order(self):
+        stream = linhas('files/cupom.txt', 'files/reducaoz.txt',
+                        'files/cupom_cancelado.txt')
+        names = [name for name, item in
+                 Router(self.parsers).parse(iter(stream))]
+        self.assertEqual(names, ['ExtratorDeDados', 'TotalizadoresNaoFiscais',
+                                 'ParserDeReducaoZ', 'ExtratorDeDados'])
+
+    def test_should_replay_the_cache_before_begin(self):
+        cupom = '   CUPOM FISCAL \nCOO:%d\nFAB:BE09 BR\nlinha 99\n'
+        partes = ['linha %d\n' % i for i in range(10)]
+        texto = ''.join(partes) + cupom % 1 + partes[0] + cupom % 2 + \
+            ''.join(partes[:2]) + cupom % 3
+        stream = texto.splitlines(True)
+        pairs = list(Router([ParserComCache, Linhas]).parse(iter(stream)))
+        self.assertEqual(
+            [(i.COO, i.Linha) for name, i in pairs if name != 'Linhas'],
+            [(1, [7, 8, 9]), (2, [99, 0]), (3, [99, 0, 1])])
+        self.assertEqual(pairs[-1],
+                         ('Linhas', next(Linhas().parse(iter(stream)))))
+
+    def test_should_parse_files(self):
+        fd, path = tempfile.mkstemp()
+        stream = linhas('files/reducaoz.txt', 'files/cupom.txt')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(''.join(stream).encode('latin1'))
+            pairs = list(Router(self.parsers).parse_file(path, 'latin1'))
+        finally:
+            os.remove(path)
+        self.assertEqual(
+            [item for name, item in pairs if name == 'ParserDeReducaoZ'],
+            list(ParserDeReducaoZ().parse(iter(stream))))
+        self.assertEqual(len(pairs), 3)
+
+    def test_should_accept_parser_instances(self):
+        parser = ExtratorDeDados()
+        router = Router([parser])
+        self.assertTrue(router.parsers[0] is parser)
+        self.assertEqual(router.names, ['ExtratorDeDados'])
+
+    def test_should_reject_parsers_with_the_same_name(self):
+        self.assertRaises(ValueError, Router,
+                          [ExtratorDeDados, ExtratorDeDados()])
@@ -0,0 +1,130 @@
+# coding: utf-8
+from __future__ import unicode_literals
+import io
+import os
+import re
+import tempfile
+import unittest
+
+from raspador import Parser, BaseField, IntegerField, BooleanField, \
+    StringField
+from raspador import scan
+from raspador.scan import scan_plan
+from raspador.matcher import line_local
+
+
+class Log(Parser):
+    yield_item_to_each_field_value_found = True
+    Erro = BooleanField(r'^ERRO\s+(\w+)')
+    Codigos = IntegerField(r'cod=(\d+)', is_list=True)
+    Usuario = StringField(r'usuario:\s+(\w+)')
+    Par = BaseField(r'(\w)=(\w);')
+
+
+TEXTO = ''.join([
+    'inicio cod=1\n',
+    'usuario:\n',
+    'jose cod=3\n',
+    'ERRO  disco cod=4\n',
+    '\n',
+    'a=b; c=d;\r\n',
+    'usuario: ana\n',
+    'nada aqui\n',
+    'cod=5',
+])
+
+
+class TestScan(unittest.TestCase):
+    def write(self, text, encoding='utf-8'):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(text.encode(encoding))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def parse(self, parser_class, path, encoding='utf-8'):
+        with io.open(path, encoding=encoding, newline='\n') as f:
+            return list(parser_class().parse(f))
+
+    def test_should_yield_the_items_of_parse(self):
+        path = self.write(TEXTO)
+        self.assertTrue(scan_plan(Log(), 'utf-8') is not None)
+        items = list(Log().parse_file(path))
+        self.assertEqual(items, self.parse(Log, path))
+        self.assertEqual([list(item.items()) for item in items], [
+            [('Codigos', [1]), ('Erro', False)],
+            [('Codigos', [3]), ('Erro', False)],
+            [('Erro', True)],
+            [('Par', [('a', 'b'), ('c', 'd')]), ('Erro', False)],
+            [('Usuario', 'ana'), ('Erro', False)],
+            [('Codigos', [5]), ('Erro', False)],
+        ])
+
+    def test_should_scan_in_chunks(self):
+        path = self.write((TEXTO + '\n') * 20, 'latin1')
+        size = scan.CHUNK_SIZE
+        scan.CHUNK_SIZE = 7
+        try:
+            items = list(Log().parse_file(path, 'latin1'))
+        finally:
+            scan.CHUNK_SIZE = size
+        self.assertEqual(items, self.parse(Log, path, 'latin1'))
+
+    def test_should_scan_projections(self):
+        path = self.write(TEXTO)
+        self.assertEqual(list(Log().parse_file(path, only=['Usuario'])),
+                         list(Log().session(only=['Usuario']).parse(
+                             io.open(path, encoding='utf-8', newline='\n'))))
+
+    def test_should_give_each_line_to_other_parsers(self):
+        class ComInicio(Log):
+            begin = r'^inicio'
+            Codigos = IntegerField(r'cod=(\d+)', is_list=True)
+
+        class ComLookahead(Parser):
+            yield_item_to_each_field_value_found = True
+            Codigo = IntegerField(r'cod=(\d+)(?!\s*$)')
+
+        class SemItemPorValor(Parser):
+            Codigo = IntegerField(r'cod=(\d+)')
+
+        for parser_class in (ComInicio, ComLookahead, SemItemPorValor):
+            self.assertEqual(scan_plan(parser_class(), 'utf-8'), None)
+        self.assertEqual(scan_plan(Log(), 'utf-16'), None)
+        path = self.write(TEXTO)
+        self.assertEqual(list(ComLookahead().parse_file(path)),
+                         self.parse(ComLookahead, path))
+
+    def test_should_match_the_end_of_lines_as_parse(self):
+        class Cupom(Parser):
+            yield_item_to_each_field_value_found = True
+            Cancelado = BooleanField(r'^\s+(CANCELAMENTO)\s+$')
+            Total = StringField(r'^TOTAL R\$\s+(\d+,\d+)\s+$')
+
+        class Vazio(Parser):
+            yield_item_to_each_field_value_found = True
+            Digitos = BaseField(r'(\d*)', is_list=True)
+
+        path = self.write(''.join([
+            '   CANCELAMENTO\n',
+            'TOTAL R$   1,50\n',
+            'TOTAL R$ 2,00  \r\n',
+            '   CANCELAMENTO  \n',
+            'nada 12\n',
+            '   CANCELAMENTO',
+        ]))
+        self.assertTrue(scan_plan(Cupom(), 'utf-8') is not None)
+        self.assertEqual(scan_plan(Vazio(), 'utf-8'), None)
+        for parser_class in (Cupom, Vazio):
+            self.assertEqual(list(parser_class().parse_file(path)),
+                             self.parse(parser_class, path))
+        self.assertEqual(
+            [list(item.items()) for item in Cupom().parse_file(path)],
+            [[('Cancelado', True)], [('Total', '1,50'), ('Cancelado', False)],
+             [('Total', '2,00'), ('Cancelado', False)], [('Cancelado', True)]])
+
+    def test_line_local(self):
+        self.assertTrue(line_local(re.compile(r'^(\w+)\s+(\d+)$')))
+        self.assertFalse(line_local(re.compile(r'(?<=x)\d')))
+        self.assertFalse(line_local(re.compile(r'(a|(?=b))')))
+        self.assertFalse(line_local(re.compile(r'\Aa')))